@@ -1,27 +1,55 @@
 """Main FastAPI application for Stratos Investment Assistant."""
 
+from services.startup import startup_report
+
+# Time everything imported below; heavy libraries are loaded lazily on first use
+startup_report.imports_started()
+
 import os
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.routes import health, stocks
+from api.middleware import MetricsMiddleware, ProfilingMiddleware, TracingMiddleware
+from api.routes import debug, health, stocks
 from api.routes.alerts import router as alerts_router
 from api.routes.analysis import router as analysis_router
 from api.routes.portfolio import router as portfolio_router
 from api.routes.preferences import router as preferences_router
 from api.routes.preferences import watchlist_router
-from models.database import init_db
+from models.database import close_async_db, init_db
+from services.ai_service import close_openai_client
+from services.fundamentals_store import hydrate_universe_snapshot
+from services.loop_monitor import start_loop_monitor, stop_loop_monitor
+from services.notification_service import start_outbox_worker, stop_outbox_worker
+from services.profiler import PROFILING_ENABLED
+from services.readiness import start_universe_warmup, stop_universe_warmup
+from services.stock_service import CONSERVATIVE_UNIVERSE
+from services.tracing import tracer
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler - runs on startup and shutdown."""
-    # Startup: Initialize database
-    init_db()
+    # Startup: Initialize database and notification delivery
+    with startup_report.phase("init_db"):
+        init_db()
+    with startup_report.phase("hydrate_universe"):
+        hydrate_universe_snapshot(CONSERVATIVE_UNIVERSE)
+    with startup_report.phase("outbox_worker"):
+        start_outbox_worker()
+    start_loop_monitor()
+    start_universe_warmup()
+    startup_report.ready()
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop background workers
+    await stop_universe_warmup()
+    await stop_loop_monitor()
+    await stop_outbox_worker()
+    await close_openai_client()
+    await close_async_db()
+    tracer.shutdown()
 
 
 app = FastAPI(
@@ -47,7 +75,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend read validators for conditional polling
+    expose_headers=["ETag"],
 )
+app.add_middleware(MetricsMiddleware)
+# Tracing is opt-in through TRACING_EXPORTER
+if tracer.enabled:
+    app.add_middleware(TracingMiddleware)
+# Request profiling is opt-in; when disabled neither the middleware nor its routes exist
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
 
 # Include routers
 app.include_router(health.router)
@@ -57,6 +94,8 @@ app.include_router(analysis_router, prefix="/api/v1")
 app.include_router(portfolio_router, prefix="/api/v1")
 app.include_router(preferences_router, prefix="/api/v1")
 app.include_router(watchlist_router, prefix="/api/v1")
+if PROFILING_ENABLED:
+    app.include_router(debug.router)
 
 
 @app.get("/")
@@ -75,3 +114,6 @@ async def root():
             "watchlist": "/api/v1/watchlist",
         },
     }
+
+
+startup_report.imports_finished()
@@ -0,0 +1,166 @@
+"""ASGI middleware for request metrics, profiling and tracing."""
+
+import time
+from typing import Optional
+
+from services import metrics, tracing
+from services.profiler import PROFILE_HEADER, RequestProfiler, request_profiler
+
+request_latency_histogram = metrics.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+in_flight_gauge = metrics.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", labelnames=("method",)
+)
+
+
+def route_template(scope) -> str:
+    """Full path template of the matched route (`/api/v1/stocks/{symbol}`), or "unmatched"."""
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+    # Routes of included routers may carry their path without the router
+    # prefix; the prefix is the leading segments of the request path
+    path_segments = scope["path"].split("/")
+    prefix_length = len(path_segments) - len(template.split("/")) + 1
+    return "/".join(path_segments[:prefix_length]) + template
+
+
+class MetricsMiddleware:
+    """
+    Record latency per route template and the number of requests in flight.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, so it adds two
+    clock reads and two dictionary updates per request and never wraps the
+    response body. Routes are labelled by their template
+    (`/api/v1/stocks/{symbol}`), and unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight_gauge.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_latency_histogram.observe(
+                time.perf_counter() - start,
+                method=method,
+                route=route_template(scope),
+                status=status,
+            )
+            in_flight_gauge.dec(method=method)
+
+
+class ProfilingMiddleware:
+    """
+    Profile single requests with cProfile, on request or by sampling.
+
+    Installed only when PROFILING_ENABLED is set, so it costs nothing
+    otherwise. A request sending the `X-Profile` header (with PROFILE_TOKEN
+    as its value when one is configured), or picked by PROFILE_SAMPLE_RATE,
+    is profiled; its response carries `X-Profile-Id` and a `Server-Timing`
+    header with the DB and upstream split, and the full report is kept for
+    `/debug/profiles/{id}` (and written to PROFILE_DIR if set). Requests
+    overlapping a profiled one are counted in its report, since their loop
+    time shows up in its profile too.
+    """
+
+    def __init__(self, app, profiler: Optional[RequestProfiler] = None):
+        self.app = app
+        self.profiler = profiler or request_profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                header = value.decode("latin-1")
+                break
+        self.profiler.enter()
+        try:
+            await self._profiled(scope, receive, send, header)
+        finally:
+            self.profiler.leave()
+
+    async def _profiled(self, scope, receive, send, header: Optional[str]):
+        trigger = self.profiler.trigger(header)
+        profile = (
+            self.profiler.begin(scope["method"], scope["path"], trigger) if trigger else None
+        )
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_report(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"x-profile-id", profile.id.encode()),
+                        (b"server-timing", profile.server_timing().encode()),
+                    ],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_report)
+        finally:
+            self.profiler.finish(profile)
+
+
+class TracingMiddleware:
+    """
+    Open a server span around each request, the root of its trace.
+
+    Installed only when TRACING_EXPORTER is set. The span is named after the
+    route template (`GET /api/v1/portfolio/`), and the spans of the quote
+    fetches, DB statements and LLM calls made for the request nest under it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        with tracing.span(f"{method} {scope['path']}", kind="server") as span:
+
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    span.set(**{"http.status_code": message["status"]})
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = route_template(scope)
+                span.name = f"{method} {route}"
+                span.set(
+                    **{"http.method": method, "http.route": route, "http.target": scope["path"]}
+                )
@@ -1,35 +1,59 @@
 """Alert management endpoints."""
 
+import asyncio
 from datetime import datetime
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from models.database import get_db
+from models.database import get_async_db
 from models.preferences import (
     Alert,
     AlertCheck,
     AlertCreate,
     AlertResponse,
+    OutboxStats,
 )
-from services.stock_service import fetch_stock_data
+from services import notification_service
+from services.alert_service import evaluate_percent_change_alerts, window_label
+from services.deadline import Deadline, request_deadline
+from services.price_history import HISTORY_DAYS, price_history
+from services.quote_service import quote_cache
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
 
+async def _current_prices(symbols: list[str], deadline: Deadline) -> dict[str, Optional[float]]:
+    """
+    Current prices from the quote cache within the request budget. Stale
+    last known prices are left out (None), so alerts only act on fresh ones.
+    """
+    quotes = await quote_cache.get_within(symbols, deadline)
+    return {
+        symbol: quote.stock.price if quote is not None and not quote.stale else None
+        for symbol, quote in quotes.items()
+    }
+
+
 @router.get("/", response_model=list[AlertResponse])
 async def get_alerts(
-    active_only: bool = True, db: Session = Depends(get_db)
+    active_only: bool = True, db: AsyncSession = Depends(get_async_db)
 ) -> list[AlertResponse]:
     """Get all alerts."""
-    query = db.query(Alert)
+    query = select(Alert)
     if active_only:
-        query = query.filter(Alert.is_active == True)
-    return query.all()
+        query = query.where(Alert.is_active == True)
+    return (await db.scalars(query)).all()
 
 
 @router.post("/", response_model=AlertResponse)
-async def create_alert(alert: AlertCreate, db: Session = Depends(get_db)):
+async def create_alert(
+    alert: AlertCreate,
+    db: AsyncSession = Depends(get_async_db),
+    deadline: Deadline = Depends(request_deadline),
+):
     """Create a new price alert."""
     valid_types = ["price_above", "price_below", "percent_change"]
     if alert.alert_type not in valid_types:
@@ -37,66 +61,116 @@ async def create_alert(alert: AlertCreate, db: Session = Depends(get_db)):
             status_code=400,
             detail=f"Invalid alert_type. Must be one of: {valid_types}",
         )
+    if alert.alert_type == "percent_change" and alert.target_value == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="target_value must be non-zero for percent_change alerts",
+        )
+
+    reference_price = None
+    if alert.window_days is not None:
+        if alert.alert_type != "percent_change":
+            raise HTTPException(
+                status_code=400,
+                detail="window_days is only supported for percent_change alerts",
+            )
+        if not 1 <= alert.window_days < HISTORY_DAYS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"window_days must be between 1 and {HISTORY_DAYS - 1}",
+            )
+    elif alert.alert_type == "percent_change":
+        # Since-creation alerts measure change from the price right now
+        symbol = alert.symbol.upper()
+        reference_price = (await _current_prices([symbol], deadline))[symbol]
 
     db_alert = Alert(
         symbol=alert.symbol.upper(),
         alert_type=alert.alert_type,
         target_value=alert.target_value,
+        window_days=alert.window_days,
+        reference_price=reference_price,
         notes=alert.notes,
     )
     db.add(db_alert)
-    db.commit()
-    db.refresh(db_alert)
+    await db.commit()
+    await db.refresh(db_alert)
     return db_alert
 
 
 @router.get("/{alert_id}", response_model=AlertResponse)
-async def get_alert(alert_id: int, db: Session = Depends(get_db)):
+async def get_alert(alert_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific alert."""
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    alert = await db.get(Alert, alert_id)
     if not alert:
         raise HTTPException(status_code=404, detail="Alert not found")
     return alert
 
 
 @router.delete("/{alert_id}")
-async def delete_alert(alert_id: int, db: Session = Depends(get_db)):
+async def delete_alert(alert_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete an alert."""
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    alert = await db.get(Alert, alert_id)
     if not alert:
         raise HTTPException(status_code=404, detail="Alert not found")
 
-    db.delete(alert)
-    db.commit()
+    await db.delete(alert)
+    await db.commit()
     return {"message": f"Alert {alert_id} deleted"}
 
 
 @router.post("/{alert_id}/deactivate", response_model=AlertResponse)
-async def deactivate_alert(alert_id: int, db: Session = Depends(get_db)):
+async def deactivate_alert(alert_id: int, db: AsyncSession = Depends(get_async_db)):
     """Deactivate an alert without deleting it."""
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    alert = await db.get(Alert, alert_id)
     if not alert:
         raise HTTPException(status_code=404, detail="Alert not found")
 
     alert.is_active = False
-    db.commit()
-    db.refresh(alert)
+    await db.commit()
+    await db.refresh(alert)
     return alert
 
 
 @router.get("/check/all", response_model=list[AlertCheck])
-async def check_all_alerts(db: Session = Depends(get_db)):
-    """Check all active alerts and return their status."""
-    alerts = db.query(Alert).filter(Alert.is_active == True).all()
+async def check_all_alerts(
+    db: AsyncSession = Depends(get_async_db),
+    deadline: Deadline = Depends(request_deadline),
+):
+    """
+    Check all active alerts and return their status.
+
+    Prices come from the quote cache, fetched within the request budget
+    (REQUEST_BUDGET_SECONDS); alerts whose price misses it are reported as
+    unfetched rather than evaluated on a stale price.
+    """
+    alerts = (await db.scalars(select(Alert).where(Alert.is_active == True))).all()
+
+    # Look each symbol up once, no matter how many alerts watch it
+    prices = await _current_prices(sorted({alert.symbol for alert in alerts}), deadline)
+
+    # Percent change alerts are evaluated together in one batch pass
+    percent_alerts = [a for a in alerts if a.alert_type == "percent_change"]
+    for alert in percent_alerts:
+        # Capture a since-creation reference if none was available at creation
+        if not alert.window_days and not alert.reference_price and prices.get(alert.symbol):
+            alert.reference_price = prices[alert.symbol]
+    windowed_symbols = sorted({a.symbol for a in percent_alerts if a.window_days})
+    if windowed_symbols:
+        await asyncio.to_thread(price_history.ensure_loaded, windowed_symbols)
+    currents, references, changes, triggers = evaluate_percent_change_alerts(percent_alerts, prices)
+    percent_results = {
+        alert.id: (currents[i], references[i], changes[i], bool(triggers[i]))
+        for i, alert in enumerate(percent_alerts)
+    }
+
     results = []
+    now = datetime.utcnow()
 
     for alert in alerts:
-        try:
-            stock_data = fetch_stock_data(alert.symbol)
-            current_price = stock_data.price if stock_data else None
-        except Exception:
-            current_price = None
-
+        current_price = prices.get(alert.symbol)
+        reference_price = None
+        percent_change = None
         should_trigger = False
         message = ""
 
@@ -115,35 +189,69 @@ async def check_all_alerts(db: Session = Depends(get_db)):
             else:
                 message = f"{alert.symbol} is at ${current_price:.2f}, above target ${alert.target_value:.2f}"
         elif alert.alert_type == "percent_change":
-            # For percent_change, we'd need a reference price
-            # This is a simplified implementation
-            message = f"Percent change alerts require price history (not yet implemented)"
+            current, reference, change, should_trigger = percent_results[alert.id]
+            window = window_label(alert.window_days)
+            if current != current:  # NaN - no current price
+                message = f"Could not fetch price for {alert.symbol}"
+            elif reference != reference:  # NaN - no reference price
+                message = f"No reference price available for {alert.symbol} {window}"
+            else:
+                reference_price = float(reference)
+                percent_change = round(float(change), 4)
+                position = "beyond" if should_trigger else "within"
+                message = (
+                    f"{alert.symbol} is at ${current_price:.2f}, {percent_change:+.2f}% {window}, "
+                    f"{position} target {alert.target_value:+.2f}%"
+                )
 
-        # Update alert if triggered
+        # Mark alert as triggered and queue its notification in the same transaction
         if should_trigger and not alert.is_triggered:
             alert.is_triggered = True
-            alert.triggered_at = datetime.utcnow()
-            db.commit()
-            db.refresh(alert)
+            alert.triggered_at = now
+            db.add(notification_service.build_notification(alert, current_price, message))
 
         results.append(
             AlertCheck(
                 alert=AlertResponse.model_validate(alert),
                 current_price=current_price,
+                reference_price=reference_price,
+                percent_change=percent_change,
                 should_trigger=should_trigger,
                 message=message,
             )
         )
 
+    # Persist all triggers, outbox rows and captured reference prices in one commit
+    if db.dirty or db.new:
+        await db.commit()
+        notification_service.wake_outbox_worker()
+
     return results
 
 
+@router.get("/outbox/stats", response_model=OutboxStats)
+async def get_outbox_stats(db: AsyncSession = Depends(get_async_db)):
+    """Get notification queue depth and delivery throughput."""
+    pending, failed = await notification_service.outbox_counts_async(db)
+    worker = notification_service.outbox_worker
+    return OutboxStats(
+        queue_depth=pending,
+        failed=failed,
+        delivered_total=int(notification_service.delivered_counter.value),
+        failed_total=int(notification_service.failed_counter.value),
+        retries_total=int(notification_service.retries_counter.value),
+        batches_total=int(notification_service.batches_counter.value),
+        delivery_rate_per_sec=worker.delivery_rate() if worker else 0.0,
+        worker_running=worker.running if worker else False,
+    )
+
+
 @router.get("/symbol/{symbol}", response_model=list[AlertResponse])
 async def get_alerts_for_symbol(
-    symbol: str, active_only: bool = True, db: Session = Depends(get_db)
+    symbol: str, active_only: bool = True, db: AsyncSession = Depends(get_async_db)
 ):
     """Get all alerts for a specific symbol."""
-    query = db.query(Alert).filter(Alert.symbol == symbol.upper())
+    query = select(Alert).where(Alert.symbol == symbol.upper())
     if active_only:
-        query = query.filter(Alert.is_active == True)
-    return query.all()
+        query = query.where(Alert.is_active == True)
+    return (await db.scalars(query)).all()
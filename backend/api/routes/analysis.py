@@ -1,15 +1,30 @@
 """AI-powered analysis endpoints."""
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import asyncio
+import json
+from datetime import datetime
+from typing import Optional
 
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from services import llm_telemetry
+from services.analysis_cache import analysis_cache
 from services.ai_service import (
     StockRecommendation,
     PortfolioAnalysis,
     analyze_stock,
     analyze_portfolio,
+    stream_batch_analysis,
+    stream_stock_analysis,
+)
+from services.stock_service import (
+    fetch_multiple_stocks,
+    fetch_stock_data,
+    fresh_universe_snapshot,
+    get_universe_snapshot,
 )
-from services.stock_service import fetch_stock_data, fetch_multiple_stocks
 
 router = APIRouter(prefix="/analysis", tags=["Analysis"])
 
@@ -20,6 +35,38 @@ class AnalyzeRequest(BaseModel):
     symbols: list[str]
 
 
+class RankedRecommendation(StockRecommendation):
+    """Rule-based recommendation with its universe rank and score."""
+
+    rank: int
+    score: int
+    name: str
+    sector: str
+    price: float
+
+
+class TopPicksResponse(BaseModel):
+    """Response model for ranked top picks."""
+
+    results: list[RankedRecommendation]
+    total: int
+    offset: int
+    limit: int
+    snapshot_version: str
+    as_of: datetime
+
+
+# Maximum symbols accepted by the batch analysis endpoint
+MAX_BATCH_SYMBOLS = 500
+
+
+class BatchAnalyzeRequest(BaseModel):
+    """Request model for batch stock analysis."""
+
+    symbols: list[str]
+    pack_size: int = Field(1, ge=1, le=10, description="Stocks per LLM prompt")
+
+
 @router.get("/stock/{symbol}", response_model=StockRecommendation)
 async def get_stock_analysis(symbol: str):
     """
@@ -31,7 +78,7 @@ async def get_stock_analysis(symbol: str):
     - Pros and cons
     - Risk level assessment
     """
-    stock = fetch_stock_data(symbol.upper())
+    stock = await asyncio.to_thread(fetch_stock_data, symbol.upper())
 
     if not stock:
         raise HTTPException(
@@ -39,7 +86,73 @@ async def get_stock_analysis(symbol: str):
             detail=f"Stock {symbol.upper()} not found",
         )
 
-    return analyze_stock(stock)
+    return await analyze_stock(stock)
+
+
+@router.get("/stock/{symbol}/stream")
+async def stream_stock_analysis_endpoint(symbol: str):
+    """
+    Stream AI analysis for a stock as Server-Sent Events.
+
+    Emits a `status` event straight away, then `token` events with model
+    output as it is generated, followed by a single `result` event containing
+    the validated recommendation (same shape as /analysis/stock/{symbol}).
+    The stock is fetched after the first event, so an unknown symbol ends the
+    stream with an `error` event (status 404) rather than an HTTP error.
+    """
+    symbol = symbol.upper()
+
+    def sse(event: str, data: dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    async def sse_events():
+        yield sse("status", {"symbol": symbol, "stage": "fetching"})
+        stock = await asyncio.to_thread(fetch_stock_data, symbol)
+        if not stock:
+            yield sse("error", {"status": 404, "detail": f"Stock {symbol} not found"})
+            return
+        async for event, data in stream_stock_analysis(stock):
+            yield sse(event, data)
+
+    return StreamingResponse(
+        sse_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/batch")
+async def batch_stock_analysis(request: BatchAnalyzeRequest):
+    """
+    Analyze many stocks at once, streaming results as NDJSON.
+
+    Each line is a JSON object with the stock `symbol` and either an
+    `analysis` (same shape as /analysis/stock/{symbol}) or an `error`.
+    Lines arrive in completion order: cached analyses first, then LLM
+    results as they finish. Set `pack_size` > 1 to analyze several stocks
+    per LLM prompt.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in request.symbols if s.strip()))
+
+    if not symbols:
+        raise HTTPException(
+            status_code=400,
+            detail="At least one stock symbol is required",
+        )
+
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {MAX_BATCH_SYMBOLS} stocks can be analyzed at once",
+        )
+
+    async def ndjson_lines():
+        async for item in stream_batch_analysis(
+            symbols, fetch_stock_data, pack_size=request.pack_size
+        ):
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
 
 
 @router.post("/portfolio", response_model=PortfolioAnalysis)
@@ -78,14 +191,81 @@ async def analyze_portfolio_endpoint(request: AnalyzeRequest):
     return analyze_portfolio(stocks)
 
 
+@router.get("/top", response_model=TopPicksResponse)
+async def get_top_picks(
+    recommendation: Optional[str] = Query(
+        None, description="Comma-separated recommendations, e.g. 'strong_buy,buy'"
+    ),
+    risk_level: Optional[str] = Query(
+        None, description="Comma-separated risk levels, e.g. 'low,medium'"
+    ),
+    sector: Optional[str] = Query(None, description="Filter by sector"),
+    min_score: Optional[int] = Query(None, description="Minimum rule-based score"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Get the conservative universe ranked by rule-based score.
+
+    Scores are computed for the whole universe snapshot in one vectorized
+    pass and cached until the snapshot changes; results match
+    /analysis/quick/{symbol} for every stock.
+    """
+    # Import here so numpy is only loaded once scoring is needed
+    from services.scoring import get_universe_scores
+
+    # Refetched on a worker thread once stale, so the loop never waits on upstream
+    snapshot = fresh_universe_snapshot() or await asyncio.to_thread(get_universe_snapshot)
+    scores = get_universe_scores(snapshot)
+    ranked = scores.ranked(
+        recommendations=recommendation.split(",") if recommendation else None,
+        risk_levels=risk_level.split(",") if risk_level else None,
+        sector=sector,
+        min_score=min_score,
+    )
+
+    results = []
+    for position, i in enumerate(ranked[offset : offset + limit], start=offset + 1):
+        stock = scores.stocks[i]
+        results.append(
+            RankedRecommendation(
+                **scores.recommendation(i).model_dump(),
+                rank=position,
+                score=int(scores.score[i]),
+                name=stock.name,
+                sector=stock.sector,
+                price=stock.price,
+            )
+        )
+
+    return TopPicksResponse(
+        results=results,
+        total=len(ranked),
+        offset=offset,
+        limit=limit,
+        snapshot_version=snapshot.version,
+        as_of=snapshot.fetched_at,
+    )
+
+
 @router.get("/quick/{symbol}")
 async def get_quick_analysis(symbol: str):
     """
     Get a quick rule-based analysis without AI.
 
     Faster response, uses predefined rules for conservative investing criteria.
+    Universe stocks are served from the precomputed snapshot scores while the
+    snapshot is fresh; otherwise just this stock is fetched.
     """
-    stock = fetch_stock_data(symbol.upper())
+    from services.scoring import get_universe_scores
+
+    snapshot = fresh_universe_snapshot()
+    if snapshot is not None:
+        cached = get_universe_scores(snapshot).for_symbol(symbol.upper())
+        if cached is not None:
+            return cached
+
+    stock = await asyncio.to_thread(fetch_stock_data, symbol.upper())
 
     if not stock:
         raise HTTPException(
@@ -97,3 +277,25 @@ async def get_quick_analysis(symbol: str):
     from services.ai_service import _rule_based_recommendation
 
     return _rule_based_recommendation(stock)
+
+
+@router.get("/cache/stats")
+async def get_analysis_cache_stats():
+    """
+    Get LLM analysis cache statistics.
+
+    Reports cache size, hit rate and the prompt/completion tokens saved by hits.
+    """
+    return analysis_cache.stats()
+
+
+@router.get("/llm/stats")
+async def get_llm_stats():
+    """
+    Get LLM call telemetry.
+
+    Reports latency percentiles, token usage and estimated cost per model and
+    operation, plus how often analyses were served by the LLM, the cache or
+    the rule-based fallback (and why it was used).
+    """
+    return llm_telemetry.summary()
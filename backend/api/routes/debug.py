@@ -0,0 +1,33 @@
+"""Request profiling reports (mounted only when PROFILING_ENABLED is set)."""
+
+from fastapi import APIRouter, HTTPException
+
+from services.profiler import request_profiler
+
+router = APIRouter(prefix="/debug/profiles", tags=["Debug"])
+
+
+@router.get("/")
+async def list_profiles():
+    """List recently profiled requests, newest first, without their pstats listings."""
+    return [profile.as_dict(include_stats=False) for profile in reversed(request_profiler.reports)]
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str):
+    """
+    Get one request profile.
+
+    Includes wall time, own time on the event loop per category (route,
+    service, db, upstream, idle, other), wall time of every DB statement and
+    upstream call made for the request, the slowest application functions
+    and the pstats listing sorted by cumulative time.
+
+    The event-loop figures (breakdown, functions, pstats) also include other
+    requests that ran on the loop meanwhile; `overlapping_requests` counts
+    them, and the figures are the request's own only when it is 0.
+    """
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return profile.as_dict()
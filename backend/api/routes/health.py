@@ -1,6 +1,13 @@
 """Health check endpoint."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database import get_async_db
+from services.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY
+from services.readiness import readiness
+from services.startup import startup_report
 
 router = APIRouter(tags=["Health"])
 
@@ -12,3 +19,35 @@ async def health_check():
         "status": "healthy",
         "version": "0.1.0",
     }
+
+
+@router.get("/health/ready")
+async def readiness_check(db: AsyncSession = Depends(get_async_db)):
+    """
+    Report whether this instance should receive traffic.
+
+    Returns 200 when ready and 503 otherwise, with the checks behind the
+    verdict: universe snapshot fill ratio and age (the warm-up threshold),
+    recent market data latency and error rate, and database round-trip
+    time. `/health` stays a liveness check that only says the process is up.
+    """
+    report = await readiness(db)
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@router.get("/health/startup")
+async def startup_timing():
+    """Report import time, startup phase timings and which heavy modules are loaded."""
+    return startup_report.as_dict()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Expose all process metrics in the Prometheus text format.
+
+    Includes request latency per route, requests in flight, upstream
+    provider latency and errors, cache hit ratios, database statement
+    timings, event-loop lag and the LLM and notification metrics.
+    """
+    return Response(REGISTRY.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
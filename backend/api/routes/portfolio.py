@@ -1,11 +1,13 @@
 """Portfolio management endpoints."""
 
 from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from models.database import get_db
+from models.database import get_async_db
 from models.preferences import (
     PortfolioHolding,
     PortfolioHoldingCreate,
@@ -14,15 +16,92 @@ from models.preferences import (
     PortfolioHoldingWithValue,
     PortfolioSummary,
 )
-from services.stock_service import fetch_stock_data
+from services.conditional import cache_control, conditional, make_etag
+from services.deadline import Deadline, request_deadline
+from services.quote_service import Quote, quote_cache
 
 router = APIRouter(prefix="/portfolio", tags=["portfolio"])
 
 
+def _holding_with_value(holding: PortfolioHolding, quote: Optional[Quote]) -> PortfolioHoldingWithValue:
+    """Value a holding at its quote (unvalued if there is none)."""
+    cost = holding.shares * holding.purchase_price
+    current_price = quote.stock.price if quote else None
+
+    if current_price:
+        current_value = holding.shares * current_price
+        gain_loss = current_value - cost
+        gain_loss_percent = (gain_loss / cost) * 100 if cost > 0 else 0
+    else:
+        current_value = None
+        gain_loss = None
+        gain_loss_percent = None
+
+    return PortfolioHoldingWithValue(
+        id=holding.id,
+        symbol=holding.symbol,
+        name=quote.stock.name if quote else None,
+        shares=holding.shares,
+        purchase_price=holding.purchase_price,
+        current_price=current_price,
+        purchase_date=holding.purchase_date,
+        notes=holding.notes,
+        current_value=current_value,
+        gain_loss=gain_loss,
+        gain_loss_percent=gain_loss_percent,
+        as_of=quote.as_of if quote else None,
+        stale=quote.stale if quote else False,
+    )
+
+
+def _portfolio_etag(holdings: list[PortfolioHolding], quotes: dict[str, Optional[Quote]]) -> str:
+    """ETag over the holdings and the fetch time of each price they are valued at."""
+    return make_etag(
+        "portfolio",
+        [(h.id, h.symbol, h.shares, h.purchase_price, h.purchase_date, h.notes) for h in holdings],
+        {
+            symbol: (quote.as_of, quote.stale) if quote is not None else None
+            for symbol, quote in sorted(quotes.items())
+        },
+    )
+
+
 @router.get("/", response_model=PortfolioSummary)
-async def get_portfolio(db: Session = Depends(get_db)):
-    """Get full portfolio with current values and summary."""
-    holdings = db.query(PortfolioHolding).all()
+async def get_portfolio(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    deadline: Deadline = Depends(request_deadline),
+):
+    """
+    Get full portfolio with current values and summary.
+
+    Prices are fetched within the request budget (REQUEST_BUDGET_SECONDS).
+    Holdings whose price misses it are valued at the last known price and
+    flagged `stale`, with `as_of` giving when that price was fetched.
+
+    The ETag covers the holdings and the prices used, so polling with
+    If-None-Match gets a 304, without valuing the portfolio, until either
+    changes. Holdings are edited through other URLs, so clients always
+    revalidate.
+    """
+    holdings = (await db.scalars(select(PortfolioHolding))).all()
+
+    # Fetch current prices concurrently, once per symbol, within the budget
+    quotes = (
+        await quote_cache.get_within([holding.symbol for holding in holdings], deadline)
+        if holdings
+        else {}
+    )
+
+    not_modified = conditional(
+        response,
+        if_none_match,
+        _portfolio_etag(holdings, quotes),
+        cache_control(None, private=True),
+    )
+    if not_modified is not None:
+        return not_modified
 
     if not holdings:
         return PortfolioSummary(
@@ -34,48 +113,10 @@ async def get_portfolio(db: Session = Depends(get_db)):
             holdings=[],
         )
 
-    holdings_with_value = []
-    total_value = 0.0
-    total_cost = 0.0
-
-    for holding in holdings:
-        cost = holding.shares * holding.purchase_price
-        total_cost += cost
-
-        # Fetch current price
-        try:
-            stock_data = fetch_stock_data(holding.symbol)
-            current_price = stock_data.price if stock_data else None
-            name = stock_data.name if stock_data else None
-        except Exception:
-            current_price = None
-            name = None
-
-        if current_price:
-            current_value = holding.shares * current_price
-            total_value += current_value
-            gain_loss = current_value - cost
-            gain_loss_percent = (gain_loss / cost) * 100 if cost > 0 else 0
-        else:
-            current_value = None
-            gain_loss = None
-            gain_loss_percent = None
-
-        holdings_with_value.append(
-            PortfolioHoldingWithValue(
-                id=holding.id,
-                symbol=holding.symbol,
-                name=name,
-                shares=holding.shares,
-                purchase_price=holding.purchase_price,
-                current_price=current_price,
-                purchase_date=holding.purchase_date,
-                notes=holding.notes,
-                current_value=current_value,
-                gain_loss=gain_loss,
-                gain_loss_percent=gain_loss_percent,
-            )
-        )
+    holdings_with_value = [_holding_with_value(h, quotes.get(h.symbol)) for h in holdings]
+    total_cost = sum(h.shares * h.purchase_price for h in holdings)
+    total_value = sum(h.current_value for h in holdings_with_value if h.current_value)
+    priced_at = [h.as_of for h in holdings_with_value if h.as_of]
 
     total_gain_loss = total_value - total_cost
     total_gain_loss_percent = (total_gain_loss / total_cost) * 100 if total_cost > 0 else 0
@@ -87,11 +128,15 @@ async def get_portfolio(db: Session = Depends(get_db)):
         total_gain_loss_percent=total_gain_loss_percent,
         holdings_count=len(holdings),
         holdings=holdings_with_value,
+        as_of=min(priced_at, default=None),
+        stale=any(h.stale for h in holdings_with_value),
     )
 
 
 @router.post("/holdings", response_model=PortfolioHoldingResponse)
-async def add_holding(holding: PortfolioHoldingCreate, db: Session = Depends(get_db)):
+async def add_holding(
+    holding: PortfolioHoldingCreate, db: AsyncSession = Depends(get_async_db)
+):
     """Add a new holding to the portfolio."""
     db_holding = PortfolioHolding(
         symbol=holding.symbol.upper(),
@@ -101,64 +146,38 @@ async def add_holding(holding: PortfolioHoldingCreate, db: Session = Depends(get
         notes=holding.notes,
     )
     db.add(db_holding)
-    db.commit()
-    db.refresh(db_holding)
+    await db.commit()
+    await db.refresh(db_holding)
     return db_holding
 
 
 @router.get("/holdings", response_model=list[PortfolioHoldingResponse])
-async def get_holdings(db: Session = Depends(get_db)):
+async def get_holdings(db: AsyncSession = Depends(get_async_db)):
     """Get all portfolio holdings."""
-    return db.query(PortfolioHolding).all()
+    return (await db.scalars(select(PortfolioHolding))).all()
 
 
 @router.get("/holdings/{holding_id}", response_model=PortfolioHoldingWithValue)
-async def get_holding(holding_id: int, db: Session = Depends(get_db)):
-    """Get a specific holding with current value."""
-    holding = db.query(PortfolioHolding).filter(PortfolioHolding.id == holding_id).first()
+async def get_holding(
+    holding_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    deadline: Deadline = Depends(request_deadline),
+):
+    """Get a specific holding with current value (stale if the price misses the budget)."""
+    holding = await db.get(PortfolioHolding, holding_id)
     if not holding:
         raise HTTPException(status_code=404, detail="Holding not found")
 
-    cost = holding.shares * holding.purchase_price
-
-    try:
-        stock_data = fetch_stock_data(holding.symbol)
-        current_price = stock_data.price if stock_data else None
-        name = stock_data.name if stock_data else None
-    except Exception:
-        current_price = None
-        name = None
-
-    if current_price:
-        current_value = holding.shares * current_price
-        gain_loss = current_value - cost
-        gain_loss_percent = (gain_loss / cost) * 100 if cost > 0 else 0
-    else:
-        current_value = None
-        gain_loss = None
-        gain_loss_percent = None
-
-    return PortfolioHoldingWithValue(
-        id=holding.id,
-        symbol=holding.symbol,
-        name=name,
-        shares=holding.shares,
-        purchase_price=holding.purchase_price,
-        current_price=current_price,
-        purchase_date=holding.purchase_date,
-        notes=holding.notes,
-        current_value=current_value,
-        gain_loss=gain_loss,
-        gain_loss_percent=gain_loss_percent,
-    )
+    quotes = await quote_cache.get_within([holding.symbol], deadline)
+    return _holding_with_value(holding, quotes.get(holding.symbol))
 
 
 @router.put("/holdings/{holding_id}", response_model=PortfolioHoldingResponse)
 async def update_holding(
-    holding_id: int, update: PortfolioHoldingUpdate, db: Session = Depends(get_db)
+    holding_id: int, update: PortfolioHoldingUpdate, db: AsyncSession = Depends(get_async_db)
 ):
     """Update a portfolio holding."""
-    holding = db.query(PortfolioHolding).filter(PortfolioHolding.id == holding_id).first()
+    holding = await db.get(PortfolioHolding, holding_id)
     if not holding:
         raise HTTPException(status_code=404, detail="Holding not found")
 
@@ -171,18 +190,18 @@ async def update_holding(
     if update.notes is not None:
         holding.notes = update.notes
 
-    db.commit()
-    db.refresh(holding)
+    await db.commit()
+    await db.refresh(holding)
     return holding
 
 
 @router.delete("/holdings/{holding_id}")
-async def delete_holding(holding_id: int, db: Session = Depends(get_db)):
+async def delete_holding(holding_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a portfolio holding."""
-    holding = db.query(PortfolioHolding).filter(PortfolioHolding.id == holding_id).first()
+    holding = await db.get(PortfolioHolding, holding_id)
     if not holding:
         raise HTTPException(status_code=404, detail="Holding not found")
 
-    db.delete(holding)
-    db.commit()
+    await db.delete(holding)
+    await db.commit()
     return {"message": f"Holding {holding_id} deleted"}
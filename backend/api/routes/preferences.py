@@ -1,19 +1,27 @@
 """User preferences and watchlist endpoints."""
 
+from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from models.database import get_db
+from models.database import get_async_db
 from models.preferences import (
+    EnrichedWatchlistResponse,
     PreferencesCreate,
     PreferencesResponse,
     UserPreferences,
     Watchlist,
     WatchlistItemCreate,
+    WatchlistItemEnriched,
     WatchlistItemResponse,
 )
+from services.deadline import Deadline, request_deadline
+from services.quote_service import Quote, quote_cache
+from services.screen_presets import invalidate_preset
 
 router = APIRouter(prefix="/preferences", tags=["Preferences"])
 
@@ -21,10 +29,10 @@ router = APIRouter(prefix="/preferences", tags=["Preferences"])
 @router.get("/", response_model=PreferencesResponse)
 async def get_preferences(
     name: str = "default",
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get user screening preferences by name."""
-    prefs = db.query(UserPreferences).filter(UserPreferences.name == name).first()
+    prefs = await db.scalar(select(UserPreferences).where(UserPreferences.name == name))
 
     if not prefs:
         # Return default preferences if none exist
@@ -37,8 +45,8 @@ async def get_preferences(
             preferred_sectors=[],
         )
         db.add(prefs)
-        db.commit()
-        db.refresh(prefs)
+        await db.commit()
+        await db.refresh(prefs)
 
     return prefs
 
@@ -46,13 +54,11 @@ async def get_preferences(
 @router.post("/", response_model=PreferencesResponse)
 async def save_preferences(
     preferences: PreferencesCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Save or update user screening preferences."""
-    existing = (
-        db.query(UserPreferences)
-        .filter(UserPreferences.name == preferences.name)
-        .first()
+    existing = await db.scalar(
+        select(UserPreferences).where(UserPreferences.name == preferences.name)
     )
 
     if existing:
@@ -63,8 +69,9 @@ async def save_preferences(
         existing.max_beta = preferences.max_beta
         existing.max_debt_to_equity = preferences.max_debt_to_equity
         existing.preferred_sectors = preferences.preferred_sectors
-        db.commit()
-        db.refresh(existing)
+        await db.commit()
+        await db.refresh(existing)
+        invalidate_preset(existing.name)
         return existing
     else:
         # Create new
@@ -78,24 +85,26 @@ async def save_preferences(
             preferred_sectors=preferences.preferred_sectors,
         )
         db.add(prefs)
-        db.commit()
-        db.refresh(prefs)
+        await db.commit()
+        await db.refresh(prefs)
+        invalidate_preset(prefs.name)
         return prefs
 
 
 @router.delete("/{name}")
 async def delete_preferences(
     name: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete user preferences by name."""
-    prefs = db.query(UserPreferences).filter(UserPreferences.name == name).first()
+    prefs = await db.scalar(select(UserPreferences).where(UserPreferences.name == name))
 
     if not prefs:
         raise HTTPException(status_code=404, detail="Preferences not found")
 
-    db.delete(prefs)
-    db.commit()
+    await db.delete(prefs)
+    await db.commit()
+    invalidate_preset(name)
     return {"message": f"Preferences '{name}' deleted"}
 
 
@@ -106,34 +115,114 @@ watchlist_router = APIRouter(prefix="/watchlist", tags=["Watchlist"])
 @watchlist_router.get("/", response_model=list[WatchlistItemResponse])
 async def get_watchlist(
     active_only: bool = True,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get user's stock watchlist."""
-    query = db.query(Watchlist)
+    query = select(Watchlist)
     if active_only:
-        query = query.filter(Watchlist.is_active == True)
-    return query.all()
+        query = query.where(Watchlist.is_active == True)
+    return (await db.scalars(query)).all()
+
+
+def _enrich(item: Watchlist, quote: Optional[Quote]) -> WatchlistItemEnriched:
+    """Combine a watchlist row with its quote."""
+    enriched = WatchlistItemEnriched.model_validate(item)
+    if quote is None:
+        return enriched
+
+    enriched.quote_available = True
+    enriched.stale = quote.stale
+    stock = quote.stock
+    for field in (
+        "name",
+        "sector",
+        "price",
+        "previous_close",
+        "dividend_yield",
+        "pe_ratio",
+        "market_cap",
+        "beta",
+        "fifty_two_week_high",
+        "fifty_two_week_low",
+    ):
+        setattr(enriched, field, getattr(stock, field))
+
+    price = stock.price
+    if stock.previous_close:
+        enriched.day_change = round(price - stock.previous_close, 4)
+        enriched.day_change_percent = round((price / stock.previous_close - 1) * 100, 2)
+    if item.target_price is not None and price:
+        enriched.target_distance = round(item.target_price - price, 4)
+        enriched.target_distance_percent = round((item.target_price / price - 1) * 100, 2)
+    return enriched
+
+
+async def _active_items(db: AsyncSession) -> list[Watchlist]:
+    return (
+        await db.scalars(select(Watchlist).where(Watchlist.is_active == True).order_by(Watchlist.symbol))
+    ).all()
+
+
+@watchlist_router.get("/enriched", response_model=EnrichedWatchlistResponse)
+async def get_enriched_watchlist(
+    db: AsyncSession = Depends(get_async_db),
+    deadline: Deadline = Depends(request_deadline),
+):
+    """
+    Get the active watchlist with live quotes and key fundamentals.
+
+    Each item adds the current price, day change, distance to its
+    target_price and fundamentals. Quotes are looked up in one batch:
+    recently fetched quotes are reused and the rest are fetched
+    concurrently, shared with any other request for the same symbols.
+    Quotes not fetched within the request budget (REQUEST_BUDGET_SECONDS)
+    fall back to their last known values, flagged `stale`. Items with no
+    quote at all have `quote_available: false`.
+    """
+    items = await _active_items(db)
+    quotes = await quote_cache.get_within([item.symbol for item in items], deadline)
+    enriched = [_enrich(item, quotes.get(item.symbol)) for item in items]
+    return EnrichedWatchlistResponse(items=enriched, total=len(enriched), as_of=datetime.utcnow())
+
+
+@watchlist_router.get("/enriched/stream")
+async def stream_enriched_watchlist(
+    db: AsyncSession = Depends(get_async_db),
+    deadline: Deadline = Depends(request_deadline),
+):
+    """
+    Stream the enriched watchlist as NDJSON.
+
+    Each line is one item (same shape as the items of /watchlist/enriched),
+    in completion order: cached quotes first, then fetched quotes as they
+    arrive. Items still fetching when the request budget runs out are sent
+    last with their last known quote, flagged `stale`, as in
+    /watchlist/enriched.
+    """
+    items = {item.symbol: item for item in await _active_items(db)}
+
+    async def ndjson_lines():
+        async for symbol, quote in quote_cache.stream_within(list(items), deadline):
+            yield _enrich(items[symbol], quote).model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
 
 
 @watchlist_router.post("/", response_model=WatchlistItemResponse)
 async def add_to_watchlist(
     item: WatchlistItemCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Add a stock to the watchlist."""
-    existing = (
-        db.query(Watchlist)
-        .filter(Watchlist.symbol == item.symbol.upper())
-        .first()
-    )
+    existing = await db.scalar(select(Watchlist).where(Watchlist.symbol == item.symbol.upper()))
 
     if existing:
         # Reactivate if inactive
         existing.is_active = True
         existing.notes = item.notes
         existing.target_price = item.target_price
-        db.commit()
-        db.refresh(existing)
+        await db.commit()
+        await db.refresh(existing)
         return existing
 
     watchlist_item = Watchlist(
@@ -142,26 +231,22 @@ async def add_to_watchlist(
         target_price=item.target_price,
     )
     db.add(watchlist_item)
-    db.commit()
-    db.refresh(watchlist_item)
+    await db.commit()
+    await db.refresh(watchlist_item)
     return watchlist_item
 
 
 @watchlist_router.delete("/{symbol}")
 async def remove_from_watchlist(
     symbol: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Remove a stock from the watchlist (soft delete)."""
-    item = (
-        db.query(Watchlist)
-        .filter(Watchlist.symbol == symbol.upper())
-        .first()
-    )
+    item = await db.scalar(select(Watchlist).where(Watchlist.symbol == symbol.upper()))
 
     if not item:
         raise HTTPException(status_code=404, detail="Stock not in watchlist")
 
     item.is_active = False
-    db.commit()
+    await db.commit()
     return {"message": f"{symbol.upper()} removed from watchlist"}
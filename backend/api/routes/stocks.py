@@ -1,16 +1,26 @@
 """Stock screening and analysis endpoints."""
 
+import asyncio
+from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from pydantic import BaseModel
-
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database import get_async_db
+from services.conditional import cache_control, conditional, make_etag, until
+from services.deadline import Deadline, request_deadline
+from services.quote_service import quote_cache
+from services.response_cache import encoded_response, response_cache
+from services.screen_presets import get_preset
 from services.stock_service import (
     CONSERVATIVE_UNIVERSE,
+    UNIVERSE_TTL_SECONDS,
     ConservativeScreener,
     StockData,
-    fetch_multiple_stocks,
-    fetch_stock_data,
+    fresh_universe_snapshot,
+    get_universe_snapshot,
 )
 
 router = APIRouter(prefix="/stocks", tags=["Stocks"])
@@ -32,6 +42,13 @@ class Stock(BaseModel):
     fifty_two_week_low: Optional[float] = None
 
 
+class QuotedStock(Stock):
+    """Stock data with the time it was fetched."""
+
+    as_of: Optional[datetime] = None
+    stale: bool = False  # last known values, the fetch missed the request budget
+
+
 class StockScreenResponse(BaseModel):
     """Response model for stock screening."""
 
@@ -40,25 +57,21 @@ class StockScreenResponse(BaseModel):
     filters_applied: dict
 
 
-def stock_data_to_response(stock: StockData) -> Stock:
-    """Convert StockData to API response Stock."""
-    return Stock(
-        symbol=stock.symbol,
-        name=stock.name,
-        sector=stock.sector,
-        price=stock.price,
-        dividend_yield=stock.dividend_yield,
-        pe_ratio=stock.pe_ratio,
-        market_cap=stock.market_cap,
-        beta=stock.beta,
-        debt_to_equity=stock.debt_to_equity,
-        fifty_two_week_high=stock.fifty_two_week_high,
-        fifty_two_week_low=stock.fifty_two_week_low,
-    )
+# Response fields of a stock, copied straight from StockData when encoding
+STOCK_FIELDS = tuple(Stock.model_fields)
+
+
+def stock_row(stock: StockData) -> dict:
+    """The API response fields of a stock as a plain dict, encoded without a Stock copy."""
+    return {field: getattr(stock, field) for field in STOCK_FIELDS}
 
 
 @router.get("/screen", response_model=StockScreenResponse)
 async def screen_stocks(
+    response: Response,
+    preset: Optional[str] = Query(
+        None, description="Name of saved preferences to screen with"
+    ),
     sector: Optional[str] = Query(None, description="Filter by sector"),
     min_dividend_yield: Optional[float] = Query(
         None, description="Minimum dividend yield (%)"
@@ -73,6 +86,8 @@ async def screen_stocks(
     max_debt_to_equity: Optional[float] = Query(
         None, description="Maximum debt to equity ratio"
     ),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Screen stocks based on conservative investment criteria.
@@ -83,32 +98,65 @@ async def screen_stocks(
     The conservative stock universe includes blue-chip dividend-paying companies
     across sectors like Healthcare, Consumer Staples, Financials, Technology,
     Utilities, Industrials, Energy, and REITs.
+
+    Pass `preset` to screen with saved preferences (including all of their
+    preferred sectors); any other parameters given override the preset.
+
+    The ETag covers the snapshot version and the filters applied, so polling
+    with If-None-Match gets a 304 until the snapshot changes.
     """
-    # Fetch stock data for the conservative universe
-    stocks_data = fetch_multiple_stocks(CONSERVATIVE_UNIVERSE)
-
-    # Create screener with criteria
-    screener = ConservativeScreener(
-        min_dividend_yield=min_dividend_yield,
-        max_pe_ratio=max_pe_ratio,
-        min_market_cap=min_market_cap,
-        max_beta=max_beta,
-        max_debt_to_equity=max_debt_to_equity,
-        sector=sector,
-    )
+    # Screen the current universe snapshot (refetched on a worker thread once it goes stale)
+    snapshot = fresh_universe_snapshot() or await asyncio.to_thread(get_universe_snapshot)
+
+    criteria = {
+        "min_dividend_yield": min_dividend_yield,
+        "max_pe_ratio": max_pe_ratio,
+        "min_market_cap": min_market_cap,
+        "max_beta": max_beta,
+        "max_debt_to_equity": max_debt_to_equity,
+        "sector": sector,
+    }
+
+    if preset:
+        compiled = await get_preset(preset, db)
+        if compiled is None:
+            raise HTTPException(status_code=404, detail=f"Preset '{preset}' not found")
+        overrides = {k: v for k, v in criteria.items() if v is not None}
+        screener = compiled.screener.with_criteria(**overrides) if overrides else compiled.screener
+    else:
+        overrides = None
+        screener = ConservativeScreener(**criteria)
 
-    # Filter stocks
-    filtered = screener.screen(stocks_data)
     filters = screener.get_applied_filters()
+    if preset:
+        filters["preset"] = preset
+
+    # Presets can be edited at any time, so their screens are always revalidated
+    etag = make_etag("screen", snapshot.version, filters)
+    not_modified = conditional(
+        response,
+        if_none_match,
+        etag,
+        cache_control(None, private=True)
+        if preset
+        else cache_control(until(snapshot.fetched_at, UNIVERSE_TTL_SECONDS)),
+    )
+    if not_modified is not None:
+        return not_modified
 
-    # Convert to response format
-    response_stocks = [stock_data_to_response(s) for s in filtered]
+    def build() -> dict:
+        if preset and not overrides:
+            filtered = compiled.screen(snapshot)
+        else:
+            filtered = screener.screen(snapshot.stocks)
+        return {
+            "stocks": [stock_row(s) for s in filtered],
+            "total": len(filtered),
+            "filters_applied": filters,
+        }
 
-    return StockScreenResponse(
-        stocks=response_stocks,
-        total=len(response_stocks),
-        filters_applied=filters,
-    )
+    # Encoded once per snapshot version and filters, then served as bytes
+    return encoded_response(response_cache.get_or_encode(etag, build), response)
 
 
 @router.get("/universe", response_model=list[str])
@@ -128,36 +176,69 @@ async def get_available_sectors():
 
     Returns unique sectors found in the conservative stock universe.
     """
-    stocks = fetch_multiple_stocks(CONSERVATIVE_UNIVERSE)
+    stocks = (await asyncio.to_thread(get_universe_snapshot)).stocks
     sectors = sorted(set(s.sector for s in stocks if s.sector != "Unknown"))
     return sectors
 
 
+def _snapshot_row(symbol: str) -> tuple[Optional[StockData], Optional[str], Optional[datetime]]:
+    """A symbol's row in the current snapshot while it is fresh, with its version and expiry."""
+    snapshot = fresh_universe_snapshot()
+    if snapshot is None:
+        return None, None, None
+    stock = next((s for s in snapshot.stocks if s.symbol == symbol), None)
+    return stock, snapshot.version, until(snapshot.fetched_at, UNIVERSE_TTL_SECONDS)
+
+
 @router.get("/{symbol}", response_model=Stock)
-async def get_stock_details(symbol: str):
+async def get_stock_details(
+    symbol: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    deadline: Deadline = Depends(request_deadline),
+):
     """
     Get detailed information about a specific stock.
 
     Returns comprehensive data including price, dividend yield,
     P/E ratio, and other key metrics for conservative investors.
+
+    Universe stocks are served from the fresh snapshot, with an ETag from
+    its version. Other stocks come from the quote cache (fetched within the
+    request budget on a miss) and are tagged by when they were fetched, so a
+    revalidation of a cached quote never waits on upstream.
     """
-    stock = fetch_stock_data(symbol.upper())
+    symbol = symbol.upper()
+    stock, version, fresh_until = _snapshot_row(symbol)
+    if stock is None:
+        quote = (await quote_cache.get_within([symbol], deadline)).get(symbol)
+        if quote is not None:
+            stock, version = quote.stock, quote.as_of
+            fresh_until = None if quote.stale else until(quote.as_of, quote_cache.ttl)
 
     if not stock:
         raise HTTPException(
             status_code=404,
-            detail=f"Stock with symbol '{symbol.upper()}' not found or data unavailable",
+            detail=f"Stock with symbol '{symbol}' not found or data unavailable",
         )
 
-    return stock_data_to_response(stock)
+    etag = make_etag("stock", symbol, version)
+    not_modified = conditional(response, if_none_match, etag, cache_control(fresh_until))
+    if not_modified is not None:
+        return not_modified
+
+    return encoded_response(response_cache.get_or_encode(etag, lambda: stock_row(stock)), response)
 
 
 @router.get("/compare/{symbols}")
-async def compare_stocks(symbols: str):
+async def compare_stocks(symbols: str, deadline: Deadline = Depends(request_deadline)):
     """
     Compare multiple stocks side by side.
 
-    Provide comma-separated symbols (e.g., 'JNJ,PG,KO').
+    Provide comma-separated symbols (e.g., 'JNJ,PG,KO'). Stocks are fetched
+    within the request budget (REQUEST_BUDGET_SECONDS); any that miss it are
+    returned with their last known values, flagged `stale`, with `as_of`
+    giving when they were fetched.
     """
     symbol_list = [s.strip().upper() for s in symbols.split(",")]
 
@@ -167,7 +248,12 @@ async def compare_stocks(symbols: str):
             detail="Maximum 10 stocks can be compared at once",
         )
 
-    stocks = fetch_multiple_stocks(symbol_list)
+    quotes = await quote_cache.get_within(symbol_list, deadline)
+    stocks = [
+        QuotedStock.model_construct(**stock_row(quote.stock), as_of=quote.as_of, stale=quote.stale)
+        for quote in (quotes.get(symbol) for symbol in dict.fromkeys(symbol_list))
+        if quote is not None
+    ]
 
     if not stocks:
         raise HTTPException(
@@ -176,6 +262,6 @@ async def compare_stocks(symbols: str):
         )
 
     return {
-        "stocks": [stock_data_to_response(s) for s in stocks],
+        "stocks": stocks,
         "count": len(stocks),
     }
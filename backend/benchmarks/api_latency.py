@@ -0,0 +1,289 @@
+"""
+Latency and throughput of the API hot paths, offline, with regression checks.
+
+Runs the app in-process against the fake market data provider (or recorded
+responses replayed from --fixtures, see benchmarks.capture_market_data), a
+seeded throwaway SQLite database and the local LLM stub, then reports
+p50/p95/p99 latency and throughput for the screen, compare, portfolio (by
+holding count), alert check (by alert count) and analysis endpoints. Each
+scenario is warmed up before it is measured, so the numbers are for warm
+caches.
+
+--save-baseline writes the results to a JSON file. --baseline compares
+against one and exits non-zero if any scenario's p95 latency grew, or its
+throughput fell, by more than --tolerance. CPU time per request is reported
+alongside (process CPU over the measured requests, test client included).
+
+Run from the backend directory:
+
+    python -m benchmarks.api_latency --save-baseline benchmarks/baseline.json
+    python -m benchmarks.api_latency --baseline benchmarks/baseline.json --tolerance 0.25
+    python -m benchmarks.api_latency --fixtures market_data.jsonl.gz --replay-latency recorded
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+_db_dir = tempfile.mkdtemp(prefix="stratos-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_db_dir) / 'bench.db'}"
+os.environ.setdefault("MARKET_DATA_PROVIDER", "fake")
+os.environ["OPENAI_API_KEY"] = "stub"
+
+import httpx  # noqa: E402
+
+from api.main import app  # noqa: E402
+from models.database import SessionLocal, close_async_db, init_db  # noqa: E402
+from models.preferences import Alert, CachedAnalysis, PortfolioHolding  # noqa: E402
+from services.market_data import FakeProvider, get_provider, set_provider  # noqa: E402
+from services.market_replay import ReplayProvider  # noqa: E402
+from services.quote_service import quote_cache  # noqa: E402
+from services.stock_service import CONSERVATIVE_UNIVERSE, clear_universe_snapshot  # noqa: E402
+from tests.llm_stub import StubLLMServer  # noqa: E402
+
+ALERT_TYPES = ("price_above", "price_below", "percent_change")
+
+# Distinct symbols alerts are spread over, however many alerts there are
+ALERT_SYMBOLS = 500
+
+
+class Scenario(NamedTuple):
+    name: str
+    paths: list[str]
+    seed: Callable[[], None] = lambda: None
+
+
+def reset_db() -> None:
+    """Empty the tables the scenarios seed."""
+    db = SessionLocal()
+    try:
+        db.query(PortfolioHolding).delete()
+        db.query(Alert).delete()
+        db.query(CachedAnalysis).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def seed_holdings(count: int) -> Callable[[], None]:
+    def seed() -> None:
+        db = SessionLocal()
+        try:
+            db.add_all(
+                PortfolioHolding(symbol=f"H{i:04d}", shares=10 + i % 7, purchase_price=50.0 + i % 90)
+                for i in range(count)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    return seed
+
+
+def seed_alerts(count: int) -> Callable[[], None]:
+    def seed() -> None:
+        db = SessionLocal()
+        try:
+            for i in range(count):
+                alert_type = ALERT_TYPES[i % len(ALERT_TYPES)]
+                percent = alert_type == "percent_change"
+                db.add(
+                    Alert(
+                        symbol=f"A{i % ALERT_SYMBOLS:03d}",
+                        alert_type=alert_type,
+                        # Far from current prices, so checks do not trigger and write
+                        target_value=50.0 if percent else (1e6 if alert_type == "price_above" else 0.01),
+                        window_days=30 if percent and i % 2 else None,
+                        reference_price=100.0 if percent else None,
+                    )
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    return seed
+
+
+def scenarios(holdings: list[int], alerts: list[int]) -> list[Scenario]:
+    universe = CONSERVATIVE_UNIVERSE
+    return [
+        Scenario("screen", ["/api/v1/stocks/screen", "/api/v1/stocks/screen?max_beta=0.8"]),
+        Scenario("compare", ["/api/v1/stocks/compare/" + ",".join(universe[:5])]),
+        *(
+            Scenario(f"portfolio_{n}", ["/api/v1/portfolio/"], seed_holdings(n))
+            for n in holdings
+        ),
+        *(Scenario(f"alerts_{n}", ["/api/v1/alerts/check/all"], seed_alerts(n)) for n in alerts),
+        Scenario("analysis_quick", [f"/api/v1/analysis/quick/{s}" for s in universe[:10]]),
+        Scenario("analysis_top", ["/api/v1/analysis/top?limit=20"]),
+        Scenario("analysis_llm", [f"/api/v1/analysis/stock/{s}" for s in universe[:10]]),
+    ]
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def measure(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    allow_errors: bool = False,
+) -> dict:
+    """
+    Warm the scenario up, then time `requests` requests at `concurrency`.
+
+    Error responses fail the run, unless `allow_errors` (replay with injected
+    failures), in which case they are counted.
+    """
+    for i in range(max(warmup, len(scenario.paths))):
+        response = await client.get(scenario.paths[i % len(scenario.paths)])
+        if not allow_errors:
+            response.raise_for_status()
+
+    latencies: list[float] = []
+    errors = 0
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with slots:
+            start = time.perf_counter()
+            response = await client.get(scenario.paths[i % len(scenario.paths)])
+            latencies.append(time.perf_counter() - start)
+            if not allow_errors:
+                response.raise_for_status()
+            elif response.is_error:
+                errors += 1
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    cpu = time.process_time() - cpu_start
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        "requests": requests,
+        "throughput": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies_ms, 0.50), 3),
+        "p95_ms": round(percentile(latencies_ms, 0.95), 3),
+        "p99_ms": round(percentile(latencies_ms, 0.99), 3),
+        # Process CPU (all threads, client included) per request
+        "cpu_ms": round(cpu * 1000 / requests, 3),
+        "errors": errors,
+    }
+
+
+async def run(
+    selected: list[Scenario], requests: int, concurrency: int, warmup: int, allow_errors: bool
+) -> dict:
+    results = {}
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+    try:
+        for scenario in selected:
+            reset_db()
+            quote_cache.clear()
+            scenario.seed()
+            results[scenario.name] = await measure(
+                client, scenario, requests, concurrency, warmup, allow_errors
+            )
+            r = results[scenario.name]
+            print(
+                f"{scenario.name:<18} {r['throughput']:>9.1f} {r['p50_ms']:>9.2f}ms "
+                f"{r['p95_ms']:>9.2f}ms {r['p99_ms']:>9.2f}ms {r['cpu_ms']:>9.2f}ms {r['errors']:>7}"
+            )
+    finally:
+        await client.aclose()
+        await close_async_db()
+    return results
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Scenarios whose p95 latency or throughput moved past the tolerance."""
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            found.append(f"{name}: p95 {before['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms")
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            found.append(
+                f"{name}: throughput {before['throughput']:.1f} -> {result['throughput']:.1f} req/s"
+            )
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--holdings", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--alerts", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--only", nargs="+", help="Run only these scenarios")
+    parser.add_argument("--provider-latency-ms", type=float, default=0.0)
+    parser.add_argument("--fixtures", type=Path, help="Replay market data from this capture")
+    parser.add_argument("--replay-latency", default="0", help='"recorded" or milliseconds')
+    parser.add_argument("--replay-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-delay-ms", type=float, default=50.0)
+    parser.add_argument("--baseline", type=Path, help="Fail on regressions against this file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        set_provider(
+            ReplayProvider(
+                args.fixtures, latency=args.replay_latency, error_rate=args.replay_error_rate
+            )
+        )
+    elif isinstance(get_provider(), FakeProvider):
+        set_provider(FakeProvider(latency_ms=args.provider_latency_ms))
+    selected = [
+        s for s in scenarios(args.holdings, args.alerts) if not args.only or s.name in args.only
+    ]
+    init_db()
+    clear_universe_snapshot()
+
+    print(f"provider: {get_provider().name}, {args.requests} requests per scenario at {args.concurrency}")
+    print(f"{'scenario':<18} {'req/s':>9} {'p50':>11} {'p95':>11} {'p99':>11} {'cpu':>11} {'errors':>7}")
+    with StubLLMServer(delay=args.llm_delay_ms / 1000) as llm:
+        os.environ["OPENAI_BASE_URL"] = llm.base_url
+        results = asyncio.run(
+            run(
+                selected,
+                args.requests,
+                args.concurrency,
+                args.warmup,
+                allow_errors=args.replay_error_rate > 0,
+            )
+        )
+
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        baseline: Optional[dict] = json.loads(args.baseline.read_text())
+        found = regressions(results, baseline, args.tolerance)
+        if found:
+            print(f"Regressions beyond {args.tolerance:.0%}:")
+            for line in found:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Record market data fixtures for offline, reproducible benchmark runs.
+
+Fetches quote info and one batch of daily history for the screening
+universe (plus any extra symbols) from the configured provider, Yahoo by
+default, through the capture provider, and appends the raw responses with
+their timestamps and latencies to a gzip JSON-lines archive. Replay them with
+MARKET_DATA_PROVIDER=replay or `benchmarks.api_latency --fixtures`.
+
+Run from the backend directory:
+
+    python -m benchmarks.capture_market_data --out market_data.jsonl.gz --rounds 2
+"""
+
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+os.environ["MARKET_DATA_CAPTURE"] = "false"
+
+from services.market_data import get_provider  # noqa: E402
+from services.market_replay import CaptureProvider, ReplayProvider  # noqa: E402
+from services.price_history import HISTORY_DAYS  # noqa: E402
+from services.stock_service import CONSERVATIVE_UNIVERSE  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", type=Path, default=Path("market_data.jsonl.gz"))
+    parser.add_argument("--symbols", nargs="+", default=[], help="Symbols besides the universe")
+    parser.add_argument("--history-days", type=int, default=HISTORY_DAYS)
+    parser.add_argument(
+        "--rounds", type=int, default=1, help="Times each quote is recorded (replayed in turn)"
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    symbols = list(dict.fromkeys([*CONSERVATIVE_UNIVERSE, *args.symbols]))
+    capture = CaptureProvider(get_provider(), args.out)
+    print(f"Recording {len(symbols)} symbols x {args.rounds} from {capture.name} into {args.out}")
+
+    def record_info(symbol: str) -> None:
+        try:
+            capture.info(symbol)
+        except Exception as e:
+            print(f"  {symbol}: {type(e).__name__}: {e} (recorded)")
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for _ in range(args.rounds):
+            list(pool.map(record_info, symbols))
+    capture.history(symbols, args.history_days)
+    capture.flush()
+
+    replay = ReplayProvider(args.out)
+    print(f"Archive holds {len(replay.keys())} keys, {args.out.stat().st_size / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
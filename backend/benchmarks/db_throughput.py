@@ -0,0 +1,120 @@
+"""
+Read/write throughput of each database engine profile.
+
+For every profile, creates a fresh schema and measures single-row commit
+throughput, point-read throughput and a mixed read/write workload from
+several threads (counting lock errors). Uses a throwaway SQLite file by
+default; pass --url to benchmark PostgreSQL (the tables are dropped and
+recreated, so point it at a scratch database).
+
+Run from the backend directory:
+
+    python -m benchmarks.db_throughput --writes 2000 --reads 5000 --threads 8
+"""
+
+import argparse
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from models.database import PROFILES, Base, create_db_engine
+from models.preferences import Alert
+
+
+def write_rows(Session, count: int) -> float:
+    """Insert rows one transaction at a time; returns commits per second."""
+    start = time.perf_counter()
+    for i in range(count):
+        with Session() as db:
+            db.add(Alert(symbol=f"W{i % 500}", alert_type="price_above", target_value=float(i)))
+            db.commit()
+    return count / (time.perf_counter() - start)
+
+
+def read_rows(Session, count: int, max_id: int) -> float:
+    """Look up random rows by primary key; returns reads per second."""
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(count):
+        with Session() as db:
+            db.get(Alert, rng.randint(1, max_id))
+    return count / (time.perf_counter() - start)
+
+
+def mixed(Session, threads: int, seconds: float, write_ratio: float = 0.2) -> tuple[float, int]:
+    """Run concurrent readers/writers; returns (ops per second, lock errors)."""
+    ops = [0] * threads
+    errors = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(n: int) -> None:
+        rng = random.Random(n)
+        while time.perf_counter() < deadline:
+            try:
+                with Session() as db:
+                    if rng.random() < write_ratio:
+                        db.add(Alert(symbol=f"M{n}", alert_type="price_below", target_value=1.0))
+                        db.commit()
+                    else:
+                        db.scalars(select(Alert).where(Alert.symbol == f"W{rng.randint(0, 499)}")).all()
+                ops[n] += 1
+            except OperationalError:
+                errors[n] += 1
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return sum(ops) / (time.perf_counter() - start), sum(errors)
+
+
+def run(url: str, profile: str, args) -> dict:
+    engine = create_db_engine(url, profile)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    try:
+        writes = write_rows(Session, args.writes)
+        reads = read_rows(Session, args.reads, args.writes)
+        mixed_ops, lock_errors = mixed(Session, args.threads, args.seconds)
+    finally:
+        engine.dispose()
+    return {
+        "profile": profile,
+        "writes": writes,
+        "reads": reads,
+        "mixed": mixed_ops,
+        "errors": lock_errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Database URL (default: temporary SQLite file per profile)")
+    parser.add_argument("--writes", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=PROFILES)
+    args = parser.parse_args()
+
+    print(f"{'profile':<9} {'commits/s':>10} {'reads/s':>10} {'mixed ops/s':>12} {'lock errors':>12}")
+    for profile in args.profiles:
+        url = args.url or f"sqlite:///{Path(tempfile.mkdtemp(prefix='stratos-db-')) / 'bench.db'}"
+        r = run(url, profile, args)
+        print(
+            f"{r['profile']:<9} {r['writes']:>10.0f} {r['reads']:>10.0f} "
+            f"{r['mixed']:>12.0f} {r['errors']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
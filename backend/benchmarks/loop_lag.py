@@ -0,0 +1,162 @@
+"""
+Event-loop lag under concurrent database load, sync Session vs AsyncSession.
+
+Seeds a throwaway SQLite database, then runs the same read/write workload
+from many concurrent tasks while a probe measures how late the event loop
+wakes up. The "sync" mode runs queries with a blocking Session directly in
+the coroutines, as the routes used to; "async" uses an AsyncSession; "app"
+drives the real alerts/portfolio/watchlist routes in-process.
+
+With --block-threshold the blocking-call detector also runs and the code
+locations that held the loop longer than the threshold are listed per mode.
+
+Run from the backend directory:
+
+    python -m benchmarks.loop_lag --rows 2000 --concurrency 50 --requests 600 --block-threshold 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+_db_dir = tempfile.mkdtemp(prefix="stratos-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_db_dir) / 'bench.db'}"
+
+import httpx  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from api.main import app  # noqa: E402
+from models.database import AsyncSessionLocal, SessionLocal, close_async_db, init_db  # noqa: E402
+from models.preferences import Alert, PortfolioHolding, Watchlist  # noqa: E402
+from services.loop_monitor import BlockingCallDetector, blocked_counter  # noqa: E402
+
+PROBE_INTERVAL = 0.005
+
+
+def seed(rows: int) -> None:
+    """Fill the database with alerts, holdings and watchlist items."""
+    init_db()
+    db = SessionLocal()
+    try:
+        db.query(Alert).delete()
+        db.query(PortfolioHolding).delete()
+        db.query(Watchlist).delete()
+        for i in range(rows):
+            symbol = f"S{i:05d}"
+            db.add(Alert(symbol=symbol, alert_type="price_above", target_value=100.0 + i))
+            db.add(PortfolioHolding(symbol=symbol, shares=10, purchase_price=50.0))
+            db.add(Watchlist(symbol=symbol))
+        db.commit()
+    finally:
+        db.close()
+
+
+def sync_request(i: int) -> None:
+    """One request's worth of queries on a blocking session."""
+    db = SessionLocal()
+    try:
+        db.execute(select(Alert).where(Alert.is_active == True)).scalars().all()
+        db.execute(select(PortfolioHolding)).scalars().all()
+        if i % 10 == 0:
+            db.add(Watchlist(symbol=f"W{i}"))
+            db.commit()
+    finally:
+        db.close()
+
+
+async def async_request(i: int) -> None:
+    """The same queries on an async session."""
+    async with AsyncSessionLocal() as db:
+        (await db.scalars(select(Alert).where(Alert.is_active == True))).all()
+        (await db.scalars(select(PortfolioHolding))).all()
+        if i % 10 == 0:
+            db.add(Watchlist(symbol=f"W{i}"))
+            await db.commit()
+
+
+async def probe(lags: list[float], stop: asyncio.Event) -> None:
+    """Record how late each fixed-interval wake-up is."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(loop.time() - start - PROBE_INTERVAL)
+
+
+async def run(mode: str, requests: int, concurrency: int, block_threshold: float = 0.0) -> dict:
+    slots = asyncio.Semaphore(concurrency)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+    paths = ["/api/v1/alerts/", "/api/v1/portfolio/holdings", "/api/v1/watchlist/"]
+
+    async def one(i: int) -> None:
+        async with slots:
+            if mode == "sync":
+                sync_request(i)
+                await asyncio.sleep(0)
+            elif mode == "async":
+                await async_request(i)
+            else:
+                response = await client.get(paths[i % len(paths)])
+                response.raise_for_status()
+
+    detector = BlockingCallDetector(block_threshold) if block_threshold > 0 else None
+    blocked_before = {labels["location"]: value for labels, value in blocked_counter.samples()}
+    if detector is not None:
+        detector.start()
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    if detector is not None:
+        await detector.stop()
+    await client.aclose()
+    await close_async_db()
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    return {
+        "mode": mode,
+        "throughput": requests / elapsed,
+        "lag_p50_ms": statistics.median(lags_ms),
+        "lag_p99_ms": lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))],
+        "lag_max_ms": lags_ms[-1],
+        "probes": len(lags),
+        "blocked": {
+            labels["location"]: int(value - blocked_before.get(labels["location"], 0))
+            for labels, value in blocked_counter.samples()
+            if value > blocked_before.get(labels["location"], 0)
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async", "app"])
+    parser.add_argument("--block-threshold", type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'req/s':>8} {'lag p50':>9} {'lag p99':>9} {'lag max':>9} {'probes':>7}")
+    for mode in args.modes:
+        seed(args.rows)
+        r = asyncio.run(run(mode, args.requests, args.concurrency, args.block_threshold))
+        print(
+            f"{r['mode']:<6} {r['throughput']:>8.1f} {r['lag_p50_ms']:>7.1f}ms "
+            f"{r['lag_p99_ms']:>7.1f}ms {r['lag_max_ms']:>7.1f}ms {r['probes']:>7}"
+        )
+        for location, count in sorted(r["blocked"].items(), key=lambda item: -item[1]):
+            print(f"       blocked {count:>4}x at {location}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Upstream load of the universe snapshot across API worker processes.
+
+Starts several worker processes that read the universe snapshot in a loop
+for a fixed time against a fake upstream (fixed latency per symbol), once
+with a per-process snapshot and once with SHARED_SNAPSHOT_PATH set, and
+reports upstream fetches, universe refreshes and snapshot read latency.
+
+Run from the backend directory:
+
+    python -m benchmarks.shared_snapshot --workers 4 --seconds 5 --ttl 1
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+
+def worker(shared_path: str, ttl: float, latency: float, seconds: float, start, fetches, results) -> None:
+    # Configure before the services are imported (spawned processes start clean)
+    os.environ["UNIVERSE_TTL_SECONDS"] = str(ttl)
+    os.environ["SHARED_SNAPSHOT_PATH"] = shared_path
+
+    from unittest.mock import patch
+
+    from services import stock_service
+    from services.stock_service import StockData, get_universe_snapshot
+
+    def fake_fetch(symbol: str) -> StockData:
+        with fetches.get_lock():
+            fetches.value += 1
+        time.sleep(latency)
+        return StockData(symbol=symbol, name=symbol, sector="Utilities", price=100.0, beta=0.6)
+
+    with patch.object(stock_service, "fetch_stock_data", fake_fetch), patch(
+        "services.fundamentals_store.persist_universe"
+    ):
+        start.wait()
+        reads = []
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            t = time.perf_counter()
+            get_universe_snapshot()
+            reads.append(time.perf_counter() - t)
+            time.sleep(0.01)
+    results.put(reads)
+
+
+def run(shared: bool, args) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    shared_path = str(Path(tempfile.mkdtemp()) / "universe.snapshot") if shared else ""
+    start = ctx.Barrier(args.workers)
+    fetches = ctx.Value("i", 0)
+    results = ctx.Queue()
+
+    procs = [
+        ctx.Process(
+            target=worker,
+            args=(shared_path, args.ttl, args.latency, args.seconds, start, fetches, results),
+        )
+        for _ in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    reads = [t for _ in procs for t in results.get()]
+    for p in procs:
+        p.join()
+
+    from services.stock_service import CONSERVATIVE_UNIVERSE
+
+    reads.sort()
+    return {
+        "fetches": fetches.value,
+        "refreshes": fetches.value / len(CONSERVATIVE_UNIVERSE),
+        "reads": len(reads),
+        "p50": statistics.median(reads),
+        "p99": reads[int(len(reads) * 0.99)],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--ttl", type=float, default=1.0, help="UNIVERSE_TTL_SECONDS")
+    parser.add_argument("--latency", type=float, default=0.005, help="fake upstream seconds per symbol")
+    args = parser.parse_args()
+
+    print(f"{'mode':<12} {'upstream':>9} {'refreshes':>10} {'reads':>7} {'p50':>9} {'p99':>9}")
+    for shared in (False, True):
+        r = run(shared, args)
+        print(
+            f"{'shared' if shared else 'per-process':<12} {r['fetches']:>9} {r['refreshes']:>10.1f} "
+            f"{r['reads']:>7} {r['p50'] * 1000:>7.2f}ms {r['p99'] * 1000:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Startup-time report for the API process.
+
+Imports `api.main` in fresh interpreters with `-X importtime`, then prints
+the median wall-clock import time and the slowest modules by cumulative
+import time, flagging any heavy dependency that was loaded eagerly.
+
+Run from the backend directory:
+
+    python -m benchmarks.startup_time --runs 5 --top 15
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from services.lazy_imports import HEAVY_MODULES
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+
+def import_profile() -> tuple[float, dict[str, int]]:
+    """Return (wall seconds, {module: cumulative microseconds}) for one import."""
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{Path(tempfile.mkdtemp()) / 'startup.db'}"}
+    code = "import time; t = time.perf_counter(); import api.main; print(time.perf_counter() - t)"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # Lines look like "import time:   self [us] | cumulative | module"
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        cumulative[parts[2].strip()] = int(parts[1])
+    return float(result.stdout.strip().splitlines()[-1]), cumulative
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    times = [seconds for seconds, _ in profiles]
+    print(
+        f"import api.main: median {statistics.median(times) * 1000:.0f}ms, "
+        f"min {min(times) * 1000:.0f}ms over {args.runs} runs"
+    )
+
+    cumulative = profiles[-1][1]
+    top_level = {m: us for m, us in cumulative.items() if "." not in m}
+    print("\nSlowest top-level imports (cumulative):")
+    for module, us in sorted(top_level.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"  {us / 1000:>8.1f}ms  {module}")
+
+    eager = [m for m in HEAVY_MODULES if m in cumulative]
+    print(f"\nHeavy modules imported eagerly: {', '.join(eager) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
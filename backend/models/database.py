@@ -1,20 +1,173 @@
 """Database configuration and session management."""
 
+import logging
 import os
+import time
 from pathlib import Path
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
-# Database path - use project data directory
+from services import metrics, profiler, tracing
+
+logger = logging.getLogger(__name__)
+
+query_histogram = metrics.histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time by statement type",
+    ("statement",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+# Database path - use project data directory (created on first connect)
 DATA_DIR = Path(__file__).parent.parent / "data"
-DATA_DIR.mkdir(exist_ok=True)
 
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DATA_DIR}/stratos.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Async drivers used by the API for each sync database URL scheme
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Translate a sync database URL to its async driver equivalent."""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}{sep}{rest}"
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_database_url(DATABASE_URL))
+
+# Engine profile: "tuned" applies the settings below, "baseline" uses driver defaults
+PROFILES = ("tuned", "baseline")
+DB_PROFILE = os.getenv("DB_PROFILE", "tuned")
+
+# SQLite tuning, applied as pragmas on every new connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# PostgreSQL pool and timeout tuning
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+
+def sqlite_pragmas() -> dict[str, object]:
+    """Pragmas set on each SQLite connection under the tuned profile."""
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": SQLITE_MMAP_SIZE,
+        # Negative cache_size is in KiB rather than pages
+        "cache_size": -SQLITE_CACHE_SIZE_KB,
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "temp_store": "MEMORY",
+    }
+
+
+def engine_options(url: str, profile: str = DB_PROFILE) -> dict:
+    """Keyword arguments for create_engine/create_async_engine for a URL and profile."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {PROFILES}")
+
+    parsed = make_url(url)
+    backend, driver = parsed.get_backend_name(), parsed.get_driver_name()
+    options: dict = {}
+
+    if backend == "sqlite":
+        if driver != "aiosqlite":
+            options["connect_args"] = {"check_same_thread": False}
+    elif backend == "postgresql" and profile == "tuned":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+        if driver == "asyncpg":
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+            }
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+
+    return options
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time (and trace) every statement the engine executes into db_query_duration_seconds."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+        context._query_start_ns = time.time_ns()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_timer(conn, cursor, statement, parameters, context, executemany):
+        keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        elapsed = time.perf_counter() - context._query_start
+        query_histogram.observe(elapsed, statement=keyword)
+        profiler.record("db", keyword, elapsed)
+        tracing.record(
+            f"db.{keyword}",
+            context._query_start_ns,
+            time.time_ns(),
+            kind="client",
+            **{"db.system": engine.dialect.name, "db.statement": statement[:500]},
+        )
+
+
+def configure_engine(engine: Engine, profile: str = DB_PROFILE) -> Engine:
+    """Attach per-connection setup (SQLite directory creation, tuned-profile pragmas) and query timing."""
+    instrument_engine(engine)
+    database = engine.url.database
+    if engine.dialect.name == "sqlite" and database and database != ":memory:":
+
+        @event.listens_for(engine, "do_connect")
+        def _ensure_sqlite_dir(dialect, conn_rec, cargs, cparams):
+            Path(database).parent.mkdir(parents=True, exist_ok=True)
+
+    if profile == "tuned" and engine.dialect.name == "sqlite":
+        pragmas = sqlite_pragmas()
+
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    return engine
+
+
+def create_db_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE) -> Engine:
+    """Create a sync engine with the given profile applied."""
+    return configure_engine(create_engine(url, **engine_options(url, profile)), profile)
+
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL, profile: str = DB_PROFILE) -> AsyncEngine:
+    """Create an async engine with the given profile applied."""
+    async_engine = create_async_engine(url, **engine_options(url, profile))
+    configure_engine(async_engine.sync_engine, profile)
+    return async_engine
+
+
+# Sync engine for scripts, startup and background workers
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers, so DB I/O never blocks the event loop
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 class Base(DeclarativeBase):
     """Base class for all database models."""
@@ -31,6 +184,44 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency that provides an async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+
+
+def add_missing_columns(bind: Engine = engine) -> list[str]:
+    """
+    Add nullable columns that exist on a model but not in its table yet.
+
+    create_all() only creates missing tables, so databases created before a
+    column was added would otherwise fail on every query touching it.
+    """
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    added = []
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable or column.primary_key:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                added.append(f"{table.name}.{column.name}")
+    if added:
+        logger.info(f"Added missing columns: {', '.join(added)}")
+    return added
+
+
+async def close_async_db():
+    """Dispose of the async engine's pooled connections."""
+    await async_engine.dispose()
@@ -54,9 +54,34 @@ class CachedStock(Base):
     market_cap = Column(Float, nullable=True)
     beta = Column(Float, nullable=True)
     debt_to_equity = Column(Float, nullable=True)
+    fifty_two_week_high = Column(Float, nullable=True)
+    fifty_two_week_low = Column(Float, nullable=True)
+    forward_pe = Column(Float, nullable=True)
+    payout_ratio = Column(Float, nullable=True)
+    revenue_growth = Column(Float, nullable=True)
+    profit_margin = Column(Float, nullable=True)
+    previous_close = Column(Float, nullable=True)
     last_updated = Column(DateTime, default=datetime.utcnow)
 
 
+class CachedAnalysis(Base):
+    """SQLAlchemy model for cached LLM stock analyses."""
+
+    __tablename__ = "analysis_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, unique=True, index=True)
+    symbol = Column(String, index=True)
+    fingerprint = Column(String)
+    prompt_version = Column(String)
+    result = Column(JSON)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
 class PortfolioHolding(Base):
     """SQLAlchemy model for portfolio holdings."""
 
@@ -123,6 +148,35 @@ class WatchlistItemResponse(BaseModel):
     is_active: bool
 
 
+class WatchlistItemEnriched(WatchlistItemResponse):
+    """Watchlist item with a live quote and key fundamentals."""
+
+    name: Optional[str] = None
+    sector: Optional[str] = None
+    price: Optional[float] = None
+    previous_close: Optional[float] = None
+    day_change: Optional[float] = None
+    day_change_percent: Optional[float] = None
+    target_distance: Optional[float] = None  # target_price - price
+    target_distance_percent: Optional[float] = None  # move needed to reach target
+    dividend_yield: Optional[float] = None
+    pe_ratio: Optional[float] = None
+    market_cap: Optional[float] = None
+    beta: Optional[float] = None
+    fifty_two_week_high: Optional[float] = None
+    fifty_two_week_low: Optional[float] = None
+    quote_available: bool = False
+    stale: bool = False  # last known values, the fetch missed the request budget
+
+
+class EnrichedWatchlistResponse(BaseModel):
+    """Enriched watchlist with quote freshness."""
+
+    items: list[WatchlistItemEnriched]
+    total: int
+    as_of: datetime
+
+
 class PortfolioHoldingCreate(BaseModel):
     """Schema for adding a portfolio holding."""
 
@@ -166,6 +220,8 @@ class PortfolioSummary(BaseModel):
     total_gain_loss_percent: float
     holdings_count: int
     holdings: list["PortfolioHoldingWithValue"]
+    as_of: Optional[datetime] = None  # oldest price used
+    stale: bool = False  # any holding valued at a last known price
 
 
 class PortfolioHoldingWithValue(BaseModel):
@@ -184,6 +240,8 @@ class PortfolioHoldingWithValue(BaseModel):
     current_value: Optional[float] = None
     gain_loss: Optional[float] = None
     gain_loss_percent: Optional[float] = None
+    as_of: Optional[datetime] = None  # when current_price was fetched
+    stale: bool = False  # current_price is a last known value
 
 
 class Alert(Base):
@@ -195,6 +253,8 @@ class Alert(Base):
     symbol = Column(String, index=True)
     alert_type = Column(String)  # "price_above", "price_below", "percent_change"
     target_value = Column(Float)
+    window_days = Column(Integer, nullable=True)  # percent_change window, None = since creation
+    reference_price = Column(Float, nullable=True)  # price captured at creation
     is_active = Column(Boolean, default=True)
     is_triggered = Column(Boolean, default=False)
     triggered_at = Column(DateTime, nullable=True)
@@ -202,12 +262,31 @@ class Alert(Base):
     notes = Column(String, nullable=True)
 
 
+class AlertNotification(Base):
+    """SQLAlchemy model for the alert notification outbox."""
+
+    __tablename__ = "alert_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    alert_id = Column(Integer, index=True)
+    idempotency_key = Column(String, unique=True, index=True)
+    payload = Column(JSON)
+    status = Column(String, default="pending", index=True)  # "pending", "delivered", "failed"
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_error = Column(String, nullable=True)
+    delivered_sinks = Column(JSON, nullable=True)  # names of sinks that already have it
+    created_at = Column(DateTime, default=datetime.utcnow)
+    delivered_at = Column(DateTime, nullable=True)
+
+
 class AlertCreate(BaseModel):
     """Schema for creating an alert."""
 
     symbol: str
     alert_type: str  # "price_above", "price_below", "percent_change"
     target_value: float
+    window_days: Optional[int] = None  # percent_change only, None = since creation
     notes: Optional[str] = None
 
 
@@ -220,6 +299,8 @@ class AlertResponse(BaseModel):
     symbol: str
     alert_type: str
     target_value: float
+    window_days: Optional[int] = None
+    reference_price: Optional[float] = None
     is_active: bool
     is_triggered: bool
     triggered_at: Optional[datetime] = None
@@ -232,5 +313,20 @@ class AlertCheck(BaseModel):
 
     alert: AlertResponse
     current_price: Optional[float] = None
+    reference_price: Optional[float] = None
+    percent_change: Optional[float] = None
     should_trigger: bool
     message: str
+
+
+class OutboxStats(BaseModel):
+    """Schema for notification outbox and delivery worker status."""
+
+    queue_depth: int
+    failed: int
+    delivered_total: int
+    failed_total: int
+    retries_total: int
+    batches_total: int
+    delivery_rate_per_sec: float
+    worker_running: bool
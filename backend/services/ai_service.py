@@ -1,17 +1,29 @@
 """AI-powered stock analysis and recommendation service."""
 
+import asyncio
 import json
 import logging
 import os
-from typing import Optional
+import time
+import weakref
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Optional
 
-from openai import OpenAI
 from pydantic import BaseModel
 
+from services import llm_telemetry
+from services.analysis_cache import analysis_cache
+from services.lazy_imports import lazy_import
 from services.stock_service import StockData
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
 logger = logging.getLogger(__name__)
 
+# The OpenAI SDK is slow to import; load it when the first client is created
+openai = lazy_import("openai")
+httpx = lazy_import("httpx")
+
 
 class StockRecommendation(BaseModel):
     """AI-generated stock recommendation."""
@@ -37,36 +49,101 @@ class PortfolioAnalysis(BaseModel):
     sector_allocation: dict[str, float]
 
 
-def get_openai_client() -> Optional[OpenAI]:
-    """Get OpenAI client if API key is configured."""
+OPENAI_MODEL = "gpt-4o-mini"
+
+# Maximum concurrent LLM requests (also the HTTP connection pool size)
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+
+# Deadline for a single analysis, including time spent waiting for a slot
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "20"))
+
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "1"))
+
+# One client per event loop (its connection pool is bound to the loop), closed by
+# close_openai_client on that loop; entries go away with their loop
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+_semaphore: Optional[asyncio.Semaphore] = None
+_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_openai_client() -> Optional["AsyncOpenAI"]:
+    """
+    Get the shared async OpenAI client if an API key is configured.
+
+    The client is created once per event loop and keeps a pooled HTTP
+    connection set alive between requests. Set OPENAI_BASE_URL to point it at
+    a compatible server (e.g. a local stub in tests).
+    """
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         logger.warning("OPENAI_API_KEY not configured")
         return None
-    return OpenAI(api_key=api_key)
 
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            timeout=OPENAI_TIMEOUT_SECONDS,
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONCURRENCY,
+                    max_keepalive_connections=OPENAI_MAX_CONCURRENCY,
+                ),
+                timeout=OPENAI_TIMEOUT_SECONDS,
+            ),
+        )
+    return client
 
-def analyze_stock(stock: StockData) -> StockRecommendation:
-    """Generate AI-powered analysis for a single stock."""
-    client = get_openai_client()
 
-    if not client:
-        # Return rule-based recommendation if no API key
-        return _rule_based_recommendation(stock)
+def _get_semaphore() -> asyncio.Semaphore:
+    """Get the per-event-loop limiter on concurrent LLM requests."""
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+        _semaphore_loop = loop
+    return _semaphore
+
+
+async def close_openai_client() -> None:
+    """Close the running loop's shared client and its connection pool."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"Error closing OpenAI client: {e}")
+
+
+# Bump whenever the prompt or model changes so cached analyses are not reused
+PROMPT_VERSION = "2"
 
-    prompt = f"""Analyze this stock for a conservative long-term investor (10+ year horizon):
+SYSTEM_PROMPT = "You are a conservative investment analyst focusing on dividend-paying blue-chip stocks for long-term investors. Respond only with valid JSON."
 
-Stock: {stock.symbol} - {stock.name}
+
+def _format_metric(value: Optional[float], fmt: str) -> str:
+    """Format an optional metric for the prompt, using N/A when missing."""
+    return fmt.format(value) if value is not None else "N/A"
+
+
+def _stock_metrics_block(stock: StockData) -> str:
+    """Render the metrics section of a prompt for one stock."""
+    return f"""Stock: {stock.symbol} - {stock.name}
 Sector: {stock.sector}
 Current Price: ${stock.price:.2f}
-Dividend Yield: {stock.dividend_yield:.2f}% if stock.dividend_yield else "N/A"
-P/E Ratio: {stock.pe_ratio:.1f} if stock.pe_ratio else "N/A"
-Market Cap: ${stock.market_cap:.1f}B if stock.market_cap else "N/A"
-Beta: {stock.beta:.2f} if stock.beta else "N/A"
-Debt/Equity: {stock.debt_to_equity:.1f}% if stock.debt_to_equity else "N/A"
+Dividend Yield: {_format_metric(stock.dividend_yield, "{:.2f}%")}
+P/E Ratio: {_format_metric(stock.pe_ratio, "{:.1f}")}
+Market Cap: {_format_metric(stock.market_cap, "${:.1f}B")}
+Beta: {_format_metric(stock.beta, "{:.2f}")}
+Debt/Equity: {_format_metric(stock.debt_to_equity, "{:.1f}%")}"""
 
-Provide analysis in JSON format:
-{{
+
+ANALYSIS_JSON_FORMAT = """{
     "recommendation": "strong_buy|buy|hold|sell|strong_sell",
     "confidence": 0.0-1.0,
     "summary": "2-3 sentence summary",
@@ -74,31 +151,415 @@ Provide analysis in JSON format:
     "cons": ["con1", "con2"],
     "target_price": null or number,
     "risk_level": "low|medium|high"
-}}
+}"""
 
-Focus on dividend stability, value metrics, and long-term growth potential for conservative investors."""
+PROMPT_FOCUS = "Focus on dividend stability, value metrics, and long-term growth potential for conservative investors."
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
+
+def build_stock_prompt(stock: StockData) -> str:
+    """Build the analysis prompt for a single stock."""
+    return f"""Analyze this stock for a conservative long-term investor (10+ year horizon):
+
+{_stock_metrics_block(stock)}
+
+Provide analysis in JSON format:
+{ANALYSIS_JSON_FORMAT}
+
+{PROMPT_FOCUS}"""
+
+
+def build_packed_prompt(stocks: list[StockData]) -> str:
+    """Build one prompt that asks for analyses of several stocks at once."""
+    blocks = "\n\n".join(_stock_metrics_block(stock) for stock in stocks)
+    return f"""Analyze each of these {len(stocks)} stocks for a conservative long-term investor (10+ year horizon):
+
+{blocks}
+
+Provide analysis in JSON format as {{"analyses": [...]}}, with one object per stock in the same order, each including its "symbol" and these fields:
+{ANALYSIS_JSON_FORMAT}
+
+{PROMPT_FOCUS}"""
+
+
+async def _create_completion(client: "AsyncOpenAI", prompt: str, max_tokens: int = 500):
+    """Send a chat completion once a concurrency slot is free."""
+    queued_at = time.perf_counter()
+    async with _get_semaphore():
+        llm_telemetry.queue_wait_histogram.observe(time.perf_counter() - queued_at)
+        return await client.chat.completions.create(
+            model=OPENAI_MODEL,
             messages=[
-                {
-                    "role": "system",
-                    "content": "You are a conservative investment analyst focusing on dividend-paying blue-chip stocks for long-term investors. Respond only with valid JSON.",
-                },
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.3,
-            max_tokens=500,
+            max_tokens=max_tokens,
         )
 
-        result = json.loads(response.choices[0].message.content)
-        return StockRecommendation(symbol=stock.symbol, **result)
 
+async def _timed_completion(
+    client: "AsyncOpenAI", prompt: str, operation: str, symbols: list[str], max_tokens: int = 500
+) -> tuple[Optional[str], object, str, float]:
+    """
+    Run a completion under the deadline and classify transport failures.
+
+    Returns (content, usage, outcome, started_at), where content is None and
+    outcome is "timeout" or "error" if no response arrived.
+    """
+    started_at = time.perf_counter()
+    try:
+        response = await asyncio.wait_for(
+            _create_completion(client, prompt, max_tokens), OPENAI_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"AI {operation} for {', '.join(symbols)} exceeded {OPENAI_TIMEOUT_SECONDS}s deadline"
+        )
+        return None, None, "timeout", started_at
+    except Exception as e:
+        logger.error(f"AI {operation} failed for {', '.join(symbols)}: {e}")
+        return None, None, "error", started_at
+    return response.choices[0].message.content, response.usage, "success", started_at
+
+
+def _parse_recommendation(symbol: str, result) -> tuple[Optional[StockRecommendation], str]:
+    """Validate one analysis object, returning (recommendation, outcome)."""
+    if not isinstance(result, dict):
+        return None, "invalid_response"
+    result = {k: v for k, v in result.items() if k != "symbol"}
+    try:
+        return StockRecommendation(symbol=symbol, **result), "success"
     except Exception as e:
-        logger.error(f"AI analysis failed for {stock.symbol}: {e}")
+        logger.warning(f"Invalid AI analysis for {symbol}: {e}")
+        return None, "invalid_response"
+
+
+async def _llm_analysis(client: "AsyncOpenAI", stock: StockData) -> StockRecommendation:
+    """Analyze one stock with the LLM, caching the result or falling back to rules."""
+    content, usage, outcome, started_at = await _timed_completion(
+        client, build_stock_prompt(stock), "analysis", [stock.symbol]
+    )
+
+    recommendation = None
+    if content is not None:
+        try:
+            recommendation, outcome = _parse_recommendation(stock.symbol, json.loads(content))
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.error(f"AI analysis for {stock.symbol} returned invalid JSON: {e}")
+            outcome = "invalid_json"
+
+    llm_telemetry.record_llm_call(
+        OPENAI_MODEL, "analysis", outcome, time.perf_counter() - started_at, usage, [stock.symbol]
+    )
+
+    if recommendation is None:
+        llm_telemetry.record_analysis("rules", outcome)
         return _rule_based_recommendation(stock)
 
+    llm_telemetry.record_analysis("llm")
+    await asyncio.to_thread(
+        analysis_cache.put,
+        stock,
+        PROMPT_VERSION,
+        recommendation.model_dump(exclude={"symbol"}),
+        usage.prompt_tokens if usage else 0,
+        usage.completion_tokens if usage else 0,
+    )
+    return recommendation
+
+
+async def _llm_packed_analysis(
+    client: "AsyncOpenAI", stocks: list[StockData]
+) -> list[StockRecommendation]:
+    """
+    Analyze several stocks in a single LLM request.
+
+    Each valid analysis is cached individually; stocks missing from or invalid
+    in the response fall back to the rule-based recommendation.
+    """
+    symbols = [s.symbol for s in stocks]
+    content, usage, outcome, started_at = await _timed_completion(
+        client,
+        build_packed_prompt(stocks),
+        "packed_analysis",
+        symbols,
+        max_tokens=400 * len(stocks),
+    )
+
+    by_symbol: dict = {}
+    if content is not None:
+        try:
+            analyses = json.loads(content).get("analyses", [])
+            by_symbol = {a.get("symbol"): a for a in analyses if isinstance(a, dict)}
+        except (json.JSONDecodeError, TypeError, AttributeError) as e:
+            logger.error(f"Packed AI analysis returned invalid JSON: {e}")
+            outcome = "invalid_json"
+
+    llm_telemetry.record_llm_call(
+        OPENAI_MODEL, "packed_analysis", outcome, time.perf_counter() - started_at, usage, symbols
+    )
+    if outcome != "success":
+        llm_telemetry.record_analysis("rules", outcome, count=len(stocks))
+        return [_rule_based_recommendation(s) for s in stocks]
+
+    # Attribute token usage evenly across the packed stocks
+    prompt_tokens = usage.prompt_tokens // len(stocks) if usage else 0
+    completion_tokens = usage.completion_tokens // len(stocks) if usage else 0
+
+    results = []
+    for stock in stocks:
+        recommendation, item_outcome = _parse_recommendation(
+            stock.symbol, by_symbol.get(stock.symbol)
+        )
+        if recommendation is None:
+            llm_telemetry.record_analysis("rules", item_outcome)
+            results.append(_rule_based_recommendation(stock))
+            continue
+        llm_telemetry.record_analysis("llm")
+        await asyncio.to_thread(
+            analysis_cache.put,
+            stock,
+            PROMPT_VERSION,
+            recommendation.model_dump(exclude={"symbol"}),
+            prompt_tokens,
+            completion_tokens,
+        )
+        results.append(recommendation)
+    return results
+
+
+async def _cached_analysis(stock: StockData) -> Optional[StockRecommendation]:
+    """Return a cached analysis for unchanged metrics, if any."""
+    cached = await asyncio.to_thread(analysis_cache.get, stock, PROMPT_VERSION)
+    if cached is None:
+        return None
+    try:
+        recommendation = StockRecommendation(symbol=stock.symbol, **cached)
+    except Exception as e:
+        logger.warning(f"Ignoring invalid cached analysis for {stock.symbol}: {e}")
+        return None
+    llm_telemetry.record_analysis("cache")
+    return recommendation
+
+
+def _no_client_recommendation(stock: StockData) -> StockRecommendation:
+    """Rule-based recommendation used when no API key is configured."""
+    llm_telemetry.record_analysis("rules", "no_api_key")
+    return _rule_based_recommendation(stock)
+
+
+async def analyze_stock(stock: StockData) -> StockRecommendation:
+    """Generate AI-powered analysis for a single stock."""
+    client = get_openai_client()
+
+    if not client:
+        # Return rule-based recommendation if no API key
+        return _no_client_recommendation(stock)
+
+    # Reuse a previous analysis if the stock's metrics haven't materially changed
+    cached = await _cached_analysis(stock)
+    if cached is not None:
+        return cached
+
+    return await _llm_analysis(client, stock)
+
+
+async def _pump_stream(
+    client: "AsyncOpenAI", prompt: str, chunks: asyncio.Queue, deadline: float
+) -> None:
+    """
+    Read a streamed completion into `chunks` at the upstream's pace, ending
+    with None.
+
+    The concurrency slot is waited for and held only until the upstream
+    stream is drained, all within the deadline (raising TimeoutError past
+    it), so a slow consumer of the chunks never holds up other LLM calls.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _get_semaphore()
+    queued_at = time.perf_counter()
+    try:
+        await asyncio.wait_for(semaphore.acquire(), deadline - loop.time())
+        try:
+            llm_telemetry.queue_wait_histogram.observe(time.perf_counter() - queued_at)
+            stream = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt},
+                    ],
+                    temperature=0.3,
+                    max_tokens=500,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                ),
+                deadline - loop.time(),
+            )
+            iterator = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                chunks.put_nowait(chunk)
+        finally:
+            semaphore.release()
+    finally:
+        chunks.put_nowait(None)
+
+
+async def stream_stock_analysis(stock: StockData) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Stream an analysis as (event, data) pairs.
+
+    Yields ("token", {"text": ...}) for each piece of model output as it
+    arrives, then exactly one ("result", recommendation) with the validated
+    StockRecommendation. Cached analyses, a missing API key, errors and missed
+    deadlines all go straight to the result event (falling back to rules).
+    Waiting for a concurrency slot counts against the deadline, and the slot
+    is freed once the model output is read, however slowly it is consumed.
+    """
+    client = get_openai_client()
+    if not client:
+        yield "result", _no_client_recommendation(stock).model_dump()
+        return
+
+    cached = await _cached_analysis(stock)
+    if cached is not None:
+        yield "result", cached.model_dump()
+        return
+
+    deadline = asyncio.get_running_loop().time() + OPENAI_TIMEOUT_SECONDS
+    started_at = time.perf_counter()
+    content: list[str] = []
+    usage = None
+    recommendation = None
+    outcome = "success"
+
+    try:
+        chunks: asyncio.Queue = asyncio.Queue()
+        pump = asyncio.create_task(_pump_stream(client, build_stock_prompt(stock), chunks, deadline))
+        try:
+            while (chunk := await chunks.get()) is not None:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text = chunk.choices[0].delta.content
+                    content.append(text)
+                    yield "token", {"text": text}
+            await pump
+        finally:
+            # Stops reading upstream (and frees the slot) if the consumer went away
+            pump.cancel()
+
+        try:
+            result = json.loads("".join(content))
+        except json.JSONDecodeError as e:
+            logger.error(f"Streamed AI analysis for {stock.symbol} returned invalid JSON: {e}")
+            outcome = "invalid_json"
+        else:
+            recommendation, outcome = _parse_recommendation(stock.symbol, result)
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"Streamed AI analysis for {stock.symbol} exceeded {OPENAI_TIMEOUT_SECONDS}s deadline"
+        )
+        outcome = "timeout"
+    except Exception as e:
+        logger.error(f"Streamed AI analysis failed for {stock.symbol}: {e}")
+        outcome = "error"
+
+    llm_telemetry.record_llm_call(
+        OPENAI_MODEL, "stream_analysis", outcome, time.perf_counter() - started_at, usage, [stock.symbol]
+    )
+
+    if recommendation is None:
+        llm_telemetry.record_analysis("rules", outcome)
+        yield "result", _rule_based_recommendation(stock).model_dump()
+        return
+
+    llm_telemetry.record_analysis("llm")
+    await asyncio.to_thread(
+        analysis_cache.put,
+        stock,
+        PROMPT_VERSION,
+        recommendation.model_dump(exclude={"symbol"}),
+        usage.prompt_tokens if usage else 0,
+        usage.completion_tokens if usage else 0,
+    )
+    yield "result", recommendation.model_dump()
+
+
+# Concurrent stock data fetches while streaming a batch analysis
+BATCH_FETCH_CONCURRENCY = 16
+
+
+async def stream_batch_analysis(
+    symbols: list[str],
+    fetch: Callable[[str], Optional[StockData]],
+    pack_size: int = 1,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[dict]:
+    """
+    Analyze many symbols, yielding results in completion order.
+
+    Stock data is fetched in worker threads; cached analyses are yielded as
+    soon as their data arrives, and the rest are sent to the LLM with at most
+    `concurrency` requests in flight, `pack_size` stocks per prompt. Each
+    yielded item is {"symbol", "analysis"} or {"symbol", "error"}.
+    """
+    client = get_openai_client()
+    fetch_slots = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+    analysis_slots = asyncio.Semaphore(concurrency or OPENAI_MAX_CONCURRENCY)
+
+    async def fetch_one(symbol: str) -> tuple[str, Optional[StockData]]:
+        async with fetch_slots:
+            try:
+                return symbol, await asyncio.to_thread(fetch, symbol)
+            except Exception as e:
+                logger.error(f"Error fetching {symbol} for batch analysis: {e}")
+                return symbol, None
+
+    async def analyze_group(stocks: list[StockData]) -> list[StockRecommendation]:
+        async with analysis_slots:
+            if len(stocks) == 1:
+                return [await _llm_analysis(client, stocks[0])]
+            return await _llm_packed_analysis(client, stocks)
+
+    fetch_tasks = {asyncio.create_task(fetch_one(symbol)) for symbol in symbols}
+    pending = set(fetch_tasks)
+    waiting: list[StockData] = []
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task not in fetch_tasks:
+                    for recommendation in task.result():
+                        yield {"symbol": recommendation.symbol, "analysis": recommendation.model_dump()}
+                    continue
+
+                symbol, stock = task.result()
+                if stock is None:
+                    yield {"symbol": symbol, "error": f"Stock {symbol} not found"}
+                    continue
+                recommendation = (
+                    _no_client_recommendation(stock) if client is None else await _cached_analysis(stock)
+                )
+                if recommendation is not None:
+                    yield {"symbol": symbol, "analysis": recommendation.model_dump()}
+                else:
+                    waiting.append(stock)
+
+            # Dispatch full packs, or whatever is left once all data is in
+            fetching = any(task in fetch_tasks for task in pending)
+            while len(waiting) >= pack_size or (waiting and not fetching):
+                group, waiting = waiting[:pack_size], waiting[pack_size:]
+                pending.add(asyncio.create_task(analyze_group(group)))
+    finally:
+        for task in pending:
+            task.cancel()
+
 
 def _rule_based_recommendation(stock: StockData) -> StockRecommendation:
     """Generate recommendation using rule-based logic when AI is unavailable."""
@@ -0,0 +1,74 @@
+"""Batch evaluation of price alerts."""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from services.lazy_imports import lazy_import
+from services.price_history import PriceHistoryStore, price_history
+
+np = lazy_import("numpy")
+
+
+def window_label(window_days: Optional[int]) -> str:
+    """Human-readable description of a percent change window."""
+    if not window_days:
+        return "since creation"
+    if window_days == 1:
+        return "over 1 day"
+    return f"over {window_days} days"
+
+
+def percent_change_triggers(
+    current: np.ndarray, reference: np.ndarray, target: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute percent changes and trigger flags for arrays of alerts.
+
+    A positive target triggers on a rise of at least that many percent, a
+    negative target on a fall of at least that many percent. Missing prices
+    (NaN) and zero targets (rejected when alerts are created) never trigger.
+
+    Returns tuple of (percent_changes, triggered).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (current - reference) / reference * 100.0
+    valid = np.isfinite(change) & (target != 0)
+    triggered = valid & np.where(target >= 0, change >= target, change <= target)
+    return change, triggered
+
+
+def evaluate_percent_change_alerts(
+    alerts: list,
+    prices: dict[str, Optional[float]],
+    history: PriceHistoryStore = price_history,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Evaluate percent_change alerts in one vectorized pass.
+
+    Windowed alerts take their reference from the local price history;
+    since-creation alerts use the price captured when the alert was created.
+    History must already be loaded (see `PriceHistoryStore.ensure_loaded`).
+
+    Returns tuple of (current_prices, reference_prices, percent_changes, triggered),
+    each aligned with `alerts`.
+    """
+    count = len(alerts)
+    current = np.full(count, np.nan)
+    reference = np.full(count, np.nan)
+    target = np.empty(count)
+
+    for i, alert in enumerate(alerts):
+        price = prices.get(alert.symbol)
+        if price is not None:
+            current[i] = price
+        if alert.window_days:
+            ref = history.reference_price(alert.symbol, alert.window_days)
+        else:
+            ref = alert.reference_price
+        if ref:
+            reference[i] = ref
+        target[i] = alert.target_value
+
+    change, triggered = percent_change_triggers(current, reference, target)
+    return current, reference, change, triggered
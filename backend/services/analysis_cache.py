@@ -0,0 +1,214 @@
+"""Persistent cache for LLM stock analyses keyed by a metrics fingerprint."""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from models.database import SessionLocal
+from models.preferences import CachedAnalysis
+from services import metrics
+from services.stock_service import StockData
+
+logger = logging.getLogger(__name__)
+
+# Metrics that feed the analysis prompt, and so the fingerprint
+FINGERPRINT_FIELDS = (
+    "name",
+    "sector",
+    "price",
+    "dividend_yield",
+    "pe_ratio",
+    "market_cap",
+    "beta",
+    "debt_to_equity",
+)
+
+# Significant figures kept when rounding metrics for the fingerprint
+FINGERPRINT_SIG_FIGS = 3
+
+hits_counter = metrics.counter("analysis_cache_hits_total", "LLM analysis cache hits")
+misses_counter = metrics.counter("analysis_cache_misses_total", "LLM analysis cache misses")
+hit_ratio_gauge = metrics.gauge(
+    "analysis_cache_hit_ratio",
+    "Share of analysis lookups served from cache",
+    metrics.hit_ratio(hits_counter, misses_counter),
+)
+saved_prompt_tokens_counter = metrics.counter(
+    "analysis_cache_saved_prompt_tokens_total", "Prompt tokens not spent thanks to cache hits"
+)
+saved_completion_tokens_counter = metrics.counter(
+    "analysis_cache_saved_completion_tokens_total",
+    "Completion tokens not spent thanks to cache hits",
+)
+
+
+def _round_sig(value: float, sig_figs: int = FINGERPRINT_SIG_FIGS) -> float:
+    """Round a value to a number of significant figures."""
+    if value == 0 or not math.isfinite(value):
+        return value
+    return round(value, sig_figs - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+def metrics_fingerprint(stock: StockData) -> str:
+    """Hash the rounded metrics of a stock so small price ticks share a cache entry."""
+    values = []
+    for field in FINGERPRINT_FIELDS:
+        value = getattr(stock, field)
+        if isinstance(value, float):
+            value = _round_sig(value)
+        values.append(value)
+    encoded = json.dumps(values, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+class AnalysisCache:
+    """
+    Database-backed cache of LLM analyses with TTL and LRU eviction.
+
+    Entries are keyed by symbol, metrics fingerprint and prompt version, so a
+    prompt change or a material move in the metrics results in a fresh call.
+
+    Hits are read-only: an entry's last access time (which orders LRU
+    eviction) and hit count are written at most once per `touch_interval`,
+    with the hits counted in memory meanwhile, so repeated lookups do not
+    queue on the database's write lock.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        ttl: timedelta = timedelta(hours=float(os.getenv("ANALYSIS_CACHE_TTL_HOURS", "24"))),
+        max_entries: int = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "2000")),
+        touch_interval: timedelta = timedelta(
+            seconds=float(os.getenv("ANALYSIS_CACHE_TOUCH_SECONDS", "300"))
+        ),
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self._pending_hits: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(stock: StockData, prompt_version: str) -> str:
+        return f"{stock.symbol}:{metrics_fingerprint(stock)}:{prompt_version}"
+
+    def get(self, stock: StockData, prompt_version: str) -> Optional[dict]:
+        """Return the cached analysis result for a stock, or None."""
+        key = self.cache_key(stock, prompt_version)
+        now = datetime.utcnow()
+        try:
+            db = self.session_factory()
+            try:
+                entry = db.query(CachedAnalysis).filter(CachedAnalysis.cache_key == key).first()
+                if entry is None or now - entry.created_at > self.ttl:
+                    misses_counter.inc()
+                    return None
+
+                result = dict(entry.result)
+                saved_prompt_tokens_counter.inc(entry.prompt_tokens or 0)
+                saved_completion_tokens_counter.inc(entry.completion_tokens or 0)
+                with self._lock:
+                    pending = self._pending_hits.get(key, 0) + 1
+                    touch = now - entry.last_accessed_at >= self.touch_interval
+                    self._pending_hits[key] = 0 if touch else pending
+                if touch:
+                    entry.hits = (entry.hits or 0) + pending
+                    entry.last_accessed_at = now
+                    db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            logger.error(f"Analysis cache lookup failed for {stock.symbol}: {e}")
+            misses_counter.inc()
+            return None
+
+        hits_counter.inc()
+        return result
+
+    def put(
+        self,
+        stock: StockData,
+        prompt_version: str,
+        result: dict,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+    ) -> None:
+        """Store an analysis result, evicting expired and least recently used entries."""
+        key = self.cache_key(stock, prompt_version)
+        now = datetime.utcnow()
+        try:
+            db = self.session_factory()
+            try:
+                entry = db.query(CachedAnalysis).filter(CachedAnalysis.cache_key == key).first()
+                if entry is None:
+                    entry = CachedAnalysis(cache_key=key)
+                    db.add(entry)
+                entry.symbol = stock.symbol
+                entry.fingerprint = metrics_fingerprint(stock)
+                entry.prompt_version = prompt_version
+                entry.result = result
+                entry.prompt_tokens = prompt_tokens
+                entry.completion_tokens = completion_tokens
+                entry.hits = 0
+                with self._lock:
+                    self._pending_hits.pop(key, None)
+                entry.created_at = now
+                entry.last_accessed_at = now
+                db.flush()
+                self._evict(db, now)
+                db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            logger.error(f"Analysis cache store failed for {stock.symbol}: {e}")
+
+    def _evict(self, db, now: datetime) -> None:
+        """Delete expired entries and trim the table to `max_entries`."""
+        db.query(CachedAnalysis).filter(CachedAnalysis.created_at < now - self.ttl).delete(
+            synchronize_session=False
+        )
+        overflow = db.query(CachedAnalysis).count() - self.max_entries
+        if overflow > 0:
+            oldest = (
+                db.query(CachedAnalysis.id)
+                .order_by(CachedAnalysis.last_accessed_at)
+                .limit(overflow)
+                .subquery()
+            )
+            db.query(CachedAnalysis).filter(CachedAnalysis.id.in_(oldest.select())).delete(
+                synchronize_session=False
+            )
+
+    def stats(self) -> dict:
+        """Return hit rate and saved-token counters plus current size."""
+        hits = hits_counter.value
+        lookups = hits + misses_counter.value
+        try:
+            db = self.session_factory()
+            try:
+                entries = db.query(CachedAnalysis).count()
+            finally:
+                db.close()
+        except Exception:
+            entries = 0
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl.total_seconds(),
+            "hits": int(hits),
+            "misses": int(misses_counter.value),
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "saved_prompt_tokens": int(saved_prompt_tokens_counter.value),
+            "saved_completion_tokens": int(saved_completion_tokens_counter.value),
+        }
+
+
+# Shared process-wide cache
+analysis_cache = AnalysisCache()
@@ -0,0 +1,59 @@
+"""ETags, conditional GETs and Cache-Control for polled market data endpoints."""
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import Response
+
+
+def make_etag(*parts) -> str:
+    """
+    Strong ETag over the inputs a response is built from (data version,
+    query parameters), so it can be checked before the response is built.
+    """
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return f'"{hashlib.sha256(encoded.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison, as GET requires)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cache_control(fresh_until: Optional[datetime], private: bool = False) -> str:
+    """
+    Cache-Control letting clients reuse a response for as long as its data
+    stays fresh (revalidating with If-None-Match after), or `no-cache` to
+    revalidate every time when there is no such bound.
+    """
+    scope = "private" if private else "public"
+    if fresh_until is None:
+        return f"{scope}, no-cache"
+    max_age = max(0, int((fresh_until - datetime.utcnow()).total_seconds()))
+    return f"{scope}, max-age={max_age}, must-revalidate"
+
+
+def conditional(
+    response: Response, if_none_match: Optional[str], etag: str, cache: str
+) -> Optional[Response]:
+    """
+    Set the validators on the response about to be built, or return a 304 to
+    send in its place when the client already holds this version.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def until(moment: datetime, seconds: float) -> datetime:
+    """When data fetched at `moment` stops being fresh after `seconds`."""
+    return moment + timedelta(seconds=seconds)
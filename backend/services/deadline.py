@@ -0,0 +1,37 @@
+"""Per-request time budgets passed from routes down to upstream fetches."""
+
+import os
+import time
+
+# Time a request may spend waiting on upstream data before serving last known values
+REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", "3"))
+
+
+class Deadline:
+    """A point in time by which a request must have its data."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left in the budget, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """A deadline `seconds` earlier, keeping that much of the budget for later work."""
+        reserved = Deadline(self.seconds)
+        reserved.expires_at = self.expires_at - seconds
+        return reserved
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def __repr__(self) -> str:
+        return f"<Deadline {self.remaining():.3f}s of {self.seconds:.3f}s left>"
+
+
+def request_deadline() -> Deadline:
+    """FastAPI dependency starting the request's budget."""
+    return Deadline(REQUEST_BUDGET_SECONDS)
@@ -0,0 +1,139 @@
+"""Write-through persistence of stock fundamentals in the cached_stocks table."""
+
+import logging
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models.database import SessionLocal
+from models.preferences import CachedStock
+from services.stock_service import StockData, set_universe_snapshot
+
+logger = logging.getLogger(__name__)
+
+# StockData fields stored as CachedStock columns (symbol is the conflict key)
+STOCK_COLUMNS = tuple(field for field in StockData.model_fields if field != "symbol")
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE support
+UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def upsert_statement(dialect: str):
+    """INSERT ... ON CONFLICT (symbol) DO UPDATE for the given dialect."""
+    stmt = UPSERT_INSERTS[dialect](CachedStock)
+    return stmt.on_conflict_do_update(
+        index_elements=[CachedStock.symbol],
+        set_={c: stmt.excluded[c] for c in (*STOCK_COLUMNS, "last_updated")},
+    )
+
+
+class FundamentalsStore:
+    """
+    Persist fetched fundamentals so restarts start from the last known universe.
+
+    Writes are one bulk upsert per batch; reads load every row in one query.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def upsert(self, stocks: Iterable[StockData], fetched_at: Optional[datetime] = None) -> int:
+        """Insert or update a batch of stocks in a single statement, returning the row count."""
+        fetched_at = fetched_at or datetime.utcnow()
+        rows = [
+            {"symbol": s.symbol, **s.model_dump(include=set(STOCK_COLUMNS)), "last_updated": fetched_at}
+            for s in stocks
+        ]
+        if not rows:
+            return 0
+
+        db = self.session_factory()
+        try:
+            dialect = db.get_bind().dialect.name
+            if dialect in UPSERT_INSERTS:
+                db.execute(upsert_statement(dialect), rows)
+            else:
+                # Portable fallback: one lookup for the batch, then update or add
+                existing = {
+                    row.symbol: row
+                    for row in db.scalars(
+                        select(CachedStock).where(CachedStock.symbol.in_([r["symbol"] for r in rows]))
+                    )
+                }
+                for row in rows:
+                    cached = existing.get(row["symbol"])
+                    if cached is None:
+                        db.add(CachedStock(**row))
+                    else:
+                        for column, value in row.items():
+                            setattr(cached, column, value)
+            db.commit()
+            return len(rows)
+        finally:
+            db.close()
+
+    def load_dated(self, symbols: Optional[list[str]] = None) -> list[tuple[StockData, Optional[datetime]]]:
+        """Load stored stocks in one query, each with the time it was last updated."""
+        columns = [CachedStock.symbol, *(getattr(CachedStock, c) for c in STOCK_COLUMNS)]
+        query = select(*columns, CachedStock.last_updated).order_by(CachedStock.symbol)
+        if symbols is not None:
+            query = query.where(CachedStock.symbol.in_(symbols))
+
+        db = self.session_factory()
+        try:
+            rows = db.execute(query).all()
+        finally:
+            db.close()
+
+        stocks = []
+        for row in rows:
+            values = row._mapping
+            try:
+                stock = StockData(**{k: v for k, v in values.items() if k != "last_updated"})
+            except Exception as e:
+                logger.warning(f"Skipping invalid cached stock {values['symbol']}: {e}")
+                continue
+            stocks.append((stock, values["last_updated"]))
+        return stocks
+
+    def load(
+        self, symbols: Optional[list[str]] = None
+    ) -> tuple[list[StockData], Optional[datetime]]:
+        """Load stored stocks in one query, returning them with the oldest update time."""
+        dated = self.load_dated(symbols)
+        updated = [updated_at for _, updated_at in dated if updated_at]
+        return [stock for stock, _ in dated], min(updated, default=None)
+
+
+fundamentals_store = FundamentalsStore()
+
+
+def persist_universe(stocks: list[StockData], fetched_at: datetime) -> None:
+    """Write a freshly fetched universe through to the database, logging failures."""
+    try:
+        fundamentals_store.upsert(stocks, fetched_at)
+    except Exception as e:
+        logger.error(f"Failed to persist {len(stocks)} stocks: {e}")
+
+
+def hydrate_universe_snapshot(symbols: Optional[list[str]] = None) -> int:
+    """
+    Seed the in-memory universe snapshot from the database.
+
+    The snapshot keeps the stored fetch time, so it is refetched as usual once
+    older than UNIVERSE_TTL_SECONDS. Returns the number of stocks loaded.
+    """
+    try:
+        stocks, fetched_at = fundamentals_store.load(symbols)
+    except Exception as e:
+        logger.error(f"Failed to load cached stocks: {e}")
+        return 0
+    if stocks:
+        set_universe_snapshot(stocks, fetched_at=fetched_at)
+        logger.info(f"Hydrated universe snapshot with {len(stocks)} stocks from {fetched_at}")
+    return len(stocks)
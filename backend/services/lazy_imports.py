@@ -0,0 +1,49 @@
+"""Deferred imports for heavy optional-at-startup dependencies."""
+
+import importlib
+import sys
+import threading
+from types import ModuleType
+from typing import Optional
+
+# Modules that should not be loaded just by importing the API
+HEAVY_MODULES = ("yfinance", "pandas", "numpy", "openai")
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    `np = lazy_import("numpy")` can be used like `import numpy as np`, but the
+    real import only happens the first time an attribute (e.g. `np.array`)
+    is looked up.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        module = self._module or self._load()
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Return a module proxy that imports `name` on first use."""
+    return LazyModule(name)
+
+
+def loaded_heavy_modules() -> list[str]:
+    """Heavy modules that have actually been imported so far."""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
@@ -0,0 +1,175 @@
+"""Latency, token, cost and fallback telemetry for LLM calls."""
+
+import json
+import logging
+import time
+from typing import Optional
+
+from services import metrics, profiler, tracing
+
+logger = logging.getLogger(__name__)
+
+# USD per million (prompt, completion) tokens
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+TOKEN_BUCKETS = (50, 100, 200, 400, 800, 1600, 3200, 6400)
+
+# Call outcomes; anything but "success" means the caller fell back to rules
+OUTCOMES = ("success", "timeout", "error", "invalid_json", "invalid_response")
+
+latency_histogram = metrics.histogram(
+    "llm_request_duration_seconds",
+    "LLM call latency including time waiting for a concurrency slot",
+    ("model", "operation", "outcome"),
+)
+queue_wait_histogram = metrics.histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for an LLM concurrency slot"
+)
+prompt_tokens_histogram = metrics.histogram(
+    "llm_prompt_tokens", "Prompt tokens per LLM call", ("model", "operation"), TOKEN_BUCKETS
+)
+completion_tokens_histogram = metrics.histogram(
+    "llm_completion_tokens",
+    "Completion tokens per LLM call",
+    ("model", "operation"),
+    TOKEN_BUCKETS,
+)
+requests_counter = metrics.counter(
+    "llm_requests_total", "LLM calls by outcome", ("model", "operation", "outcome")
+)
+cost_counter = metrics.counter("llm_cost_usd_total", "Estimated LLM spend in USD", ("model",))
+analyses_counter = metrics.counter(
+    "ai_analyses_total", "Stock analyses served by source", ("source",)
+)
+fallbacks_counter = metrics.counter(
+    "ai_fallbacks_total", "Analyses that fell back to rules, by reason", ("reason",)
+)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimate the USD cost of a call from token counts."""
+    prompt_price, completion_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def record_llm_call(
+    model: str,
+    operation: str,
+    outcome: str,
+    latency: float,
+    usage=None,
+    symbols: Optional[list[str]] = None,
+) -> None:
+    """
+    Record one LLM call: latency, tokens, estimated cost and outcome.
+
+    `usage` is the response usage object (None when the call failed).
+    """
+    prompt_tokens = usage.prompt_tokens if usage else 0
+    completion_tokens = usage.completion_tokens if usage else 0
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+
+    latency_histogram.observe(latency, model=model, operation=operation, outcome=outcome)
+    requests_counter.inc(model=model, operation=operation, outcome=outcome)
+    profiler.record("upstream", f"openai:{operation}", latency)
+    end_ns = time.time_ns()
+    tracing.record(
+        f"llm.{operation}",
+        end_ns - int(latency * 1e9),
+        end_ns,
+        kind="client",
+        model=model,
+        outcome=outcome,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+    )
+    if usage:
+        prompt_tokens_histogram.observe(prompt_tokens, model=model, operation=operation)
+        completion_tokens_histogram.observe(completion_tokens, model=model, operation=operation)
+        cost_counter.inc(cost, model=model)
+
+    logger.info(
+        "llm_call %s",
+        json.dumps(
+            {
+                "model": model,
+                "operation": operation,
+                "outcome": outcome,
+                "latency_ms": round(latency * 1000, 1),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cost_usd": round(cost, 6),
+                "fallback_reason": None if outcome == "success" else outcome,
+                "symbols": symbols,
+            }
+        ),
+    )
+
+
+def record_analysis(source: str, fallback_reason: Optional[str] = None, count: int = 1) -> None:
+    """Record analyses served from "llm", "cache" or "rules" (with the fallback reason)."""
+    analyses_counter.inc(count, source=source)
+    if fallback_reason:
+        fallbacks_counter.inc(count, reason=fallback_reason)
+
+
+def summary() -> dict:
+    """Aggregate LLM telemetry per model and operation."""
+    calls = []
+    for labels, _ in _call_series():
+        model, operation = labels["model"], labels["operation"]
+        outcomes = {
+            outcome: int(requests_counter.get(model=model, operation=operation, outcome=outcome))
+            for outcome in OUTCOMES
+        }
+        count = sum(outcomes.values())
+        success_latency = {"model": model, "operation": operation, "outcome": "success"}
+        token_calls = prompt_tokens_histogram.count(model=model, operation=operation)
+        calls.append(
+            {
+                "model": model,
+                "operation": operation,
+                "calls": count,
+                "outcomes": outcomes,
+                "latency_seconds": {
+                    "p50": latency_histogram.quantile(0.5, model=model, operation=operation),
+                    "p95": latency_histogram.quantile(0.95, model=model, operation=operation),
+                    "p99": latency_histogram.quantile(0.99, model=model, operation=operation),
+                    "success_p50": latency_histogram.quantile(0.5, **success_latency),
+                },
+                "avg_prompt_tokens": (
+                    prompt_tokens_histogram.sum(model=model, operation=operation) / token_calls
+                    if token_calls
+                    else None
+                ),
+                "avg_completion_tokens": (
+                    completion_tokens_histogram.sum(model=model, operation=operation) / token_calls
+                    if token_calls
+                    else None
+                ),
+            }
+        )
+
+    analyses = analyses_counter.value
+    fallbacks = fallbacks_counter.value
+    return {
+        "calls": calls,
+        "queue_wait_p95_seconds": queue_wait_histogram.quantile(0.95),
+        "prompt_tokens_total": int(prompt_tokens_histogram.sum()),
+        "completion_tokens_total": int(completion_tokens_histogram.sum()),
+        "estimated_cost_usd": round(cost_counter.value, 6),
+        "analyses_by_source": {labels["source"]: int(v) for labels, v in analyses_counter.samples()},
+        "fallback_rate": fallbacks / analyses if analyses else 0.0,
+        "fallbacks_by_reason": {labels["reason"]: int(v) for labels, v in fallbacks_counter.samples()},
+    }
+
+
+def _call_series() -> list[tuple[dict[str, str], float]]:
+    """Distinct (model, operation) pairs that have made calls."""
+    seen = {}
+    for labels, value in requests_counter.samples():
+        seen.setdefault((labels["model"], labels["operation"]), value)
+    return [({"model": m, "operation": o}, v) for (m, o), v in seen.items()]
@@ -0,0 +1,215 @@
+"""Event-loop lag monitoring and blocking-call detection."""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Optional
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# How often the loop is sampled (seconds); 0 disables the monitor
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.5"))
+
+# Debug mode: log the stack of anything holding the loop longer than this (seconds); 0 disables
+LOOP_BLOCK_THRESHOLD_SECONDS = float(os.getenv("LOOP_BLOCK_THRESHOLD_SECONDS", "0"))
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+lag_histogram = metrics.histogram(
+    "event_loop_lag_seconds", "Delay of a scheduled wake-up on the event loop", buckets=LAG_BUCKETS
+)
+last_lag_gauge = metrics.gauge("event_loop_lag_last_seconds", "Most recent event-loop lag sample")
+blocked_counter = metrics.counter(
+    "event_loop_blocked_total",
+    "Times the event loop was held past LOOP_BLOCK_THRESHOLD_SECONDS, by blocking code location",
+    ("location",),
+)
+blocked_histogram = metrics.histogram(
+    "event_loop_blocked_seconds", "How long the event loop was held when blocked", buckets=LAG_BUCKETS
+)
+
+BACKEND_DIR = str(Path(__file__).resolve().parent.parent)
+# Application frames on every request's stack, never the cause of a block
+_PASS_THROUGH = {__file__, f"{BACKEND_DIR}/api/middleware.py"}
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop runs a sleep that should wake on time.
+
+    Any delay beyond the requested interval is time the loop spent running
+    something else without yielding, e.g. blocking I/O in a coroutine.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            lag_histogram.observe(lag)
+            last_lag_gauge.set(lag)
+
+    def start(self) -> None:
+        """Start sampling on the running loop."""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sampling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _frame_name(frame: traceback.FrameSummary) -> str:
+    filename = frame.filename
+    if filename.startswith(BACKEND_DIR):
+        filename = filename[len(BACKEND_DIR) + 1 :]
+    elif "site-packages/" in filename:
+        filename = filename.rsplit("site-packages/", 1)[1]
+    return f"{filename}({frame.name})"
+
+
+def _blocking_location(stack: traceback.StackSummary) -> str:
+    """
+    Where the loop was held: the innermost application frame
+    (`services/stock_service.py(fetch_stock_data)`), skipping middleware
+    that only passes the request on, else the innermost frame of all.
+    Line numbers are left to the logged stack to keep the label set small.
+    """
+    for frame in reversed(stack):
+        if frame.filename.startswith(BACKEND_DIR) and frame.filename not in _PASS_THROUGH:
+            return _frame_name(frame)
+    return _frame_name(stack[-1]) if stack else "unknown"
+
+
+class BlockingCallDetector:
+    """
+    Logs the stack of whatever holds the event loop longer than a threshold.
+
+    A heartbeat task on the loop ticks every half threshold; a watchdog
+    thread notices when it stops ticking and captures the loop thread's stack
+    while the blocking call is still running, so the log shows the offending
+    line rather than the callback that happened to run next. When the loop
+    resumes, the block's duration and location are recorded in
+    event_loop_blocked_seconds and event_loop_blocked_total.
+    """
+
+    def __init__(self, threshold: float = LOOP_BLOCK_THRESHOLD_SECONDS):
+        self.threshold = threshold
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._beat = 0.0
+        # Stack captured by the watchdog for the heartbeat it saw stall
+        self._captured: Optional[tuple[float, traceback.StackSummary]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _heartbeat(self) -> None:
+        interval = self.threshold / 2
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(interval)
+            blocked = time.monotonic() - self._beat - interval
+            captured, self._captured = self._captured, None
+            if blocked >= self.threshold and captured is not None:
+                self._report(blocked, captured[1])
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._beat
+            stalled = time.monotonic() - beat > self.threshold
+            if stalled and (self._captured is None or self._captured[0] != beat):
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._captured = (beat, traceback.extract_stack(frame))
+
+    def _report(self, blocked: float, stack: traceback.StackSummary) -> None:
+        location = _blocking_location(stack)
+        blocked_counter.inc(location=location)
+        blocked_histogram.observe(blocked)
+        logger.warning(
+            f"Event loop blocked for {blocked * 1000:.0f}ms at {location}:\n"
+            + "".join(stack.format())
+        )
+
+    def start(self) -> None:
+        """Start the heartbeat on the running loop and the watchdog thread."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the heartbeat and the watchdog."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+
+# Process-wide monitor and detector, started by the application lifespan
+loop_monitor: Optional[LoopLagMonitor] = None
+blocking_detector: Optional[BlockingCallDetector] = None
+
+
+def start_loop_monitor() -> Optional[LoopLagMonitor]:
+    """
+    Start the lag monitor unless LOOP_LAG_INTERVAL_SECONDS is 0, and the
+    blocking-call detector if LOOP_BLOCK_THRESHOLD_SECONDS is set.
+    """
+    global loop_monitor, blocking_detector
+    if LOOP_BLOCK_THRESHOLD_SECONDS > 0:
+        blocking_detector = BlockingCallDetector()
+        blocking_detector.start()
+    if LOOP_LAG_INTERVAL_SECONDS <= 0:
+        return None
+    loop_monitor = LoopLagMonitor()
+    loop_monitor.start()
+    return loop_monitor
+
+
+async def stop_loop_monitor() -> None:
+    """Stop the lag monitor and blocking-call detector if running."""
+    global loop_monitor, blocking_detector
+    if loop_monitor is not None:
+        await loop_monitor.stop()
+        loop_monitor = None
+    if blocking_detector is not None:
+        await blocking_detector.stop()
+        blocking_detector = None
@@ -0,0 +1,186 @@
+"""Market data providers: Yahoo Finance, or a deterministic fake for offline runs."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import random
+import time
+from datetime import date, timedelta
+from typing import Optional, Protocol
+
+from services.lazy_imports import lazy_import
+
+logger = logging.getLogger(__name__)
+
+np = lazy_import("numpy")
+yf = lazy_import("yfinance")
+
+# Where quotes and price history come from: "yahoo", "fake" (generated) or "replay"
+# (recorded fixtures, see services.market_replay)
+MARKET_DATA_PROVIDER = os.getenv("MARKET_DATA_PROVIDER", "yahoo").lower()
+
+# Fake provider: seed for its generated data and simulated latency per call
+FAKE_PROVIDER_SEED = int(os.getenv("FAKE_PROVIDER_SEED", "42"))
+FAKE_PROVIDER_LATENCY_MS = float(os.getenv("FAKE_PROVIDER_LATENCY_MS", "0"))
+
+History = dict[str, tuple["np.ndarray", "np.ndarray"]]
+
+
+class MarketDataProvider(Protocol):
+    """Source of raw quote info and daily close history."""
+
+    name: str
+
+    def info(self, symbol: str) -> dict:
+        """Quote and fundamentals in the shape of yfinance's `Ticker.info`."""
+        ...
+
+    def history(self, symbols: list[str], days: int) -> History:
+        """Daily closes per symbol as (datetime64[D] dates, float closes), oldest first."""
+        ...
+
+
+class YahooProvider:
+    """Live data from Yahoo Finance through yfinance."""
+
+    name = "yfinance"
+
+    def info(self, symbol: str) -> dict:
+        return yf.Ticker(symbol).info
+
+    def history(self, symbols: list[str], days: int) -> History:
+        """Download daily closes for many symbols in a single request."""
+        data = yf.download(
+            symbols,
+            period=f"{days}d",
+            interval="1d",
+            progress=False,
+            auto_adjust=False,
+            threads=True,
+        )
+        if data is None or data.empty:
+            return {}
+
+        closes = data["Close"]
+        if closes.ndim == 1:
+            closes = closes.to_frame(symbols[0])
+
+        dates = closes.index.values.astype("datetime64[D]")
+        history = {}
+        for symbol in symbols:
+            if symbol not in closes.columns:
+                continue
+            values = closes[symbol].to_numpy(dtype=float)
+            mask = ~np.isnan(values)
+            if mask.any():
+                history[symbol] = (dates[mask], values[mask])
+        return history
+
+
+SECTORS = (
+    "Healthcare",
+    "Consumer Defensive",
+    "Financial Services",
+    "Technology",
+    "Utilities",
+    "Industrials",
+    "Energy",
+    "Real Estate",
+)
+
+
+class FakeProvider:
+    """
+    Generated, deterministic market data: the same seed and symbol always
+    give the same info and history, with an optional fixed latency per call
+    to stand in for the network.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self, seed: int = FAKE_PROVIDER_SEED, latency_ms: float = FAKE_PROVIDER_LATENCY_MS
+    ):
+        self.seed = seed
+        self.latency = latency_ms / 1000
+
+    def _rng(self, symbol: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{symbol}".encode()).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def info(self, symbol: str) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        rng = self._rng(symbol)
+        price = round(rng.uniform(20, 400), 2)
+        return {
+            "symbol": symbol,
+            "shortName": f"{symbol} Holdings",
+            "sector": rng.choice(SECTORS),
+            "currentPrice": price,
+            "previousClose": round(price * rng.uniform(0.97, 1.03), 2),
+            "dividendYield": round(rng.uniform(0.0, 0.06), 4),
+            "trailingPE": round(rng.uniform(8, 40), 2),
+            "forwardPE": round(rng.uniform(8, 35), 2),
+            "marketCap": rng.uniform(5e9, 2e12),
+            "beta": round(rng.uniform(0.3, 1.6), 2),
+            "debtToEquity": round(rng.uniform(10, 250), 1),
+            "fiftyTwoWeekHigh": round(price * rng.uniform(1.0, 1.3), 2),
+            "fiftyTwoWeekLow": round(price * rng.uniform(0.7, 1.0), 2),
+            "payoutRatio": round(rng.uniform(0.1, 0.9), 3),
+            "revenueGrowth": round(rng.uniform(-0.05, 0.15), 4),
+            "profitMargins": round(rng.uniform(0.02, 0.35), 4),
+        }
+
+    def history(self, symbols: list[str], days: int, today: Optional[date] = None) -> History:
+        if self.latency:
+            time.sleep(self.latency)
+        today = today or date.today()
+        dates = np.arange(
+            np.datetime64(today - timedelta(days=days - 1), "D"),
+            np.datetime64(today + timedelta(days=1), "D"),
+        )
+        history = {}
+        for symbol in symbols:
+            # Same first draw as info(), so the latest close matches the quoted price
+            price = round(self._rng(symbol).uniform(20, 400), 2)
+            rng = self._rng(f"{symbol}:history")
+            steps = np.array([rng.gauss(0, 0.01) for _ in range(len(dates))])
+            # Walk backwards from today: each close is the next one less its daily return
+            back = np.concatenate([np.cumsum(steps[:0:-1])[::-1], [0.0]])
+            history[symbol] = (dates, np.round(price * np.exp(-back), 2))
+        return history
+
+
+def _create_provider(name: str) -> MarketDataProvider:
+    # Import here to avoid circular dependency
+    from services import market_replay
+
+    if name == "fake":
+        provider = FakeProvider()
+    elif name == "replay":
+        provider = market_replay.ReplayProvider()
+    else:
+        if name != "yahoo":
+            logger.warning(f"Unknown MARKET_DATA_PROVIDER {name!r}, using yahoo")
+        provider = YahooProvider()
+    if market_replay.MARKET_DATA_CAPTURE:
+        provider = market_replay.CaptureProvider(provider)
+    return provider
+
+
+_provider: MarketDataProvider = _create_provider(MARKET_DATA_PROVIDER)
+
+
+def get_provider() -> MarketDataProvider:
+    """The provider quote fetches and history downloads go to."""
+    return _provider
+
+
+def set_provider(provider: MarketDataProvider) -> MarketDataProvider:
+    """Swap the market data provider (benchmarks, replay), returning the previous one."""
+    global _provider
+    previous, _provider = _provider, provider
+    return previous
@@ -0,0 +1,209 @@
+"""Capture of raw market data responses into a fixture archive, and deterministic replay."""
+
+from __future__ import annotations
+
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from services.lazy_imports import lazy_import
+from services.market_data import History, MarketDataProvider
+
+logger = logging.getLogger(__name__)
+
+np = lazy_import("numpy")
+
+# Archive to replay from (MARKET_DATA_PROVIDER=replay) or to record into (capture)
+MARKET_DATA_FIXTURES = os.getenv("MARKET_DATA_FIXTURES", "market_data.jsonl.gz")
+
+# Record every response of the configured provider into MARKET_DATA_FIXTURES
+MARKET_DATA_CAPTURE = os.getenv("MARKET_DATA_CAPTURE", "false").lower() == "true"
+
+# Captured responses buffered before they are compressed and appended
+CAPTURE_FLUSH_EVERY = 200
+
+# Replay latency: "recorded" sleeps as long as the original call took, a number
+# sleeps that many milliseconds, "0" answers immediately
+REPLAY_LATENCY = os.getenv("REPLAY_LATENCY", "0")
+
+# Share of replayed calls that fail with an injected error, and the seed choosing them
+REPLAY_ERROR_RATE = float(os.getenv("REPLAY_ERROR_RATE", "0"))
+REPLAY_SEED = int(os.getenv("REPLAY_SEED", "0"))
+
+
+class ReplayError(ConnectionError):
+    """A recorded or injected upstream failure."""
+
+
+def _key(kind: str, symbols: list[str], days: Optional[int] = None) -> str:
+    return f"{kind}:{','.join(symbols)}" + (f":{days}" if days is not None else "")
+
+
+def _encode_history(history: History) -> dict:
+    return {
+        symbol: {"dates": [str(d) for d in dates], "closes": [float(c) for c in closes]}
+        for symbol, (dates, closes) in history.items()
+    }
+
+
+def _decode_history(encoded: dict) -> History:
+    return {
+        symbol: (
+            np.array(series["dates"], dtype="datetime64[D]"),
+            np.array(series["closes"], dtype=float),
+        )
+        for symbol, series in encoded.items()
+    }
+
+
+class CaptureProvider:
+    """
+    Passes calls through to another provider and records each raw response
+    (or error) with its timestamp and latency in a gzip JSON-lines archive.
+
+    Records are buffered and appended as one gzip member per flush (and at
+    exit); readers see the members as one stream, so captures from several
+    runs can share an archive.
+    """
+
+    def __init__(self, inner: MarketDataProvider, path: str = MARKET_DATA_FIXTURES):
+        self.inner = inner
+        self.name = inner.name
+        self.path = Path(path)
+        self._buffer: list[str] = []
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def _record(self, key: str, call, encode=lambda response: response):
+        start = time.perf_counter()
+        record = {"key": key, "at": datetime.utcnow().isoformat()}
+        try:
+            response = call()
+            record["response"] = encode(response)
+            return response
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            with self._lock:
+                self._buffer.append(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+                full = len(self._buffer) >= CAPTURE_FLUSH_EVERY
+            if full:
+                self.flush()
+
+    def flush(self) -> None:
+        """Compress and append the buffered records."""
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+            if not lines:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(self.path, "at") as f:
+                f.writelines(lines)
+
+    def info(self, symbol: str) -> dict:
+        return self._record(_key("info", [symbol]), lambda: self.inner.info(symbol))
+
+    def history(self, symbols: list[str], days: int) -> History:
+        return self._record(
+            _key("history", symbols, days),
+            lambda: self.inner.history(symbols, days),
+            _encode_history,
+        )
+
+
+class ReplayProvider:
+    """
+    Serves responses from a capture archive, deterministically.
+
+    The n-th call for a key (symbol, or symbols and days for history) gets
+    the n-th recorded response for it, cycling when they run out; keys never
+    recorded return empty data, as Yahoo does for unknown symbols. Recorded
+    failures are raised again as ReplayError. Latency can be replayed as
+    recorded or fixed, and `error_rate` injects extra failures chosen by
+    hashing (seed, key, call number), so a run fails on the same calls
+    whatever the thread interleaving.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        path: str = MARKET_DATA_FIXTURES,
+        latency: str = REPLAY_LATENCY,
+        error_rate: float = REPLAY_ERROR_RATE,
+        seed: int = REPLAY_SEED,
+    ):
+        self.path = Path(path)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self._records: dict[str, list[dict]] = defaultdict(list)
+        self._calls: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        with gzip.open(self.path, "rt") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._records[record["key"]].append(record)
+        count = sum(map(len, self._records.values()))
+        logger.info(f"Loaded {count} recorded responses from {path}")
+
+    def keys(self) -> list[str]:
+        return list(self._records)
+
+    def _next(self, key: str) -> tuple[Optional[dict], int]:
+        with self._lock:
+            call = self._calls[key]
+            self._calls[key] += 1
+        records = self._records.get(key)
+        return (records[call % len(records)] if records else None), call
+
+    def _injected_error(self, key: str, call: int) -> bool:
+        if self.error_rate <= 0:
+            return False
+        digest = hashlib.sha256(f"{self.seed}:{key}:{call}".encode()).digest()
+        return int.from_bytes(digest[:8], "big") / 2**64 < self.error_rate
+
+    def _delay(self, record: Optional[dict]) -> None:
+        if self.latency == "recorded":
+            seconds = record["latency_ms"] / 1000 if record else 0.0
+        else:
+            seconds = float(self.latency) / 1000
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _replay(self, key: str) -> Optional[dict]:
+        record, call = self._next(key)
+        self._delay(record)
+        if self._injected_error(key, call):
+            raise ReplayError(f"Injected failure for {key} (call {call})")
+        if record is not None and "error" in record:
+            raise ReplayError(record["error"])
+        return record
+
+    def info(self, symbol: str) -> dict:
+        record = self._replay(_key("info", [symbol]))
+        return record["response"] if record is not None else {}
+
+    def history(self, symbols: list[str], days: int) -> History:
+        record = self._replay(_key("history", symbols, days))
+        if record is not None:
+            return _decode_history(record["response"])
+        # Not recorded as one batch: use any single-symbol history recorded for the same days
+        history = {}
+        for symbol in symbols:
+            single = self._records.get(_key("history", [symbol], days))
+            if single and "response" in single[0]:
+                history.update(_decode_history(single[0]["response"]))
+        return history
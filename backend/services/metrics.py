@@ -0,0 +1,353 @@
+"""In-process metrics registry for counters, gauges and histograms."""
+
+import bisect
+import math
+import threading
+from typing import Callable, Optional, Union
+
+LabelKey = tuple[str, ...]
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Labelled:
+    """Shared handling of label names and values."""
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelKey) -> dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class _Sharded(_Labelled):
+    """
+    Per-thread storage, so recording never takes a lock or loses an update
+    to another thread; reads merge the shards.
+    """
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, description, labelnames)
+        self._local = threading.local()
+        self._shards: list[dict] = []
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            self._shards.append(shard)
+            return shard
+
+
+class Counter(_Sharded):
+    """Monotonically increasing value, optionally split by labels."""
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase the counter for a label set."""
+        key = self._key(labels)
+        shard = self._shard()
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def _totals(self) -> dict[LabelKey, float]:
+        totals: dict[LabelKey, float] = {}
+        for shard in list(self._shards):
+            for key, value in list(shard.items()):
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def get(self, **labels) -> float:
+        """Current value for a label set."""
+        return self._totals().get(self._key(labels), 0.0)
+
+    def samples(self) -> list[tuple[dict[str, str], float]]:
+        """Return (labels, value) for every label set seen."""
+        totals = self._totals()
+        if not totals and not self.labelnames:
+            return [({}, 0.0)]
+        return [(self._labels(key), value) for key, value in totals.items()]
+
+    @property
+    def value(self) -> float:
+        """Total across all label sets."""
+        return sum(self._totals().values())
+
+
+class Gauge(_Labelled):
+    """Value that can go up and down, or be computed on read, optionally split by labels."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        function: Optional[Callable[[], float]] = None,
+        labelnames: tuple[str, ...] = (),
+    ):
+        super().__init__(name, description, labelnames)
+        self._values: dict[LabelKey, float] = {}
+        self._function = function
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge to a value."""
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase the gauge."""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        """Decrease the gauge."""
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        """Current value for a label set."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[tuple[dict[str, str], float]]:
+        """Return (labels, value) for every label set seen."""
+        if self._function is not None:
+            return [({}, self.value)]
+        if not self._values and not self.labelnames:
+            return [({}, 0.0)]
+        return [(self._labels(key), value) for key, value in list(self._values.items())]
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return sum(self._values.values())
+
+
+class _HistogramSeries:
+    """Bucket counts, sum and count for one label set."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+    def add(self, other: "_HistogramSeries") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+
+class Histogram(_Sharded):
+    """Distribution of observed values in fixed buckets, optionally split by labels."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation."""
+        key = self._key(labels)
+        shard = self._shard()
+        series = shard.get(key)
+        if series is None:
+            series = shard[key] = _HistogramSeries(len(self.buckets) + 1)
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def _series(self) -> dict[LabelKey, _HistogramSeries]:
+        """Merge the per-thread series of every label set."""
+        merged: dict[LabelKey, _HistogramSeries] = {}
+        for shard in list(self._shards):
+            for key, series in list(shard.items()):
+                if key not in merged:
+                    merged[key] = _HistogramSeries(len(self.buckets) + 1)
+                merged[key].add(series)
+        return merged
+
+    def samples(self) -> list[tuple[dict[str, str], _HistogramSeries]]:
+        """Return (labels, series) for every label set seen."""
+        return [(self._labels(key), series) for key, series in self._series().items()]
+
+    def _merged(self, labels: dict) -> _HistogramSeries:
+        """Combine all series matching the given (partial) labels."""
+        merged = _HistogramSeries(len(self.buckets) + 1)
+        for key, series in self._series().items():
+            series_labels = self._labels(key)
+            if all(series_labels.get(k) == str(v) for k, v in labels.items()):
+                merged.add(series)
+        return merged
+
+    def count(self, **labels) -> int:
+        return self._merged(labels).count
+
+    def sum(self, **labels) -> float:
+        return self._merged(labels).sum
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile by interpolating within buckets (None if empty)."""
+        series = self._merged(labels)
+        if series.count == 0:
+            return None
+        rank = q * series.count
+        cumulative = 0
+        for i, bucket_count in enumerate(series.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    @property
+    def value(self) -> float:
+        """Total number of observations."""
+        return float(sum(series.count for series in self._series().values()))
+
+
+Metric = Union[Counter, Gauge, Histogram]
+
+# Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Collection of named metrics shared across the process."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def counter(
+        self, name: str, description: str, labelnames: tuple[str, ...] = ()
+    ) -> Counter:
+        """Get or create a counter."""
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Counter(name, description, labelnames)
+        return metric
+
+    def gauge(
+        self,
+        name: str,
+        description: str,
+        function: Optional[Callable[[], float]] = None,
+        labelnames: tuple[str, ...] = (),
+    ) -> Gauge:
+        """Get or create a gauge, optionally computed by `function` on read."""
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Gauge(name, description, function, labelnames)
+        elif function is not None:
+            metric._function = function
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram."""
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Histogram(name, description, labelnames, buckets)
+        return metric
+
+    def metrics(self) -> list[Metric]:
+        """Return all registered metrics."""
+        return list(self._metrics.values())
+
+    def snapshot(self) -> dict[str, float]:
+        """Return current values of all metrics by name."""
+        return {name: metric.value for name, metric in self._metrics.items()}
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics():
+            kind = type(metric).__name__.lower()
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            if isinstance(metric, Histogram):
+                for labels, series in metric.samples():
+                    cumulative = 0
+                    for bound, bucket_count in zip((*metric.buckets, math.inf), series.counts):
+                        cumulative += bucket_count
+                        bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                        lines.append(f"{metric.name}_bucket{bucket_labels} {cumulative}")
+                    lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(series.sum)}")
+                    lines.append(f"{metric.name}_count{_format_labels(labels)} {series.count}")
+            else:
+                for labels, value in metric.samples():
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared process-wide registry
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, description: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    """Get or create a counter in the shared registry."""
+    return REGISTRY.counter(name, description, labelnames)
+
+
+def gauge(
+    name: str,
+    description: str,
+    function: Optional[Callable[[], float]] = None,
+    labelnames: tuple[str, ...] = (),
+) -> Gauge:
+    """Get or create a gauge in the shared registry."""
+    return REGISTRY.gauge(name, description, function, labelnames)
+
+
+def histogram(
+    name: str,
+    description: str,
+    labelnames: tuple[str, ...] = (),
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """Get or create a histogram in the shared registry."""
+    return REGISTRY.histogram(name, description, labelnames, buckets)
+
+
+def hit_ratio(hits: Counter, misses: Counter) -> Callable[[], float]:
+    """Gauge function giving the share of lookups that hit (0.0 before any lookup)."""
+
+    def ratio() -> float:
+        hit, miss = hits.value, misses.value
+        return hit / (hit + miss) if hit + miss else 0.0
+
+    return ratio
@@ -0,0 +1,445 @@
+"""Alert notification outbox and batching async delivery worker."""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import func, select, update
+
+from models.database import SessionLocal
+from models.preferences import Alert, AlertNotification
+from services import metrics
+from services.lazy_imports import lazy_import
+from services.upstream_metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+httpx = lazy_import("httpx")
+
+delivered_counter = metrics.counter(
+    "alert_notifications_delivered_total", "Alert notifications delivered to all sinks"
+)
+failed_counter = metrics.counter(
+    "alert_notifications_failed_total", "Alert notifications that exhausted their retries"
+)
+retries_counter = metrics.counter(
+    "alert_notifications_retries_total", "Alert notification delivery attempts that will be retried"
+)
+batches_counter = metrics.counter(
+    "alert_notification_batches_total", "Notification batches handed to sinks"
+)
+queue_depth_gauge = metrics.gauge(
+    "alert_outbox_queue_depth", "Pending alert notifications in the outbox"
+)
+
+
+_OUTBOX_COUNTS = (
+    select(AlertNotification.status, func.count(AlertNotification.id))
+    .where(AlertNotification.status.in_(["pending", "failed"]))
+    .group_by(AlertNotification.status)
+)
+
+
+def _record_outbox_counts(rows) -> tuple[int, int]:
+    counts = dict(rows)
+    pending = counts.get("pending", 0)
+    queue_depth_gauge.set(pending)
+    return pending, counts.get("failed", 0)
+
+
+def outbox_counts(db) -> tuple[int, int]:
+    """Return (pending, failed) outbox row counts and update the queue depth gauge."""
+    return _record_outbox_counts(db.execute(_OUTBOX_COUNTS).all())
+
+
+async def outbox_counts_async(db) -> tuple[int, int]:
+    """Async-session variant of `outbox_counts`."""
+    return _record_outbox_counts((await db.execute(_OUTBOX_COUNTS)).all())
+
+
+def build_notification(alert: Alert, current_price: Optional[float], message: str) -> AlertNotification:
+    """Create an outbox row for a triggered alert (add it to the same session)."""
+    triggered_at = alert.triggered_at or datetime.utcnow()
+    return AlertNotification(
+        alert_id=alert.id,
+        idempotency_key=f"alert-{alert.id}-{triggered_at.isoformat()}",
+        payload={
+            "alert_id": alert.id,
+            "symbol": alert.symbol,
+            "alert_type": alert.alert_type,
+            "target_value": alert.target_value,
+            "current_price": current_price,
+            "message": message,
+            "triggered_at": triggered_at.isoformat(),
+        },
+        next_attempt_at=triggered_at,
+    )
+
+
+class NotificationSink(ABC):
+    """
+    Destination for delivered notifications.
+
+    Delivery is at least once: a worker crashing between a sink accepting a
+    batch and the outcome being recorded sends it again, so sinks should use
+    each notification's `idempotency_key` to drop repeats.
+    """
+
+    name = "sink"
+
+    @abstractmethod
+    async def deliver(self, notifications: list[dict]) -> None:
+        """Deliver a batch of notifications, raising on failure."""
+
+    async def close(self) -> None:
+        """Release any resources held by the sink."""
+
+
+class WebhookSink(NotificationSink):
+    """POST notification batches as JSON to a webhook URL."""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def deliver(self, notifications: list[dict]) -> None:
+        with track_upstream("webhook", "deliver"):
+            response = await self._client.post(
+                self.url,
+                json={"notifications": notifications},
+                headers={"Idempotency-Key": ",".join(n["idempotency_key"] for n in notifications)},
+            )
+            response.raise_for_status()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class FileSink(NotificationSink):
+    """Append notifications to a local JSON-lines file, skipping ones already in it."""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._keys: Optional[set[str]] = None  # idempotency keys in the file, read on first use
+        self._lock = threading.Lock()
+
+    async def deliver(self, notifications: list[dict]) -> None:
+        await asyncio.to_thread(self._append, notifications)
+
+    def _read_keys(self) -> set[str]:
+        if not self.path.exists():
+            return set()
+        with self.path.open(encoding="utf-8") as f:
+            return {json.loads(line).get("idempotency_key") for line in f if line.strip()}
+
+    def _append(self, notifications: list[dict]) -> None:
+        with self._lock:
+            if self._keys is None:
+                self._keys = self._read_keys()
+            new = [n for n in notifications if n["idempotency_key"] not in self._keys]
+            if not new:
+                return
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(n) + "\n" for n in new))
+            self._keys.update(n["idempotency_key"] for n in new)
+
+
+class MemorySink(NotificationSink):
+    """Keep notifications in memory, deduplicated by idempotency key (for tests)."""
+
+    name = "memory"
+
+    def __init__(self, fail_times: int = 0):
+        self.notifications: dict[str, dict] = {}
+        self.batches: list[list[dict]] = []
+        self.fail_times = fail_times
+
+    async def deliver(self, notifications: list[dict]) -> None:
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise RuntimeError("Simulated sink failure")
+        self.batches.append(notifications)
+        for notification in notifications:
+            self.notifications.setdefault(notification["idempotency_key"], notification)
+
+
+def sinks_from_env() -> list[NotificationSink]:
+    """Build notification sinks from environment configuration."""
+    sinks: list[NotificationSink] = []
+    if url := os.getenv("NOTIFICATION_WEBHOOK_URL"):
+        sinks.append(WebhookSink(url))
+    if path := os.getenv("NOTIFICATION_FILE"):
+        sinks.append(FileSink(path))
+    return sinks
+
+
+class OutboxWorker:
+    """
+    Deliver pending outbox rows to sinks in batches.
+
+    Each pass claims due rows (leasing them so a crashed worker's rows are
+    retried later), delivers up to `max_concurrency` batches at once and
+    records the outcome. Which sinks accepted each row is recorded, so a
+    batch that failed on one sink is retried (with exponential backoff, until
+    `max_attempts` is reached) on that sink only.
+    """
+
+    def __init__(
+        self,
+        sinks: list[NotificationSink],
+        session_factory=SessionLocal,
+        batch_size: int = 50,
+        max_concurrency: int = 4,
+        max_attempts: int = 5,
+        base_backoff: float = 2.0,
+        max_backoff: float = 300.0,
+        poll_interval: float = 5.0,
+        lease_seconds: float = 60.0,
+        sink_timeout: float = 30.0,
+    ):
+        names = [sink.name for sink in sinks]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Notification sink names must be unique: {names}")
+        self.sinks = sinks
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.sink_timeout = sink_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._delivered_at: deque[tuple[float, int]] = deque()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds to wait before retry number `attempts`, with jitter."""
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def delivery_rate(self, window: float = 60.0) -> float:
+        """Notifications delivered per second over the last `window` seconds."""
+        cutoff = time.monotonic() - window
+        while self._delivered_at and self._delivered_at[0][0] < cutoff:
+            self._delivered_at.popleft()
+        return sum(count for _, count in self._delivered_at) / window
+
+    def _claim_due(self) -> list[dict]:
+        """
+        Lease due pending rows and return them as notifications.
+
+        The lease is taken with a conditional UPDATE that only applies while
+        the row is still due, so when several workers (or processes) select
+        the same rows, each row is claimed by exactly one of them.
+        """
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        db = self.session_factory()
+        try:
+            due = db.scalars(
+                select(AlertNotification.id)
+                .where(
+                    AlertNotification.status == "pending",
+                    AlertNotification.next_attempt_at <= now,
+                )
+                .order_by(AlertNotification.id)
+                .limit(self.batch_size * self.max_concurrency)
+            ).all()
+            claimed_ids = [
+                row_id
+                for row_id in due
+                if db.execute(
+                    update(AlertNotification)
+                    .where(
+                        AlertNotification.id == row_id,
+                        AlertNotification.status == "pending",
+                        AlertNotification.next_attempt_at <= now,
+                    )
+                    .values(next_attempt_at=lease_until)
+                ).rowcount
+            ]
+            db.commit()
+            rows = (
+                db.query(AlertNotification)
+                .filter(AlertNotification.id.in_(claimed_ids))
+                .order_by(AlertNotification.id)
+                .all()
+            )
+            claimed = [
+                {
+                    "id": row.id,
+                    "delivered_sinks": row.delivered_sinks or [],
+                    "idempotency_key": row.idempotency_key,
+                    **(row.payload or {}),
+                }
+                for row in rows
+            ]
+            outbox_counts(db)
+            return claimed
+        finally:
+            db.close()
+
+    def _record_results(
+        self, delivered: list[int], failed: dict[int, str], delivered_sinks: dict[int, list[str]]
+    ) -> None:
+        """Mark delivered rows done and schedule retries for failed rows."""
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            ids = delivered + list(failed)
+            rows = db.query(AlertNotification).filter(AlertNotification.id.in_(ids)).all()
+            for row in rows:
+                row.attempts = (row.attempts or 0) + 1
+                row.delivered_sinks = delivered_sinks[row.id]
+                if row.id in failed:
+                    row.last_error = failed[row.id][:500]
+                    if row.attempts >= self.max_attempts:
+                        row.status = "failed"
+                        failed_counter.inc()
+                    else:
+                        row.next_attempt_at = now + timedelta(seconds=self.backoff(row.attempts))
+                        retries_counter.inc()
+                else:
+                    row.status = "delivered"
+                    row.delivered_at = now
+            db.commit()
+        finally:
+            db.close()
+
+    async def _deliver_batch(self, batch: list[dict]) -> Optional[str]:
+        """
+        Deliver one batch to every sink that does not have it yet, adding the
+        sinks that accept it to each row's `delivered_sinks`. Returns an error
+        message if any sink failed.
+        """
+        errors = []
+        async with self._semaphore:
+            batches_counter.inc()
+            for sink in self.sinks:
+                rows = [n for n in batch if sink.name not in n["delivered_sinks"]]
+                if not rows:
+                    continue
+                notifications = [
+                    {k: v for k, v in n.items() if k not in ("id", "delivered_sinks")} for n in rows
+                ]
+                try:
+                    await asyncio.wait_for(sink.deliver(notifications), self.sink_timeout)
+                except Exception as e:
+                    logger.warning(f"Notification batch of {len(rows)} failed on {sink.name}: {e!r}")
+                    errors.append(f"{sink.name}: {e!r}")
+                    continue
+                for n in rows:
+                    n["delivered_sinks"] = [*n["delivered_sinks"], sink.name]
+        return "; ".join(errors) or None
+
+    async def run_once(self) -> int:
+        """Run a single claim/deliver/record pass, returning rows processed."""
+        claimed = await asyncio.to_thread(self._claim_due)
+        if not claimed:
+            return 0
+
+        batches = [
+            claimed[i : i + self.batch_size] for i in range(0, len(claimed), self.batch_size)
+        ]
+        errors = await asyncio.gather(*(self._deliver_batch(b) for b in batches))
+
+        delivered: list[int] = []
+        failed: dict[int, str] = {}
+        for batch, error in zip(batches, errors):
+            if error is None:
+                delivered.extend(n["id"] for n in batch)
+            else:
+                failed.update({n["id"]: error for n in batch})
+
+        delivered_sinks = {n["id"]: n["delivered_sinks"] for n in claimed}
+        await asyncio.to_thread(self._record_results, delivered, failed, delivered_sinks)
+        if delivered:
+            delivered_counter.inc(len(delivered))
+            self._delivered_at.append((time.monotonic(), len(delivered)))
+        return len(claimed)
+
+    def wake(self) -> None:
+        """Ask the worker to poll immediately instead of waiting."""
+        self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                logger.error(f"Outbox worker pass failed: {e}")
+                processed = 0
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self) -> None:
+        """Start the background delivery loop."""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the delivery loop and close sinks."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for sink in self.sinks:
+            await sink.close()
+
+
+# Process-wide worker, started by the application lifespan when sinks are configured
+outbox_worker: Optional[OutboxWorker] = None
+
+
+def start_outbox_worker() -> Optional[OutboxWorker]:
+    """Start the outbox worker if any notification sinks are configured."""
+    global outbox_worker
+    sinks = sinks_from_env()
+    if not sinks:
+        return None
+    outbox_worker = OutboxWorker(sinks)
+    outbox_worker.start()
+    logger.info(f"Outbox worker started with sinks: {[s.name for s in sinks]}")
+    return outbox_worker
+
+
+async def stop_outbox_worker() -> None:
+    """Stop the outbox worker if running."""
+    global outbox_worker
+    if outbox_worker is not None:
+        await outbox_worker.stop()
+        outbox_worker = None
+
+
+def wake_outbox_worker() -> None:
+    """Signal the outbox worker that new notifications are pending."""
+    if outbox_worker is not None:
+        outbox_worker.wake()
@@ -0,0 +1,138 @@
+"""Local daily price history and rolling reference-price cache for alerts."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from services.lazy_imports import lazy_import
+from services.market_data import get_provider
+from services.upstream_metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+np = lazy_import("numpy")
+
+# How much daily history to keep per symbol (calendar days)
+HISTORY_DAYS = 400
+
+# Reload a symbol's history once it is older than this
+HISTORY_MAX_AGE = timedelta(hours=12)
+
+
+def _download_history(
+    symbols: list[str], days: int
+) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Download daily closes for many symbols in a single provider request."""
+    provider = get_provider()
+    with track_upstream(provider.name, "history"):
+        return provider.history(symbols, days)
+
+
+class PriceHistoryStore:
+    """
+    In-memory daily close history with a rolling reference-price cache.
+
+    History is loaded for all missing or stale symbols in one bulk download,
+    so checking alerts never re-downloads history per alert. Reference prices
+    are cached per (symbol, window) and roll over automatically each day.
+    """
+
+    def __init__(
+        self,
+        history_days: int = HISTORY_DAYS,
+        max_age: timedelta = HISTORY_MAX_AGE,
+    ):
+        self.history_days = history_days
+        self.max_age = max_age
+        self._dates: dict[str, np.ndarray] = {}
+        self._closes: dict[str, np.ndarray] = {}
+        self._loaded_at: dict[str, datetime] = {}
+        self._reference_cache: dict[tuple[str, int], Optional[float]] = {}
+        self._reference_day: Optional[date] = None
+        self._lock = threading.Lock()
+
+    def set_history(self, symbol: str, dates, closes) -> None:
+        """Store daily closes for a symbol, replacing any existing history."""
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        closes = np.asarray(closes, dtype=float)
+        order = np.argsort(dates)
+        with self._lock:
+            self._dates[symbol] = dates[order]
+            self._closes[symbol] = closes[order]
+            self._loaded_at[symbol] = datetime.utcnow()
+            self._reference_cache = {
+                k: v for k, v in self._reference_cache.items() if k[0] != symbol
+            }
+
+    def has_history(self, symbol: str) -> bool:
+        """Check whether history is loaded for a symbol."""
+        return symbol in self._closes
+
+    def ensure_loaded(self, symbols: list[str]) -> None:
+        """Load history for any missing or stale symbols in one bulk request."""
+        now = datetime.utcnow()
+        stale = sorted(
+            {
+                s
+                for s in symbols
+                if s not in self._loaded_at or now - self._loaded_at[s] > self.max_age
+            }
+        )
+        if not stale:
+            return
+
+        try:
+            history = _download_history(stale, self.history_days)
+        except Exception as e:
+            logger.error(f"Error downloading price history for {len(stale)} symbols: {e}")
+            return
+
+        for symbol, (dates, closes) in history.items():
+            self.set_history(symbol, dates, closes)
+
+    def reference_price(
+        self, symbol: str, window_days: int, today: Optional[date] = None
+    ) -> Optional[float]:
+        """
+        Get the closing price `window_days` calendar days before today.
+
+        Uses the most recent close on or before that day, so weekends and
+        holidays fall back to the previous trading session.
+        """
+        today = today or datetime.utcnow().date()
+        key = (symbol, window_days)
+
+        with self._lock:
+            if self._reference_day != today:
+                self._reference_cache.clear()
+                self._reference_day = today
+            if key in self._reference_cache:
+                return self._reference_cache[key]
+
+            dates = self._dates.get(symbol)
+            closes = self._closes.get(symbol)
+            reference = None
+            if dates is not None and len(dates):
+                cutoff = np.datetime64(today - timedelta(days=window_days), "D")
+                idx = int(np.searchsorted(dates, cutoff, side="right")) - 1
+                if idx >= 0:
+                    reference = float(closes[idx])
+
+            self._reference_cache[key] = reference
+            return reference
+
+    def clear(self) -> None:
+        """Drop all stored history and cached reference prices."""
+        with self._lock:
+            self._dates.clear()
+            self._closes.clear()
+            self._loaded_at.clear()
+            self._reference_cache.clear()
+            self._reference_day = None
+
+
+# Shared process-wide store
+price_history = PriceHistoryStore()
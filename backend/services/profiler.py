@@ -0,0 +1,299 @@
+"""On-demand cProfile reports for single requests."""
+
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Profiling is off unless enabled; when off the middleware is not installed at all
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+
+# Share of requests profiled without being asked (0.0 - 1.0)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+# Request header that asks for a profile; must equal PROFILE_TOKEN when one is set
+PROFILE_HEADER = "x-profile"
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+
+# Directory reports are written to (.prof for pstats/snakeviz, .json summary); empty keeps them in memory only
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+
+# Reports kept in memory for /debug/profiles
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+BACKEND_DIR = str(Path(__file__).resolve().parent.parent)
+
+# Where a function's own time is attributed, by path fragment of its source file
+CATEGORY_PATHS = (
+    ("db", ("/sqlalchemy/", "/aiosqlite/", "/asyncpg/", "/psycopg", f"{BACKEND_DIR}/models/")),
+    ("upstream", ("/yfinance/", "/httpx/", "/httpcore/", "/openai/", "/requests/", "/urllib3/")),
+    ("service", (f"{BACKEND_DIR}/services/",)),
+    ("route", (f"{BACKEND_DIR}/api/",)),
+)
+# Built-in functions (reported without a file) by name fragment
+CATEGORY_BUILTINS = (
+    ("db", ("sqlite3.",)),
+    ("upstream", ("_socket.", "_ssl.")),
+    ("idle", ("select.", "epoll", "kqueue")),
+)
+CATEGORIES = ("route", "service", "db", "upstream", "idle", "other")
+
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+
+def category(filename: str, function: str) -> str:
+    """Category of a profiled function: route, service, db, upstream, idle or other."""
+    if filename == "~":
+        for name, fragments in CATEGORY_BUILTINS:
+            if any(fragment in function for fragment in fragments):
+                return name
+        return "other"
+    for name, fragments in CATEGORY_PATHS:
+        if any(fragment in filename for fragment in fragments):
+            return name
+    return "other"
+
+
+def _short_name(filename: str, line: int, function: str) -> str:
+    if filename == "~":
+        return function
+    if filename.startswith(BACKEND_DIR):
+        filename = filename[len(BACKEND_DIR) + 1 :]
+    return f"{filename}:{line}({function})"
+
+
+class RequestProfile:
+    """
+    One profiled request.
+
+    cProfile sees the event-loop thread only; DB statements and upstream
+    calls also report their wall time here through `record`, including
+    those run on worker threads, so the breakdown covers both.
+
+    cProfile cannot tell coroutines apart, so the loop breakdown and pstats
+    listing also include any other request running on the loop meanwhile.
+    `overlapping_requests` counts those; the report is exact only when it
+    is 0, which the timed DB and upstream calls always are.
+    """
+
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = datetime.utcnow()
+        self.status: Optional[int] = None
+        self.wall_seconds = 0.0
+        self.overlapping_requests = 0
+        self.timed: dict[str, dict[str, list[float]]] = {"db": {}, "upstream": {}}
+        self._profile = cProfile.Profile()
+        self._started = 0.0
+        self._lock = threading.Lock()
+        self._context_token: Optional[contextvars.Token] = None
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+        self.wall_seconds = time.perf_counter() - self._started
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def record(self, kind: str, name: str, seconds: float) -> None:
+        """Add the wall time of one DB statement or upstream call."""
+        with self._lock:
+            calls = self.timed[kind].setdefault(name, [0, 0.0])
+            calls[0] += 1
+            calls[1] += seconds
+
+    def timed_total(self, kind: str) -> float:
+        return sum(seconds for _, seconds in self.timed[kind].values())
+
+    def stats(self) -> pstats.Stats:
+        return pstats.Stats(self._profile)
+
+    def breakdown(self) -> dict[str, float]:
+        """Own time on the event-loop thread per category; sums to the profiled time."""
+        totals = dict.fromkeys(CATEGORIES, 0.0)
+        for (filename, _, function), (_, _, own, _, _) in self.stats().stats.items():
+            totals[category(filename, function)] += own
+        return {name: round(seconds, 6) for name, seconds in totals.items()}
+
+    def top_functions(self, limit: int = 25) -> list[dict]:
+        """Application functions (routes, services, models) by cumulative time."""
+        rows = []
+        for (filename, line, function), (_, calls, own, cumulative, _) in self.stats().stats.items():
+            if filename.startswith(BACKEND_DIR):
+                rows.append(
+                    {
+                        "function": _short_name(filename, line, function),
+                        "category": category(filename, function),
+                        "calls": calls,
+                        "own_seconds": round(own, 6),
+                        "cumulative_seconds": round(cumulative, 6),
+                    }
+                )
+        rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+        return rows[:limit]
+
+    def stats_text(self, limit: int = 40) -> str:
+        """pstats listing of the most expensive calls by cumulative time."""
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def server_timing(self) -> str:
+        """Server-Timing header value so the split shows in browser dev tools."""
+        entries = [
+            ("db", self.timed_total("db")),
+            ("upstream", self.timed_total("upstream")),
+            ("total", self.elapsed()),
+        ]
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in entries)
+
+    def as_dict(self, include_stats: bool = True) -> dict:
+        report = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": round(self.wall_seconds, 6),
+            "overlapping_requests": self.overlapping_requests,
+            "loop_breakdown_seconds": self.breakdown(),
+            "timed_seconds": {
+                kind: {
+                    "total": round(self.timed_total(kind), 6),
+                    "calls": {
+                        name: {"count": count, "seconds": round(seconds, 6)}
+                        for name, (count, seconds) in calls.items()
+                    },
+                }
+                for kind, calls in self.timed.items()
+            },
+            "top_functions": self.top_functions(),
+        }
+        if include_stats:
+            report["stats"] = self.stats_text()
+        return report
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and keeps their reports.
+
+    A request is profiled when it carries the profile header (matching
+    PROFILE_TOKEN if set) or is picked by PROFILE_SAMPLE_RATE. Only one
+    request is profiled at a time, since cProfile hooks the whole thread;
+    requests arriving meanwhile run unprofiled, and are counted as
+    overlapping it (as are those already running when it starts).
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        token: str = PROFILE_TOKEN,
+        directory: str = PROFILE_DIR,
+        keep: int = PROFILE_KEEP,
+    ):
+        self.sample_rate = sample_rate
+        self.token = token
+        self.directory = Path(directory) if directory else None
+        self.reports: deque[RequestProfile] = deque(maxlen=keep)
+        self._busy = threading.Lock()
+        self._counts = threading.Lock()
+        self._in_flight = 0
+        self._active: Optional[RequestProfile] = None
+
+    def enter(self) -> None:
+        """Note a request starting (profiled or not)."""
+        with self._counts:
+            self._in_flight += 1
+            if self._active is not None:
+                self._active.overlapping_requests += 1
+
+    def leave(self) -> None:
+        """Note a request finishing."""
+        with self._counts:
+            self._in_flight -= 1
+
+    def trigger(self, header: Optional[str]) -> Optional[str]:
+        """How this request asked to be profiled ("header" or "sample"), or None."""
+        if header is not None and (not self.token or hmac.compare_digest(header, self.token)):
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def begin(self, method: str, path: str, trigger: str) -> Optional[RequestProfile]:
+        """Start profiling a request, or return None if another one is being profiled."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = RequestProfile(method, path, trigger)
+        with self._counts:
+            # Requests already running, other than this one
+            profile.overlapping_requests = max(0, self._in_flight - 1)
+            self._active = profile
+        profile._context_token = _current.set(profile)
+        profile.start()
+        return profile
+
+    def finish(self, profile: RequestProfile) -> None:
+        """Stop profiling and keep (and optionally write) the report."""
+        try:
+            profile.stop()
+            _current.reset(profile._context_token)
+        finally:
+            with self._counts:
+                self._active = None
+            self._busy.release()
+        self.reports.append(profile)
+        if self.directory is not None:
+            try:
+                self._write(profile)
+            except OSError as e:
+                logger.error(f"Could not write profile {profile.id}: {e}")
+        logger.info(
+            f"Profiled {profile.method} {profile.path} ({profile.trigger}) in "
+            f"{profile.wall_seconds * 1000:.1f}ms: {profile.id}"
+        )
+
+    def _write(self, profile: RequestProfile) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{profile.started_at:%Y%m%dT%H%M%S}-{profile.id}"
+        profile.stats().dump_stats(self.directory / f"{stem}.prof")
+        (self.directory / f"{stem}.json").write_text(json.dumps(profile.as_dict(), indent=2))
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return next((profile for profile in self.reports if profile.id == profile_id), None)
+
+
+def record(kind: str, name: str, seconds: float) -> None:
+    """Attribute a DB statement or upstream call to the request being profiled, if any."""
+    profile = _current.get()
+    if profile is not None:
+        profile.record(kind, name, seconds)
+
+
+request_profiler = RequestProfiler()
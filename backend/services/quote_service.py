@@ -0,0 +1,277 @@
+"""Batched, cached quote lookups shared by all requests."""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Mapping, NamedTuple, Optional
+
+from services import metrics, shared_cache
+from services.deadline import Deadline
+from services.fundamentals_store import fundamentals_store
+from services.stock_service import StockData, fetch_stock_data, peek_universe_snapshot
+
+logger = logging.getLogger(__name__)
+
+# How long a fetched quote is reused
+QUOTE_TTL_SECONDS = float(os.getenv("QUOTE_TTL_SECONDS", "60"))
+
+# Fetched quotes kept (least recently used are dropped first)
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", "2048"))
+
+# Upstream fetches running at once across all requests
+QUOTE_FETCH_CONCURRENCY = int(os.getenv("QUOTE_FETCH_CONCURRENCY", "8"))
+
+# Share of a request budget kept for reading stored fundamentals of symbols
+# whose fetch misses it
+QUOTE_FALLBACK_RESERVE = float(os.getenv("QUOTE_FALLBACK_RESERVE", "0.2"))
+
+hits_counter = metrics.counter("quote_cache_hits_total", "Quotes served from cache or snapshot")
+misses_counter = metrics.counter("quote_cache_misses_total", "Quotes fetched from upstream")
+hit_ratio_gauge = metrics.gauge(
+    "quote_cache_hit_ratio",
+    "Share of quote lookups served without an upstream fetch",
+    metrics.hit_ratio(hits_counter, misses_counter),
+)
+deadline_misses_counter = metrics.counter(
+    "quote_deadline_misses_total", "Quote fetches still running when the request budget ran out"
+)
+stale_counter = metrics.counter(
+    "quote_stale_served_total", "Last known quotes served in place of a fresh one", ("source",)
+)
+
+
+class Quote(NamedTuple):
+    """A quote and when its data was fetched."""
+
+    stock: StockData
+    as_of: datetime
+    stale: bool = False
+
+
+class QuoteCache:
+    """
+    Quote cache with single-flight upstream fetches.
+
+    A batch lookup serves fresh cached quotes (or fresh universe snapshot
+    rows, shared across workers when SHARED_SNAPSHOT_PATH is set) immediately,
+    and fetches the rest on a shared bounded thread pool. Concurrent requests
+    for the same symbol share one fetch. At most `size` fetched quotes are
+    kept, so lookups of arbitrary symbols cannot grow the cache without bound.
+    """
+
+    def __init__(
+        self,
+        ttl: float = QUOTE_TTL_SECONDS,
+        concurrency: int = QUOTE_FETCH_CONCURRENCY,
+        size: int = QUOTE_CACHE_SIZE,
+    ):
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.size = size
+        self._quotes: OrderedDict[str, Quote] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _is_fresh(self, as_of: datetime) -> bool:
+        return (datetime.utcnow() - as_of).total_seconds() < self.ttl
+
+    def _snapshot_quotes(self) -> tuple[Mapping[str, StockData], Optional[datetime]]:
+        """Universe snapshot rows by symbol and their fetch time, whatever their age."""
+        # The host-wide snapshot is read in place, one row per looked-up symbol
+        shared = shared_cache.shared_snapshot
+        view = shared.read() if shared is not None else None
+        if view is not None:
+            return view, view.fetched_at
+
+        snapshot = peek_universe_snapshot()
+        if snapshot is None:
+            return {}, None
+        return {stock.symbol: stock for stock in snapshot.stocks}, snapshot.fetched_at
+
+    def _cached(
+        self, symbol: str, snapshot_quotes: Mapping[str, StockData], snapshot_as_of: Optional[datetime]
+    ) -> Optional[Quote]:
+        """Return a fresh quote from the cache or the universe snapshot."""
+        quote = self._fresh_quote(symbol)
+        if quote is not None:
+            return quote
+        stock = snapshot_quotes.get(symbol)
+        if stock is not None and self._is_fresh(snapshot_as_of):
+            return Quote(stock, snapshot_as_of)
+        return None
+
+    def _last_known(
+        self, symbol: str, snapshot_quotes: Mapping[str, StockData], snapshot_as_of: Optional[datetime]
+    ) -> Optional[Quote]:
+        """The newest quote held in memory regardless of age, marked stale."""
+        candidates = []
+        quote = self._quotes.get(symbol)
+        if quote is not None:
+            candidates.append(quote)
+        stock = snapshot_quotes.get(symbol)
+        if stock is not None:
+            candidates.append(Quote(stock, snapshot_as_of))
+        if not candidates:
+            return None
+        return max(candidates, key=lambda quote: quote.as_of)._replace(stale=True)
+
+    def _fresh_quote(self, symbol: str) -> Optional[Quote]:
+        """A fetched quote still within its TTL, marked as recently used."""
+        with self._lock:
+            quote = self._quotes.get(symbol)
+            if quote is None or not self._is_fresh(quote.as_of):
+                return None
+            self._quotes.move_to_end(symbol)
+            return quote
+
+    def _fetch(self, symbol: str) -> Optional[Quote]:
+        quote = None
+        try:
+            stock = fetch_stock_data(symbol)
+            if stock is not None:
+                quote = Quote(stock, datetime.utcnow())
+        finally:
+            # Store the quote before dropping the in-flight entry, so a lookup
+            # in between finds one or the other rather than fetching again
+            with self._lock:
+                if quote is not None:
+                    self._quotes[symbol] = quote
+                    self._quotes.move_to_end(symbol)
+                    while len(self._quotes) > self.size:
+                        self._quotes.popitem(last=False)
+                self._inflight.pop(symbol, None)
+        return quote
+
+    def _submit(self, symbol: str) -> Future:
+        """Start (or join) the upstream fetch for a symbol."""
+        with self._lock:
+            future = self._inflight.get(symbol)
+            if future is not None:
+                return future
+            quote = self._quotes.get(symbol)
+            if quote is not None and self._is_fresh(quote.as_of):
+                # Fetched since the caller looked in the cache
+                future = Future()
+                future.set_result(quote)
+                return future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.concurrency, thread_name_prefix="quotes"
+                )
+            # Run in the caller's context so its request profile sees the fetch
+            future = self._inflight[symbol] = self._executor.submit(
+                contextvars.copy_context().run, self._fetch, symbol
+            )
+            return future
+
+    async def _stream_quotes(
+        self, symbols: list[str], deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[tuple[str, Optional[Quote]]]:
+        """Yield (symbol, quote) pairs, cached ones first, then fetches as they finish."""
+        pending: dict[asyncio.Future, str] = {}
+        snapshot_quotes, snapshot_as_of = self._snapshot_quotes()
+        for symbol in dict.fromkeys(symbols):
+            quote = self._cached(symbol, snapshot_quotes, snapshot_as_of)
+            if quote is not None:
+                hits_counter.inc()
+                yield symbol, quote
+            else:
+                misses_counter.inc()
+                pending[asyncio.wrap_future(self._submit(symbol))] = symbol
+
+        # Fetches are shared, so they are left to finish (and fill the cache)
+        # even if this consumer stops early or runs out of time
+        while pending:
+            timeout = deadline.remaining() if deadline is not None else None
+            done, _ = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                deadline_misses_counter.inc(len(pending))
+                logger.warning(f"Request budget ran out waiting for {sorted(pending.values())}")
+                return
+            for future in done:
+                symbol = pending.pop(future)
+                try:
+                    yield symbol, future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching quote for {symbol}: {e}")
+                    yield symbol, None
+
+    async def stream(self, symbols: list[str]) -> AsyncIterator[tuple[str, Optional[StockData]]]:
+        """Yield (symbol, stock) pairs, cached ones first, then fetches as they finish."""
+        async for symbol, quote in self._stream_quotes(symbols):
+            yield symbol, quote.stock if quote is not None else None
+
+    async def get_many(self, symbols: list[str]) -> dict[str, Optional[StockData]]:
+        """Look up quotes for a batch of symbols."""
+        return {symbol: stock async for symbol, stock in self.stream(symbols)}
+
+    async def _fallback_quotes(
+        self, symbols: list[str], deadline: Deadline
+    ) -> dict[str, Optional[Quote]]:
+        """
+        Last known quotes for symbols whose fetch missed the deadline, flagged
+        stale: from memory if held, else from the cached_stocks table, read
+        with whatever is left of the deadline.
+        """
+        snapshot_quotes, snapshot_as_of = self._snapshot_quotes()
+        quotes = {}
+        for symbol in symbols:
+            quotes[symbol] = self._last_known(symbol, snapshot_quotes, snapshot_as_of)
+            if quotes[symbol] is not None:
+                stale_counter.inc(source="memory")
+
+        unknown = [symbol for symbol in symbols if quotes[symbol] is None]
+        if unknown and not deadline.expired:
+            try:
+                stored = await asyncio.wait_for(
+                    asyncio.to_thread(fundamentals_store.load_dated, unknown),
+                    timeout=deadline.remaining(),
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Request budget ran out reading stored quotes for {unknown}")
+                stored = []
+            for stock, updated_at in stored:
+                quotes[stock.symbol] = Quote(stock, updated_at, stale=True)
+                stale_counter.inc(source="database")
+        return quotes
+
+    async def stream_within(
+        self, symbols: list[str], deadline: Deadline
+    ) -> AsyncIterator[tuple[str, Optional[Quote]]]:
+        """
+        Yield (symbol, quote) pairs within a request deadline.
+
+        Cached and fetched quotes come first, as they finish. Symbols whose
+        fetch misses the deadline (or fails) follow with their last known
+        quote, flagged stale: from memory if held, else from the cached_stocks
+        table. Fetches get the budget less QUOTE_FALLBACK_RESERVE, and the
+        table read only what is left of it. Symbols never seen before get None.
+        """
+        fetch_deadline = deadline.reserve(deadline.seconds * QUOTE_FALLBACK_RESERVE)
+        missing = dict.fromkeys(symbols)
+        async for symbol, quote in self._stream_quotes(symbols, fetch_deadline):
+            if quote is not None:
+                del missing[symbol]
+                yield symbol, quote
+        if missing:
+            for symbol, quote in (await self._fallback_quotes(list(missing), deadline)).items():
+                yield symbol, quote
+
+    async def get_within(self, symbols: list[str], deadline: Deadline) -> dict[str, Optional[Quote]]:
+        """Look up quotes for a batch of symbols within a request deadline (see `stream_within`)."""
+        return {symbol: quote async for symbol, quote in self.stream_within(symbols, deadline)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._quotes.clear()
+
+
+quote_cache = QuoteCache()
@@ -0,0 +1,211 @@
+"""Readiness checks: universe warmth, upstream provider health and database round-trip."""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services import shared_cache
+from services.market_data import get_provider
+from services.stock_service import (
+    CONSERVATIVE_UNIVERSE,
+    UNIVERSE_TTL_SECONDS,
+    get_universe_snapshot,
+    peek_universe_snapshot,
+)
+from services.upstream_metrics import UPSTREAM_WINDOW_SECONDS, recent_stats
+
+logger = logging.getLogger(__name__)
+
+# Keep the universe warm in the background: fetch it at startup when it is missing
+# or stale, retry failed fetches, and re-warm an idle instance before it goes stale
+WARM_UNIVERSE_ON_STARTUP = os.getenv("WARM_UNIVERSE_ON_STARTUP", "true").lower() == "true"
+
+# Backoff between failed warm-ups, doubling up to the maximum (seconds)
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+WARMUP_RETRY_MAX_SECONDS = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", "300"))
+
+# How often the warm-up task re-checks the snapshot while it is healthy (seconds)
+WARMUP_CHECK_SECONDS = float(os.getenv("WARMUP_CHECK_SECONDS", "60"))
+
+# Share of the universe the snapshot must hold before the instance takes traffic
+READY_MIN_UNIVERSE_FILL = float(os.getenv("READY_MIN_UNIVERSE_FILL", "0.9"))
+
+# Oldest snapshot an instance may serve from and still report ready (seconds)
+READY_MAX_SNAPSHOT_AGE_SECONDS = float(
+    os.getenv("READY_MAX_SNAPSHOT_AGE_SECONDS", str(UNIVERSE_TTL_SECONDS * 4))
+)
+
+# Highest recent market data error rate, checked once there are enough recent calls
+READY_MAX_PROVIDER_ERROR_RATE = float(os.getenv("READY_MAX_PROVIDER_ERROR_RATE", "0.5"))
+READY_MIN_PROVIDER_CALLS = int(os.getenv("READY_MIN_PROVIDER_CALLS", "5"))
+
+# Slowest acceptable database round-trip (milliseconds)
+READY_MAX_DB_ROUND_TRIP_MS = float(os.getenv("READY_MAX_DB_ROUND_TRIP_MS", "250"))
+
+# Share of READY_MAX_SNAPSHOT_AGE_SECONDS after which an idle instance re-warms
+REWARM_AT_AGE_RATIO = 0.5
+
+_warmup_task: Optional[asyncio.Task] = None
+_warmup_wake: Optional[asyncio.Event] = None
+_warming = False
+
+
+def _universe_state() -> tuple[int, Optional[float]]:
+    """Stocks in the current universe snapshot and its age in seconds (None if cold)."""
+    shared = shared_cache.shared_snapshot
+    view = shared.read() if shared is not None else None
+    if view is not None:
+        return len(view), view.age_seconds()
+    snapshot = peek_universe_snapshot()
+    if snapshot is None:
+        return 0, None
+    return len(snapshot.stocks), (datetime.utcnow() - snapshot.fetched_at).total_seconds()
+
+
+def universe_check() -> dict:
+    """The snapshot holds enough of the universe and is recent enough to serve."""
+    stocks, age = _universe_state()
+    fill_ratio = stocks / len(CONSERVATIVE_UNIVERSE)
+    return {
+        "ok": fill_ratio >= READY_MIN_UNIVERSE_FILL
+        and age is not None
+        and age <= READY_MAX_SNAPSHOT_AGE_SECONDS,
+        "stocks": stocks,
+        "fill_ratio": round(fill_ratio, 3),
+        "min_fill_ratio": READY_MIN_UNIVERSE_FILL,
+        "age_seconds": round(age, 1) if age is not None else None,
+        "max_age_seconds": READY_MAX_SNAPSHOT_AGE_SECONDS,
+        "warming": warming_up(),
+    }
+
+
+def provider_check() -> dict:
+    """Recent market data calls mostly succeed (not judged on too few calls)."""
+    provider = get_provider().name
+    stats = recent_stats(provider)
+    judged = stats["calls"] >= READY_MIN_PROVIDER_CALLS
+    return {
+        "ok": not judged or stats["error_rate"] <= READY_MAX_PROVIDER_ERROR_RATE,
+        "provider": provider,
+        "window_seconds": UPSTREAM_WINDOW_SECONDS,
+        **stats,
+        "max_error_rate": READY_MAX_PROVIDER_ERROR_RATE,
+    }
+
+
+async def database_check(db: AsyncSession) -> dict:
+    """A trivial query completes, and quickly."""
+    start = time.perf_counter()
+    try:
+        await db.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.error(f"Readiness database check failed: {e}")
+        return {"ok": False, "round_trip_ms": None, "error": str(e)}
+    round_trip_ms = (time.perf_counter() - start) * 1000
+    return {
+        "ok": round_trip_ms <= READY_MAX_DB_ROUND_TRIP_MS,
+        "round_trip_ms": round(round_trip_ms, 2),
+        "max_round_trip_ms": READY_MAX_DB_ROUND_TRIP_MS,
+    }
+
+
+async def readiness(db: AsyncSession) -> dict:
+    """Run every check; the instance is ready only when all pass."""
+    checks = {
+        "universe": universe_check(),
+        "provider": provider_check(),
+        "database": await database_check(db),
+    }
+    if not checks["universe"]["ok"] and _warmup_wake is not None:
+        # Re-warm now rather than at the next periodic check
+        _warmup_wake.set()
+    return {"ready": all(check["ok"] for check in checks.values()), "checks": checks}
+
+
+def warming_up() -> bool:
+    """Whether a universe warm-up fetch is running right now."""
+    return _warming
+
+
+def _needs_warming() -> bool:
+    """The universe check fails, or the snapshot is old enough to re-warm ahead of it."""
+    check = universe_check()
+    age = check["age_seconds"]
+    return not check["ok"] or age >= READY_MAX_SNAPSHOT_AGE_SECONDS * REWARM_AT_AGE_RATIO
+
+
+def _next_check_in() -> float:
+    """Seconds until the snapshot reaches re-warm age, at most WARMUP_CHECK_SECONDS."""
+    _, age = _universe_state()
+    if age is None:
+        return 0.0
+    return max(0.0, min(WARMUP_CHECK_SECONDS, READY_MAX_SNAPSHOT_AGE_SECONDS * REWARM_AT_AGE_RATIO - age))
+
+
+async def _warm_universe() -> bool:
+    """Refetch the universe; True when the instance's universe check passes afterwards."""
+    global _warming
+    _warming = True
+    try:
+        snapshot = await asyncio.to_thread(get_universe_snapshot, force_refresh=True)
+        logger.info(f"Universe warm-up finished with {len(snapshot.stocks)} stocks")
+    except Exception as e:
+        logger.error(f"Universe warm-up failed: {e}")
+        return False
+    finally:
+        _warming = False
+    return universe_check()["ok"]
+
+
+async def _keep_universe_warm() -> None:
+    retry = WARMUP_RETRY_SECONDS
+    while True:
+        if _needs_warming():
+            if not await _warm_universe():
+                logger.warning(f"Universe still not ready, retrying warm-up in {retry:.0f}s")
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, WARMUP_RETRY_MAX_SECONDS)
+                continue
+            retry = WARMUP_RETRY_SECONDS
+        _warmup_wake.clear()
+        try:
+            await asyncio.wait_for(_warmup_wake.wait(), timeout=max(_next_check_in(), 1.0))
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_universe_warmup() -> Optional[asyncio.Task]:
+    """
+    Keep the universe snapshot warm in the background, so the instance can
+    become (and stay) ready without depending on traffic it will not get
+    while it is out of rotation: fetch it when the snapshot hydrated from
+    the database is missing, incomplete or stale, retry failures with
+    backoff, and re-warm an idle instance before the snapshot ages past
+    READY_MAX_SNAPSHOT_AGE_SECONDS or whenever the universe check fails.
+    """
+    global _warmup_task, _warmup_wake
+    if not WARM_UNIVERSE_ON_STARTUP or (_warmup_task is not None and not _warmup_task.done()):
+        return None
+    _warmup_wake = asyncio.Event()
+    _warmup_task = asyncio.create_task(_keep_universe_warm())
+    return _warmup_task
+
+
+async def stop_universe_warmup() -> None:
+    """Cancel the background warm-up task."""
+    global _warmup_task, _warmup_wake
+    if _warmup_task is None:
+        return
+    _warmup_task.cancel()
+    try:
+        await _warmup_task
+    except asyncio.CancelledError:
+        pass
+    _warmup_task = None
+    _warmup_wake = None
@@ -0,0 +1,84 @@
+"""Pre-encoded JSON bodies for popular responses, keyed by their ETag."""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import orjson
+from fastapi import Response
+
+from services import metrics
+
+# Encoded bodies kept (least recently used are dropped first)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+
+hits_counter = metrics.counter("response_cache_hits_total", "Responses served pre-encoded")
+misses_counter = metrics.counter("response_cache_misses_total", "Responses encoded on request")
+hit_ratio_gauge = metrics.gauge(
+    "response_cache_hit_ratio",
+    "Share of cacheable responses served pre-encoded",
+    metrics.hit_ratio(hits_counter, misses_counter),
+)
+
+
+def encode(content) -> bytes:
+    """Encode plain JSON data (dicts, lists, scalars, datetimes) with orjson."""
+    return orjson.dumps(content)
+
+
+def encoded_response(body: bytes, response: Optional[Response] = None) -> Response:
+    """
+    Send an already encoded JSON body, skipping response model validation,
+    with the headers set on the route's injected `response` (ETag etc.).
+    """
+    headers = (
+        {key: value for key, value in response.headers.items() if key != "content-length"}
+        if response is not None
+        else None
+    )
+    return Response(body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """
+    LRU of encoded response bodies.
+
+    Keys are the responses' ETags, which already cover the snapshot version
+    and query, so bodies of an old snapshot simply stop being asked for and
+    age out; there is nothing to invalidate.
+    """
+
+    def __init__(self, size: int = RESPONSE_CACHE_SIZE):
+        self.size = size
+        self._bodies: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+        return body
+
+    def get_or_encode(self, key: str, build: Callable[[], object]) -> bytes:
+        """The encoded body for a key, building and encoding it on a miss."""
+        body = self.get(key)
+        if body is not None:
+            hits_counter.inc()
+            return body
+        misses_counter.inc()
+        body = encode(build())
+        with self._lock:
+            self._bodies[key] = body
+            self._bodies.move_to_end(key)
+            while len(self._bodies) > self.size:
+                self._bodies.popitem(last=False)
+        return body
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bodies.clear()
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,208 @@
+"""Vectorized rule-based scoring and ranking of the stock universe."""
+
+import threading
+from typing import Optional
+
+import numpy as np
+
+from services import shared_cache
+from services.ai_service import StockRecommendation
+from services.stock_service import StockData, UniverseSnapshot
+
+RECOMMENDATIONS = ["strong_buy", "buy", "hold", "sell", "strong_sell"]
+CONFIDENCES = np.array([0.85, 0.70, 0.60, 0.55, 0.50])
+RISK_LEVELS = ["low", "medium", "high"]
+
+# Points per metric tier, tier 0 always meaning "missing"
+DIVIDEND_POINTS = np.array([0, 2, 1, 0])  # missing, >= 3%, >= 2%, low
+PE_POINTS = np.array([0, 2, 1, -1])  # missing, < 15, < 25, high
+BETA_POINTS = np.array([0, 2, 1, -1, 0])  # missing, < 0.8, < 1.0, > 1.2, neutral
+MARKET_CAP_POINTS = np.array([0, 1, 0, 0])  # missing, >= 100B, < 10B, neutral
+DEBT_POINTS = np.array([0, 1, -1, 0])  # missing, < 50, > 100, neutral
+
+
+def _column(
+    stocks: list[StockData], field: str, columns: Optional[shared_cache.SnapshotView] = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return (values, present) arrays, where present mirrors the scalar truthiness checks."""
+    if columns is not None:
+        # Mapped shared snapshot column: NaN for None, so present is "not NaN and not 0"
+        values = columns.array(field)
+        with np.errstate(invalid="ignore"):
+            return values, ~np.isnan(values) & (values != 0)
+    raw = [getattr(s, field) for s in stocks]
+    values = np.array([v if v is not None else np.nan for v in raw], dtype=float)
+    present = np.array([bool(v) for v in raw], dtype=bool)
+    return values, present
+
+
+def _tiers(present: np.ndarray, conditions: list[np.ndarray], default: int) -> np.ndarray:
+    """Map values to tier numbers: 0 when missing, else first matching condition."""
+    with np.errstate(invalid="ignore"):
+        tiers = np.select(conditions, list(range(1, len(conditions) + 1)), default)
+    return np.where(present, tiers, 0).astype(np.int8)
+
+
+class UniverseScores:
+    """
+    Rule-based scores for every stock in a snapshot, computed in one pass.
+
+    Produces the same score, recommendation, confidence, risk level and text
+    as `_rule_based_recommendation`, plus a ranking by score. Metric columns
+    are read in place from `columns` (the mapped shared snapshot with the
+    same rows) when given.
+    """
+
+    def __init__(
+        self,
+        stocks: list[StockData],
+        version: str = "",
+        columns: Optional[shared_cache.SnapshotView] = None,
+    ):
+        self.version = version
+        self.stocks = stocks
+        self.index = {s.symbol: i for i, s in enumerate(stocks)}
+
+        dy, dy_present = _column(stocks, "dividend_yield", columns)
+        pe, pe_present = _column(stocks, "pe_ratio", columns)
+        beta, beta_present = _column(stocks, "beta", columns)
+        cap, cap_present = _column(stocks, "market_cap", columns)
+        debt, debt_present = _column(stocks, "debt_to_equity", columns)
+
+        with np.errstate(invalid="ignore"):
+            self.dividend_tier = _tiers(dy_present, [dy >= 3.0, dy >= 2.0], 3)
+            self.pe_tier = _tiers(pe_present, [pe < 15, pe < 25], 3)
+            self.beta_tier = _tiers(beta_present, [beta < 0.8, beta < 1.0, beta > 1.2], 4)
+            self.market_cap_tier = _tiers(cap_present, [cap >= 100, cap < 10], 3)
+            self.debt_tier = _tiers(debt_present, [debt < 50, debt > 100], 3)
+
+            self.score = (
+                DIVIDEND_POINTS[self.dividend_tier]
+                + PE_POINTS[self.pe_tier]
+                + BETA_POINTS[self.beta_tier]
+                + MARKET_CAP_POINTS[self.market_cap_tier]
+                + DEBT_POINTS[self.debt_tier]
+            )
+            self.recommendation_index = np.select(
+                [self.score >= 5, self.score >= 3, self.score >= 1, self.score >= -1],
+                [0, 1, 2, 3],
+                4,
+            )
+            self.confidence = CONFIDENCES[self.recommendation_index]
+            self.risk_index = np.select(
+                [beta_present & (beta < 0.8), beta_present & (beta > 1.2)], [0, 2], 1
+            )
+
+        # Best first: highest score, then confidence, then symbol for stable paging
+        symbols = np.array([s.symbol for s in stocks], dtype=str)
+        self.order = np.lexsort((symbols, -self.confidence, -self.score))
+
+    def __len__(self) -> int:
+        return len(self.stocks)
+
+    def recommendation(self, i: int) -> StockRecommendation:
+        """Build the full recommendation (with pros, cons and summary) for row `i`."""
+        stock = self.stocks[i]
+        pros: list[str] = []
+        cons: list[str] = []
+
+        tier = self.dividend_tier[i]
+        if tier == 1:
+            pros.append(f"Strong dividend yield of {stock.dividend_yield:.1f}%")
+        elif tier == 2:
+            pros.append(f"Decent dividend yield of {stock.dividend_yield:.1f}%")
+        elif tier == 3:
+            cons.append(f"Low dividend yield of {stock.dividend_yield:.1f}%")
+
+        tier = self.pe_tier[i]
+        if tier == 1:
+            pros.append(f"Attractive P/E ratio of {stock.pe_ratio:.1f}")
+        elif tier == 2:
+            pros.append(f"Reasonable P/E ratio of {stock.pe_ratio:.1f}")
+        elif tier == 3:
+            cons.append(f"High P/E ratio of {stock.pe_ratio:.1f}")
+
+        tier = self.beta_tier[i]
+        if tier == 1:
+            pros.append(f"Low volatility (beta: {stock.beta:.2f})")
+        elif tier == 2:
+            pros.append(f"Below-market volatility (beta: {stock.beta:.2f})")
+        elif tier == 3:
+            cons.append(f"Higher volatility (beta: {stock.beta:.2f})")
+
+        tier = self.market_cap_tier[i]
+        if tier == 1:
+            pros.append("Large-cap stability")
+        elif tier == 2:
+            cons.append("Smaller market cap, potentially more volatile")
+
+        tier = self.debt_tier[i]
+        if tier == 1:
+            pros.append("Low debt levels")
+        elif tier == 2:
+            cons.append("Higher debt levels")
+
+        recommendation = RECOMMENDATIONS[self.recommendation_index[i]]
+        summary = f"{stock.name} is a {stock.sector} stock "
+        if recommendation in ["strong_buy", "buy"]:
+            summary += "that shows favorable characteristics for conservative long-term investors."
+        elif recommendation == "hold":
+            summary += "with mixed metrics. Consider monitoring before making investment decisions."
+        else:
+            summary += "that may not align well with conservative investment criteria."
+
+        return StockRecommendation(
+            symbol=stock.symbol,
+            recommendation=recommendation,
+            confidence=float(self.confidence[i]),
+            summary=summary,
+            pros=pros if pros else ["Established company"],
+            cons=cons if cons else ["Limited data available"],
+            target_price=None,
+            risk_level=RISK_LEVELS[self.risk_index[i]],
+        )
+
+    def for_symbol(self, symbol: str) -> Optional[StockRecommendation]:
+        """Get the recommendation for a symbol in this snapshot, if present."""
+        i = self.index.get(symbol)
+        return self.recommendation(i) if i is not None else None
+
+    def ranked(
+        self,
+        recommendations: Optional[list[str]] = None,
+        risk_levels: Optional[list[str]] = None,
+        sector: Optional[str] = None,
+        min_score: Optional[int] = None,
+    ) -> np.ndarray:
+        """Return row indices in rank order, filtered by the given criteria."""
+        mask = np.ones(len(self.stocks), dtype=bool)
+        if recommendations:
+            wanted = [RECOMMENDATIONS.index(r) for r in recommendations if r in RECOMMENDATIONS]
+            mask &= np.isin(self.recommendation_index, wanted)
+        if risk_levels:
+            wanted = [RISK_LEVELS.index(r) for r in risk_levels if r in RISK_LEVELS]
+            mask &= np.isin(self.risk_index, wanted)
+        if sector:
+            mask &= np.array([s.sector.lower() == sector.lower() for s in self.stocks], dtype=bool)
+        if min_score is not None:
+            mask &= self.score >= min_score
+        return self.order[mask[self.order]]
+
+
+_scores: Optional[UniverseScores] = None
+_scores_lock = threading.Lock()
+
+
+def get_universe_scores(snapshot: UniverseSnapshot) -> UniverseScores:
+    """Get scores for a snapshot, computing them once per snapshot version."""
+    global _scores
+    scores = _scores
+    if scores is not None and scores.version == snapshot.version:
+        return scores
+    with _scores_lock:
+        if _scores is None or _scores.version != snapshot.version:
+            shared = shared_cache.shared_snapshot
+            view = shared.read() if shared is not None else None
+            columns = view if view is not None and view.version == snapshot.version else None
+            _scores = UniverseScores(snapshot.stocks, snapshot.version, columns)
+        return _scores
@@ -0,0 +1,98 @@
+"""Screening presets compiled from saved UserPreferences."""
+
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import select
+
+from models.preferences import UserPreferences
+from services.stock_service import ConservativeScreener, StockData, UniverseSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledPreset:
+    """
+    A saved preference compiled into a reusable screener.
+
+    Results are memoized per universe snapshot version, so repeated screens
+    of an unchanged snapshot cost a dictionary lookup.
+    """
+
+    def __init__(self, name: str, screener: ConservativeScreener, version: tuple = ()):
+        self.name = name
+        self.screener = screener
+        # (row id, updated_at) of the preferences it was compiled from
+        self.version = version
+        self._version: Optional[str] = None
+        self._results: list[StockData] = []
+        self._lock = threading.Lock()
+
+    def screen(self, snapshot: UniverseSnapshot) -> list[StockData]:
+        """Screen a snapshot, reusing the previous result if its version is unchanged."""
+        with self._lock:
+            if self._version != snapshot.version:
+                self._results = self.screener.screen(snapshot.stocks)
+                self._version = snapshot.version
+            return self._results
+
+
+def compile_preset(prefs: UserPreferences) -> CompiledPreset:
+    """Build a screener from a UserPreferences row."""
+    screener = ConservativeScreener(
+        min_dividend_yield=prefs.min_dividend_yield,
+        max_pe_ratio=prefs.max_pe_ratio,
+        min_market_cap=prefs.min_market_cap,
+        max_beta=prefs.max_beta,
+        max_debt_to_equity=prefs.max_debt_to_equity,
+        sectors=prefs.preferred_sectors or None,
+    )
+    return CompiledPreset(prefs.name, screener, (prefs.id, prefs.updated_at))
+
+
+_presets: dict[str, CompiledPreset] = {}
+
+
+async def get_preset(name: str, db) -> Optional[CompiledPreset]:
+    """
+    Get the compiled preset for a saved preference, compiling it again only
+    when the row changed.
+
+    Every lookup reads the row's id and updated_at, so edits and deletes made
+    through any worker are seen at once, and a compile that raced with an
+    edit is simply not reused.
+    """
+    row = (
+        await db.execute(
+            select(UserPreferences.id, UserPreferences.updated_at).where(
+                UserPreferences.name == name
+            )
+        )
+    ).first()
+    if row is None:
+        _presets.pop(name, None)
+        return None
+
+    version = tuple(row)
+    preset = _presets.get(name)
+    if preset is not None and preset.version == version:
+        return preset
+
+    prefs = await db.scalar(select(UserPreferences).where(UserPreferences.name == name))
+    if prefs is None:
+        return None
+    preset = compile_preset(prefs)
+    _presets[name] = preset
+    logger.debug(f"Compiled screening preset '{name}'")
+    return preset
+
+
+def invalidate_preset(name: str) -> None:
+    """Drop a compiled preset after its preferences change in this worker."""
+    _presets.pop(name, None)
+
+
+def clear_presets() -> None:
+    """Drop all compiled presets."""
+    _presets.clear()
@@ -0,0 +1,217 @@
+"""Universe snapshot shared by all API workers on a host through a memory-mapped file."""
+
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from services.lazy_imports import lazy_import
+from services.stock_service import StockData, UniverseSnapshot
+
+logger = logging.getLogger(__name__)
+
+np = lazy_import("numpy")
+
+# Snapshot file shared by the workers on this host (empty keeps a per-process snapshot)
+SHARED_SNAPSHOT_PATH = os.getenv("SHARED_SNAPSHOT_PATH", "")
+
+# File layout: header, JSON metadata (strings), then one float64 column per numeric
+# field, each `rows` values long, starting on an 8-byte boundary. Missing values are NaN.
+MAGIC = b"STRATOS1"
+HEADER = struct.Struct("<8sIII")  # magic, metadata length, rows, columns
+TEXT_FIELDS = ("symbol", "name", "sector")
+NUMERIC_FIELDS = tuple(field for field in StockData.model_fields if field not in TEXT_FIELDS)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def encode_snapshot(snapshot: UniverseSnapshot) -> bytes:
+    """Serialize a snapshot into the shared columnar file format."""
+    stocks = snapshot.stocks
+    meta = json.dumps(
+        {
+            "version": snapshot.version,
+            "fetched_at": snapshot.fetched_at.isoformat(),
+            "fields": NUMERIC_FIELDS,
+            **{f"{field}s": [getattr(s, field) for s in stocks] for field in TEXT_FIELDS},
+        },
+        separators=(",", ":"),
+    ).encode()
+
+    buffer = bytearray(_align(HEADER.size + len(meta)))
+    HEADER.pack_into(buffer, 0, MAGIC, len(meta), len(stocks), len(NUMERIC_FIELDS))
+    buffer[HEADER.size : HEADER.size + len(meta)] = meta
+    for field in NUMERIC_FIELDS:
+        values = (getattr(s, field) for s in stocks)
+        buffer += array("d", (math.nan if v is None else v for v in values)).tobytes()
+    return bytes(buffer)
+
+
+class SnapshotView(Mapping):
+    """
+    Read-only view of a mapped snapshot file.
+
+    Numeric columns are served straight from the mapping without copying;
+    `StockData` rows are only built for the symbols that are looked up.
+    """
+
+    def __init__(self, buffer):
+        magic, meta_length, rows, columns = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("not a shared snapshot file")
+        meta = json.loads(bytes(buffer[HEADER.size : HEADER.size + meta_length]))
+
+        self.version: str = meta["version"]
+        self.fetched_at = datetime.fromisoformat(meta["fetched_at"])
+        self.symbols: list[str] = meta["symbols"]
+        self.names: list[str] = meta["names"]
+        self.sectors: list[str] = meta["sectors"]
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        start = _align(HEADER.size + meta_length)
+        data = memoryview(buffer)[start : start + rows * columns * 8].cast("d")
+        self._columns = {
+            field: data[i * rows : (i + 1) * rows] for i, field in enumerate(meta["fields"])
+        }
+
+    @classmethod
+    def open(cls, path: Path) -> "SnapshotView":
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def age_seconds(self) -> float:
+        return (datetime.utcnow() - self.fetched_at).total_seconds()
+
+    def column(self, field: str) -> memoryview:
+        """Zero-copy float64 view of one numeric column (NaN where missing)."""
+        return self._columns[field]
+
+    def array(self, field: str):
+        """Zero-copy, read-only numpy view of one numeric column."""
+        return np.frombuffer(self._columns[field], dtype=np.float64)
+
+    def row(self, i: int) -> StockData:
+        values = {}
+        for field in NUMERIC_FIELDS:
+            column = self._columns.get(field)
+            value = column[i] if column is not None else math.nan
+            values[field] = None if math.isnan(value) else value
+        return StockData(symbol=self.symbols[i], name=self.names[i], sector=self.sectors[i], **values)
+
+    def stocks(self) -> list[StockData]:
+        return [self.row(i) for i in range(len(self.symbols))]
+
+    # Mapping of symbol -> StockData, so a view can stand in for a quote lookup
+    def __getitem__(self, symbol: str) -> StockData:
+        return self.row(self.index[symbol])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.symbols)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+
+class SharedSnapshot:
+    """
+    A snapshot file written by one elected refresher and mapped by every worker.
+
+    The refresher is whichever process holds an exclusive `flock` on the
+    lock file next to the snapshot; it publishes by atomically replacing the
+    file. Readers re-map the file only when it has been replaced, and keep
+    using their previous mapping until then.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._view: Optional[SnapshotView] = None
+        self._file_id: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    def read(self) -> Optional[SnapshotView]:
+        """Get the published snapshot, or None if there is none (or it is unreadable)."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if file_id != self._file_id:
+                try:
+                    self._view = SnapshotView.open(self.path)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Ignoring unreadable shared snapshot {self.path}: {e}")
+                    return None
+                self._file_id = file_id
+            return self._view
+
+    def write(self, snapshot: UniverseSnapshot) -> None:
+        """Publish a snapshot by atomically replacing the file."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(encode_snapshot(snapshot))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        logger.info(f"Published shared universe snapshot {snapshot.version} to {self.path}")
+
+    @contextmanager
+    def elected(self):
+        """Try to become the refresher; yields whether this process won."""
+        # Import here since fcntl is POSIX-only (see _create_shared_snapshot)
+        import fcntl
+
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+b") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def wait(self) -> Optional[SnapshotView]:
+        """Block until the current refresher has finished, then read."""
+        # Import here since fcntl is POSIX-only (see _create_shared_snapshot)
+        import fcntl
+
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return self.read()
+
+
+def _create_shared_snapshot(path: str) -> Optional[SharedSnapshot]:
+    """The host-wide snapshot for a path, or None for per-process snapshots."""
+    if not path:
+        return None
+    try:
+        import fcntl  # noqa: F401
+    except ImportError:
+        logger.warning(
+            "SHARED_SNAPSHOT_PATH needs POSIX file locks (fcntl), which this platform "
+            "lacks; each worker keeps its own snapshot"
+        )
+        return None
+    return SharedSnapshot(path)
+
+
+shared_snapshot: Optional[SharedSnapshot] = _create_shared_snapshot(SHARED_SNAPSHOT_PATH)
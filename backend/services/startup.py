@@ -0,0 +1,62 @@
+"""Startup-time report: module import time and lifespan startup phases."""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from services.lazy_imports import loaded_heavy_modules
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """Collects how long the API took to import and to become ready."""
+
+    def __init__(self):
+        self.import_started: Optional[float] = None
+        self.import_seconds: Optional[float] = None
+        self.phases: dict[str, float] = {}
+        self.ready_seconds: Optional[float] = None
+
+    def imports_started(self) -> None:
+        self.import_started = time.perf_counter()
+
+    def imports_finished(self) -> None:
+        if self.import_started is not None:
+            self.import_seconds = time.perf_counter() - self.import_started
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time one startup step."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def ready(self) -> None:
+        """Mark the app ready to serve and log the report."""
+        if self.import_started is not None:
+            self.ready_seconds = time.perf_counter() - self.import_started
+        phases = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        logger.info(
+            f"Startup: imports {self._ms(self.import_seconds)}, {phases or 'no phases'}, "
+            f"ready after {self._ms(self.ready_seconds)}; "
+            f"heavy modules loaded: {', '.join(loaded_heavy_modules()) or 'none'}"
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "import_seconds": self.import_seconds,
+            "phases": dict(self.phases),
+            "ready_seconds": self.ready_seconds,
+            "heavy_modules_loaded": loaded_heavy_modules(),
+        }
+
+    @staticmethod
+    def _ms(seconds: Optional[float]) -> str:
+        return f"{seconds * 1000:.0f}ms" if seconds is not None else "n/a"
+
+
+startup_report = StartupReport()
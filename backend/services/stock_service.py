@@ -1,11 +1,19 @@
-"""Stock data service using yfinance for real market data."""
+"""Stock data service backed by the market data provider (Yahoo Finance by default)."""
 
+import hashlib
+import json
 import logging
+import os
+import threading
+from datetime import datetime
 from typing import Optional
 
-import yfinance as yf
 from pydantic import BaseModel
 
+from services import tracing
+from services.market_data import get_provider
+from services.upstream_metrics import track_upstream
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +35,7 @@ class StockData(BaseModel):
     payout_ratio: Optional[float] = None
     revenue_growth: Optional[float] = None
     profit_margin: Optional[float] = None
+    previous_close: Optional[float] = None
 
 
 # Conservative stock universe - blue chip dividend payers
@@ -51,10 +60,19 @@ CONSERVATIVE_UNIVERSE = [
 
 
 def fetch_stock_data(symbol: str) -> Optional[StockData]:
-    """Fetch real-time stock data from Yahoo Finance."""
+    """Fetch real-time stock data from the market data provider (Yahoo Finance by default)."""
+    with tracing.span("fetch_stock_data", symbol=symbol) as span:
+        stock = _fetch_stock_data(symbol)
+        if span is not None:
+            span.set(found=stock is not None)
+        return stock
+
+
+def _fetch_stock_data(symbol: str) -> Optional[StockData]:
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        provider = get_provider()
+        with track_upstream(provider.name, "info"):
+            info = provider.info(symbol)
 
         if not info or "symbol" not in info:
             logger.warning(f"No data found for symbol: {symbol}")
@@ -88,6 +106,7 @@ def fetch_stock_data(symbol: str) -> Optional[StockData]:
             payout_ratio=payout_ratio,
             revenue_growth=info.get("revenueGrowth"),
             profit_margin=info.get("profitMargins"),
+            previous_close=info.get("previousClose", info.get("regularMarketPreviousClose")),
         )
     except Exception as e:
         logger.error(f"Error fetching data for {symbol}: {e}")
@@ -96,12 +115,143 @@ def fetch_stock_data(symbol: str) -> Optional[StockData]:
 
 def fetch_multiple_stocks(symbols: list[str]) -> list[StockData]:
     """Fetch data for multiple stocks."""
-    stocks = []
-    for symbol in symbols:
-        stock = fetch_stock_data(symbol)
-        if stock:
-            stocks.append(stock)
-    return stocks
+    with tracing.span("fetch_multiple_stocks", symbols=len(symbols)) as span:
+        stocks = []
+        for symbol in symbols:
+            stock = fetch_stock_data(symbol)
+            if stock:
+                stocks.append(stock)
+        if span is not None:
+            span.set(found=len(stocks))
+        return stocks
+
+
+class UniverseSnapshot(BaseModel):
+    """Point-in-time data for the whole conservative universe."""
+
+    version: str  # content hash, identical data gives an identical version
+    fetched_at: datetime
+    stocks: list[StockData]
+
+
+# How long a universe snapshot is served before it is refetched
+UNIVERSE_TTL_SECONDS = float(os.getenv("UNIVERSE_TTL_SECONDS", "900"))
+
+_snapshot: Optional[UniverseSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def _snapshot_version(stocks: list[StockData]) -> str:
+    """Hash snapshot contents into a short version string."""
+    encoded = json.dumps([s.model_dump() for s in stocks], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def set_universe_snapshot(
+    stocks: list[StockData], fetched_at: Optional[datetime] = None
+) -> UniverseSnapshot:
+    """Replace the current universe snapshot."""
+    global _snapshot
+    snapshot = UniverseSnapshot(
+        version=_snapshot_version(stocks),
+        fetched_at=fetched_at or datetime.utcnow(),
+        stocks=stocks,
+    )
+    _snapshot = snapshot
+    return snapshot
+
+
+def peek_universe_snapshot() -> Optional[UniverseSnapshot]:
+    """Get the current snapshot, if any, without refreshing it."""
+    return _snapshot
+
+
+def fresh_universe_snapshot() -> Optional[UniverseSnapshot]:
+    """Get the current snapshot if it is still fresh, never blocking on a refresh."""
+    snapshot = _snapshot
+    if snapshot is not None and _is_fresh(snapshot.fetched_at):
+        return snapshot
+    return None
+
+
+def clear_universe_snapshot() -> None:
+    """Drop the current snapshot so the next read refetches."""
+    global _snapshot
+    _snapshot = None
+
+
+def _is_fresh(fetched_at: datetime) -> bool:
+    return (datetime.utcnow() - fetched_at).total_seconds() < UNIVERSE_TTL_SECONDS
+
+
+def _adopt_shared_snapshot(view) -> UniverseSnapshot:
+    """Make a shared snapshot current, building its rows once per published version."""
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == view.version and snapshot.fetched_at == view.fetched_at:
+        return snapshot
+    return set_universe_snapshot(view.stocks(), fetched_at=view.fetched_at)
+
+
+def _get_shared_universe_snapshot(shared, force_refresh: bool) -> tuple[UniverseSnapshot, bool]:
+    """
+    Get the universe from the host-wide snapshot file, fetching it only if
+    this worker wins the refresher election. Returns (snapshot, fetched here).
+    """
+    view = shared.read()
+    if view is not None and not force_refresh and _is_fresh(view.fetched_at):
+        return _adopt_shared_snapshot(view), False
+
+    with shared.elected() as elected:
+        if elected:
+            # Another refresher may have published between our read and the election
+            latest = shared.read()
+            if latest is not None and not force_refresh and _is_fresh(latest.fetched_at):
+                return _adopt_shared_snapshot(latest), False
+            refreshed = set_universe_snapshot(fetch_multiple_stocks(CONSERVATIVE_UNIVERSE))
+            shared.write(refreshed)
+            return refreshed, True
+
+    # Another worker is refreshing: serve its last snapshot, or wait for the new one
+    if view is None or force_refresh:
+        view = shared.wait()
+    if view is None:
+        return set_universe_snapshot(fetch_multiple_stocks(CONSERVATIVE_UNIVERSE)), True
+    return _adopt_shared_snapshot(view), False
+
+
+def get_universe_snapshot(force_refresh: bool = False) -> UniverseSnapshot:
+    """
+    Get the current universe snapshot, refetching it once it is older than
+    UNIVERSE_TTL_SECONDS. Concurrent callers share a single refresh, and
+    refreshed fundamentals are written through to the cached_stocks table.
+
+    With SHARED_SNAPSHOT_PATH set, all workers on the host share one snapshot
+    file and only the worker elected as refresher fetches.
+    """
+    snapshot = _snapshot
+    if snapshot is not None and not force_refresh and _is_fresh(snapshot.fetched_at):
+        return snapshot
+
+    # Import here to avoid circular dependency
+    from services.shared_cache import shared_snapshot
+
+    with _snapshot_lock:
+        # Another thread may have refreshed while we waited
+        if _snapshot is not None and _snapshot is not snapshot and not force_refresh:
+            return _snapshot
+        if shared_snapshot is not None:
+            refreshed, fetched = _get_shared_universe_snapshot(shared_snapshot, force_refresh)
+            if not fetched:
+                return refreshed
+        else:
+            refreshed = set_universe_snapshot(fetch_multiple_stocks(CONSERVATIVE_UNIVERSE))
+
+    # Write fundamentals through so a restart can start warm
+    # Import here to avoid circular dependency
+    from services.fundamentals_store import persist_universe
+
+    persist_universe(refreshed.stocks, refreshed.fetched_at)
+    return refreshed
 
 
 class ConservativeScreener:
@@ -124,6 +274,7 @@ class ConservativeScreener:
         max_beta: Optional[float] = None,
         max_debt_to_equity: Optional[float] = None,
         sector: Optional[str] = None,
+        sectors: Optional[list[str]] = None,
     ):
         self.min_dividend_yield = min_dividend_yield
         self.max_pe_ratio = max_pe_ratio
@@ -131,12 +282,32 @@ class ConservativeScreener:
         self.max_beta = max_beta
         self.max_debt_to_equity = max_debt_to_equity
         self.sector = sector
+        self.sectors = list(sectors) if sectors else []
+        # Lower-cased once so each stock is a single set lookup
+        self._sector_keys = frozenset(
+            s.lower() for s in ([sector] if sector else []) + self.sectors
+        )
+
+    def with_criteria(self, **criteria) -> "ConservativeScreener":
+        """Return a copy with some criteria replaced (a new sector replaces all sectors)."""
+        current = {
+            "min_dividend_yield": self.min_dividend_yield,
+            "max_pe_ratio": self.max_pe_ratio,
+            "min_market_cap": self.min_market_cap,
+            "max_beta": self.max_beta,
+            "max_debt_to_equity": self.max_debt_to_equity,
+            "sector": self.sector,
+            "sectors": self.sectors,
+        }
+        if criteria.get("sector"):
+            current["sectors"] = None
+        return ConservativeScreener(**{**current, **criteria})
 
     def passes_criteria(self, stock: StockData) -> bool:
         """Check if a stock passes all screening criteria."""
-        # Sector filter
-        if self.sector:
-            if stock.sector.lower() != self.sector.lower():
+        # Sector filter (any of the selected sectors)
+        if self._sector_keys:
+            if stock.sector.lower() not in self._sector_keys:
                 return False
 
         # Dividend yield filter
@@ -175,6 +346,8 @@ class ConservativeScreener:
         filters = {}
         if self.sector:
             filters["sector"] = self.sector
+        if self.sectors:
+            filters["sectors"] = self.sectors
         if self.min_dividend_yield is not None:
             filters["min_dividend_yield"] = self.min_dividend_yield
         if self.max_pe_ratio is not None:
@@ -0,0 +1,296 @@
+"""Request-scoped tracing spans exported to a JSON-lines file or an OTLP collector."""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Span exporter: "jsonl", "otlp", or empty to disable tracing
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "").lower()
+
+# File spans are appended to by the jsonl exporter
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+
+# OTLP/HTTP (JSON encoding) traces endpoint of a collector
+OTLP_ENDPOINT = os.getenv("OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "stratos-api")
+
+# OTLP span kinds by name
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+# Spans sent per export call, and spans buffered before new ones are dropped
+EXPORT_BATCH_SIZE = 512
+EXPORT_QUEUE_SIZE = 10_000
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(
+        self, name: str, parent: Optional["Span"], attributes: dict, kind: str = "internal"
+    ):
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: list[Span], service_name: str = TRACE_SERVICE_NAME) -> dict:
+    """Encode spans as an OTLP/HTTP JSON ExportTraceServiceRequest."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": service_name}}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [
+                            {
+                                "traceId": span.trace_id,
+                                "spanId": span.span_id,
+                                "parentSpanId": span.parent_id or "",
+                                "name": span.name,
+                                "kind": SPAN_KINDS[span.kind],
+                                "startTimeUnixNano": str(span.start_ns),
+                                "endTimeUnixNano": str(span.end_ns),
+                                "attributes": [
+                                    {"key": key, "value": _otlp_value(value)}
+                                    for key, value in span.attributes.items()
+                                ],
+                                "status": (
+                                    {"code": 2, "message": span.error}
+                                    if span.error
+                                    else {"code": 1}
+                                ),
+                            }
+                            for span in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per span to a file."""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = Path(path)
+
+    def export(self, spans: list[Span]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a") as f:
+            f.writelines(json.dumps(span.as_dict(), default=str) + "\n" for span in spans)
+
+
+class OtlpExporter:
+    """
+    Posts spans to an OTLP/HTTP collector using the JSON encoding.
+
+    The payload is built by `otlp_payload` and sent with httpx, so no
+    opentelemetry package is needed.
+    """
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT, service_name: str = TRACE_SERVICE_NAME):
+        # Import here so httpx is only loaded when exporting to a collector
+        import httpx
+
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=10.0)
+
+    def export(self, spans: list[Span]) -> None:
+        response = self._client.post(self.endpoint, json=otlp_payload(spans, self.service_name))
+        response.raise_for_status()
+
+
+class Tracer:
+    """
+    Creates spans and hands finished ones to a background export thread.
+
+    The current span lives in a context variable, so it follows the request
+    into awaited coroutines, tasks and `asyncio.to_thread` calls, and into
+    executor threads that run work via `contextvars.copy_context().run`.
+    Without an exporter, `span` yields None and records nothing.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+        self._queue: queue.Queue[Optional[Span]] = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes) -> Iterator[Optional[Span]]:
+        """Time the enclosed block as a child of the current span."""
+        if self.exporter is None:
+            yield None
+            return
+        span = Span(name, _current.get(), attributes, kind)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            self._finish(span)
+
+    def record(
+        self, name: str, start_ns: int, end_ns: int, kind: str = "internal", **attributes
+    ) -> None:
+        """Record an already finished operation as a child of the current span."""
+        if self.exporter is None:
+            return
+        span = Span(name, _current.get(), attributes, kind)
+        span.start_ns = start_ns
+        self._finish(span, end_ns)
+
+    def _finish(self, span: Span, end_ns: Optional[int] = None) -> None:
+        span.end_ns = end_ns or time.time_ns()
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._export_loop, name="trace-export", daemon=True
+                    )
+                    self._thread.start()
+
+    def _export_loop(self) -> None:
+        while True:
+            span = self._queue.get()
+            if span is None:
+                return
+            batch = [span]
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    span = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    break
+                if span is None:
+                    self._export(batch)
+                    return
+                batch.append(span)
+            self._export(batch)
+
+    def _export(self, batch: list[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.error(f"Failed to export {len(batch)} spans: {e}")
+
+    def shutdown(self) -> None:
+        """Flush buffered spans and stop the export thread (restarted by the next span)."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+
+def current_span() -> Optional[Span]:
+    """The span the caller is running in, if any."""
+    return _current.get()
+
+
+def _exporter():
+    if TRACING_EXPORTER == "jsonl":
+        return JsonLinesExporter()
+    if TRACING_EXPORTER == "otlp":
+        return OtlpExporter()
+    if TRACING_EXPORTER:
+        logger.warning(f"Unknown TRACING_EXPORTER {TRACING_EXPORTER!r}, tracing disabled")
+    return None
+
+
+tracer = Tracer(_exporter())
+
+
+def span(name: str, kind: str = "internal", **attributes):
+    """Open a span in the shared tracer."""
+    return tracer.span(name, kind, **attributes)
+
+
+def record(name: str, start_ns: int, end_ns: int, kind: str = "internal", **attributes) -> None:
+    """Record a finished operation in the shared tracer."""
+    tracer.record(name, start_ns, end_ns, kind, **attributes)
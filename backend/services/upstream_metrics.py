@@ -0,0 +1,79 @@
+"""Latency and error metrics for calls to upstream providers."""
+
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+from services import metrics, profiler, tracing
+
+# Span of recent calls summarised by recent_stats (seconds)
+UPSTREAM_WINDOW_SECONDS = float(os.getenv("UPSTREAM_WINDOW_SECONDS", "300"))
+
+# Recent calls kept per provider, whatever their age
+RECENT_CALLS_KEPT = 1000
+
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+latency_histogram = metrics.histogram(
+    "upstream_request_duration_seconds",
+    "Upstream provider call latency",
+    ("provider", "operation"),
+    buckets=UPSTREAM_BUCKETS,
+)
+requests_counter = metrics.counter(
+    "upstream_requests_total",
+    "Upstream provider calls by outcome (ok or error)",
+    ("provider", "operation", "outcome"),
+)
+
+# (finished at, seconds, ok) of the latest calls per provider
+_recent: dict[str, deque] = {}
+
+
+@contextmanager
+def track_upstream(provider: str, operation: str):
+    """Time (and trace) one upstream call, counting it as an error if it raises."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with tracing.span(f"{provider}.{operation}", kind="client", provider=provider):
+            yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        latency_histogram.observe(elapsed, provider=provider, operation=operation)
+        profiler.record("upstream", f"{provider}:{operation}", elapsed)
+        calls = _recent.get(provider)
+        if calls is None:
+            calls = _recent.setdefault(provider, deque(maxlen=RECENT_CALLS_KEPT))
+        calls.append((time.monotonic(), elapsed, outcome == "ok"))
+        requests_counter.inc(provider=provider, operation=operation, outcome=outcome)
+
+
+def _percentile(sorted_values: list[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def recent_stats(provider: str, window: float = UPSTREAM_WINDOW_SECONDS) -> dict:
+    """Count, error rate and latency percentiles of a provider's calls within `window` seconds."""
+    cutoff = time.monotonic() - window
+    calls = [call for call in list(_recent.get(provider, ())) if call[0] >= cutoff]
+    latencies = sorted(seconds for _, seconds, _ in calls)
+    errors = sum(1 for _, _, ok in calls if not ok)
+    p50, p95 = _percentile(latencies, 0.5), _percentile(latencies, 0.95)
+    return {
+        "calls": len(calls),
+        "errors": errors,
+        "error_rate": errors / len(calls) if calls else 0.0,
+        "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+        "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+    }
+
+
+def clear_recent() -> None:
+    """Forget recent calls (used by tests)."""
+    _recent.clear()
@@ -5,13 +5,17 @@ import pytest
 from fastapi.testclient import TestClient
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 # Set test database before importing app
 os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+# Tests seed the universe themselves rather than fetching it at startup
+os.environ["WARM_UNIVERSE_ON_STARTUP"] = "false"
 
 from api.main import app
-from models.database import Base, get_db
+from models.database import Base, get_async_db, get_db
 
 
 # Create test engine
@@ -20,6 +24,12 @@ test_engine = create_engine(
 )
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
+# Async engine on the same file; no pooling, since each test client runs its own event loop
+test_async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestAsyncSessionLocal = async_sessionmaker(
+    test_async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 def override_get_db():
     """Override database dependency for testing."""
@@ -30,6 +40,12 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    """Override async database dependency for testing."""
+    async with TestAsyncSessionLocal() as db:
+        yield db
+
+
 @pytest.fixture(scope="function")
 def client():
     """Synchronous test client with fresh database for each test."""
@@ -38,6 +54,7 @@ def client():
 
     # Override database dependency
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
 
     with TestClient(app) as test_client:
         yield test_client
@@ -52,6 +69,7 @@ async def async_client():
     """Async test client for async endpoint tests."""
     Base.metadata.create_all(bind=test_engine)
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
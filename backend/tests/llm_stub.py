@@ -0,0 +1,163 @@
+"""Local, replayable stub of the OpenAI chat completions API for tests and benchmarks."""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_RESULT = {
+    "recommendation": "buy",
+    "confidence": 0.8,
+    "summary": "Stub analysis.",
+    "pros": ["Stub pro"],
+    "cons": ["Stub con"],
+    "target_price": None,
+    "risk_level": "low",
+}
+
+# Characters per streamed chunk, roughly one token
+STREAM_CHUNK_CHARS = 4
+
+
+class StubLLMServer:
+    """
+    Minimal OpenAI-compatible server running in a background thread.
+
+    Replays a fixed completion per stock symbol (found in the prompt), or the
+    default result, after an optional delay. Streaming requests are answered
+    with SSE chunks spaced `token_delay` apart. Request counts and peak
+    concurrency are recorded.
+    """
+
+    def __init__(
+        self,
+        result: dict = DEFAULT_RESULT,
+        delay: float = 0.0,
+        token_delay: float = 0.0,
+        responses: Optional[dict[str, dict]] = None,
+    ):
+        self.result = result
+        self.delay = delay
+        self.token_delay = token_delay
+        self.responses = responses or {}
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @classmethod
+    def from_recording(cls, path: str, **kwargs) -> "StubLLMServer":
+        """Create a stub replaying recorded results from a JSON file of {symbol: result}."""
+        responses = json.loads(Path(path).read_text())
+        return cls(responses=responses, **kwargs)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def content_for(self, prompt: str) -> str:
+        """Return the completion content replayed for a prompt."""
+        symbols = re.findall(r"^Stock: (\S+) -", prompt, flags=re.MULTILINE)
+        if len(symbols) > 1:
+            analyses = [{"symbol": s, **self.responses.get(s, self.result)} for s in symbols]
+            return json.dumps({"analyses": analyses})
+        symbol = symbols[0] if symbols else None
+        return json.dumps(self.responses.get(symbol, self.result))
+
+    def completion_body(self, content: str) -> dict:
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4o-mini",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 200, "completion_tokens": 120, "total_tokens": 320},
+        }
+
+    def stream_chunks(self, content: str):
+        """Yield chat.completion.chunk payloads for streamed content."""
+        base = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": "gpt-4o-mini",
+        }
+        for i in range(0, len(content), STREAM_CHUNK_CHARS):
+            delta = {"content": content[i : i + STREAM_CHUNK_CHARS]}
+            if i == 0:
+                delta["role"] = "assistant"
+            yield {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        yield {
+            **base,
+            "choices": [],
+            "usage": {"prompt_tokens": 200, "completion_tokens": 120, "total_tokens": 320},
+        }
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    content = stub.content_for(request["messages"][-1]["content"])
+                    if request.get("stream"):
+                        self._send_stream(content)
+                    else:
+                        self._send_json(stub.completion_body(content))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def _send_json(self, payload: dict):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, content: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for chunk in stub.stream_chunks(content):
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(stub.token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def __enter__(self) -> "StubLLMServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
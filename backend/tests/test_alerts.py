@@ -0,0 +1,189 @@
+"""Tests for price alert endpoints and batch evaluation."""
+
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+
+from models.database import add_missing_columns
+from services.alert_service import evaluate_percent_change_alerts, percent_change_triggers
+from services.price_history import PriceHistoryStore, price_history
+from services.quote_service import quote_cache
+from services.stock_service import StockData
+
+
+def make_stock(symbol: str, price: float) -> StockData:
+    """Build minimal stock data with a given price."""
+    return StockData(symbol=symbol, name=symbol, sector="Healthcare", price=price)
+
+
+@pytest.fixture(autouse=True)
+def clear_price_history():
+    """Start each test with an empty price history."""
+    price_history.clear()
+    yield
+    price_history.clear()
+
+
+@pytest.fixture
+def mock_price():
+    """Mock the upstream fetch behind the quote cache used by the alert routes."""
+    quote_cache.clear()
+    with patch("services.quote_service.fetch_stock_data") as mock:
+        yield mock
+    quote_cache.clear()
+
+
+def test_create_percent_change_alert_captures_reference(client, mock_price):
+    """Test since-creation alerts store the price at creation."""
+    mock_price.return_value = make_stock("JNJ", 150.0)
+    response = client.post(
+        "/api/v1/alerts/",
+        json={"symbol": "jnj", "alert_type": "percent_change", "target_value": -5.0},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["reference_price"] == 150.0
+    assert data["window_days"] is None
+
+
+def test_window_days_rejected_for_price_alerts(client):
+    """Test window_days is only accepted for percent_change alerts."""
+    response = client.post(
+        "/api/v1/alerts/",
+        json={"symbol": "JNJ", "alert_type": "price_above", "target_value": 200, "window_days": 5},
+    )
+    assert response.status_code == 400
+
+
+def test_zero_percent_target_rejected(client, mock_price):
+    """Test a percent_change alert needs a non-zero target to mean anything."""
+    response = client.post(
+        "/api/v1/alerts/",
+        json={"symbol": "JNJ", "alert_type": "percent_change", "target_value": 0},
+    )
+    assert response.status_code == 400
+    mock_price.assert_not_called()
+
+
+def test_check_since_creation_alert_triggers(client, mock_price):
+    """Test a since-creation alert triggers once the drop reaches the target."""
+    mock_price.return_value = make_stock("JNJ", 100.0)
+    client.post(
+        "/api/v1/alerts/",
+        json={"symbol": "JNJ", "alert_type": "percent_change", "target_value": -5.0},
+    )
+
+    quote_cache.clear()
+    mock_price.return_value = make_stock("JNJ", 94.0)
+    response = client.get("/api/v1/alerts/check/all")
+    assert response.status_code == 200
+    result = response.json()[0]
+    assert result["should_trigger"] is True
+    assert result["percent_change"] == pytest.approx(-6.0)
+    assert result["alert"]["is_triggered"] is True
+
+
+def test_check_percent_change_alert_without_current_price(client, mock_price):
+    """Test a failed price fetch is reported as such, not as a missing reference."""
+    mock_price.return_value = make_stock("JNJ", 100.0)
+    client.post(
+        "/api/v1/alerts/",
+        json={"symbol": "JNJ", "alert_type": "percent_change", "target_value": -5.0},
+    )
+
+    quote_cache.clear()
+    mock_price.return_value = None
+    result = client.get("/api/v1/alerts/check/all").json()[0]
+    assert result["should_trigger"] is False
+    assert result["message"] == "Could not fetch price for JNJ"
+
+
+def test_add_missing_columns_upgrades_old_alerts_table(tmp_path):
+    """Test databases created before percent_change alerts gain their columns."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE alerts (id INTEGER PRIMARY KEY, symbol VARCHAR)"))
+
+    added = add_missing_columns(engine)
+
+    assert {"alerts.window_days", "alerts.reference_price"} <= set(added)
+    engine.dispose()
+
+
+def test_check_windowed_alert_uses_local_history(client, mock_price):
+    """Test windowed alerts read their reference from the local history."""
+    today = datetime.utcnow().date()
+    dates = [today - timedelta(days=d) for d in range(10, 0, -1)]
+    price_history.set_history("KO", dates, [50.0] * 5 + [60.0] * 5)
+
+    client.post(
+        "/api/v1/alerts/",
+        json={"symbol": "KO", "alert_type": "percent_change", "target_value": 10.0, "window_days": 7},
+    )
+    mock_price.return_value = make_stock("KO", 56.0)
+
+    with patch("services.price_history._download_history") as download:
+        response = client.get("/api/v1/alerts/check/all")
+        download.assert_not_called()
+
+    result = response.json()[0]
+    assert result["reference_price"] == 50.0
+    assert result["percent_change"] == pytest.approx(12.0)
+    assert result["should_trigger"] is True
+
+
+def test_reference_price_falls_back_to_previous_session():
+    """Test reference lookups roll back over weekends and holidays."""
+    store = PriceHistoryStore()
+    store.set_history("PG", [date(2026, 1, 2), date(2026, 1, 5)], [150.0, 155.0])
+    # Sunday -> previous Friday's close
+    assert store.reference_price("PG", 1, today=date(2026, 1, 5)) == 150.0
+    assert store.reference_price("PG", 30, today=date(2026, 1, 5)) is None
+
+
+def test_percent_change_triggers_direction():
+    """Test positive targets trigger on rises and negative targets on falls."""
+    current = np.array([110.0, 90.0, 104.0, np.nan])
+    reference = np.array([100.0, 100.0, 100.0, 100.0])
+    target = np.array([10.0, -10.0, 5.0, 1.0])
+    change, triggered = percent_change_triggers(current, reference, target)
+    assert change[:3] == pytest.approx([10.0, -10.0, 4.0])
+    assert triggered.tolist() == [True, True, False, False]
+
+    # A zero target (only possible on rows created before it was rejected) never fires
+    _, triggered = percent_change_triggers(np.array([100.0]), np.array([100.0]), np.array([0.0]))
+    assert triggered.tolist() == [False]
+
+
+def test_batch_evaluation_of_10k_alerts_is_fast():
+    """Test 10k percent_change alerts evaluate in a single sub-second pass."""
+    store = PriceHistoryStore()
+    today = datetime.utcnow().date()
+    dates = [today - timedelta(days=d) for d in range(30, 0, -1)]
+    symbols = [f"S{i}" for i in range(500)]
+    for symbol in symbols:
+        store.set_history(symbol, dates, np.linspace(90.0, 110.0, len(dates)))
+
+    alerts = [
+        SimpleNamespace(
+            symbol=symbols[i % len(symbols)],
+            window_days=(None, 1, 5, 20)[i % 4],
+            reference_price=100.0,
+            target_value=5.0 if i % 2 else -5.0,
+        )
+        for i in range(10_000)
+    ]
+    prices = {symbol: 104.0 for symbol in symbols}
+
+    start = time.perf_counter()
+    current, _, _, triggered = evaluate_percent_change_alerts(alerts, prices, history=store)
+    elapsed = time.perf_counter() - start
+
+    assert len(current) == 10_000
+    assert triggered.any()
+    assert elapsed < 1.0
@@ -0,0 +1,440 @@
+"""Tests for AI analysis and the LLM analysis cache."""
+
+import asyncio
+import json
+import re
+import time
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from models.preferences import CachedAnalysis
+from services import ai_service, llm_telemetry
+from services.ai_service import StockRecommendation
+from services.analysis_cache import AnalysisCache, metrics_fingerprint
+from services.metrics import Histogram
+from services.stock_service import StockData
+from tests.conftest import TestSessionLocal
+from tests.llm_stub import StubLLMServer
+
+JNJ = StockData(
+    symbol="JNJ",
+    name="Johnson & Johnson",
+    sector="Healthcare",
+    price=155.50,
+    dividend_yield=3.0,
+    pe_ratio=15.2,
+    market_cap=375.0,
+    beta=0.55,
+)
+
+LLM_RESULT = {
+    "recommendation": "buy",
+    "confidence": 0.8,
+    "summary": "Solid dividend payer.",
+    "pros": ["Dividend"],
+    "cons": ["Litigation"],
+    "target_price": None,
+    "risk_level": "low",
+}
+
+
+def make_completion(content: dict) -> MagicMock:
+    """Build a fake chat completion response."""
+    response = MagicMock()
+    response.choices[0].message.content = json.dumps(content)
+    response.usage.prompt_tokens = 200
+    response.usage.completion_tokens = 120
+    return response
+
+
+@pytest.fixture
+def openai_client(client):
+    """Mock OpenAI client and a cache bound to the test database."""
+    fake = MagicMock()
+    fake.chat.completions.create = AsyncMock(return_value=make_completion(LLM_RESULT))
+    cache = AnalysisCache(session_factory=TestSessionLocal, ttl=timedelta(hours=1), max_entries=2)
+    with patch.object(ai_service, "get_openai_client", return_value=fake), patch.object(
+        ai_service, "analysis_cache", cache
+    ):
+        yield fake, cache
+
+
+def test_fingerprint_ignores_small_price_ticks():
+    """Test tiny price moves share a fingerprint but material ones do not."""
+    tick = JNJ.model_copy(update={"price": 155.52})
+    move = JNJ.model_copy(update={"price": 162.0})
+    assert metrics_fingerprint(tick) == metrics_fingerprint(JNJ)
+    assert metrics_fingerprint(move) != metrics_fingerprint(JNJ)
+
+
+def test_prompt_handles_missing_metrics():
+    """Test the prompt renders N/A for missing metrics."""
+    stock = StockData(symbol="X", name="X", sector="Energy", price=10.0)
+    prompt = ai_service.build_stock_prompt(stock)
+    assert "Dividend Yield: N/A" in prompt
+    assert " if " not in prompt
+
+
+async def test_repeat_analysis_is_served_from_cache(openai_client):
+    """Test a second analysis of unchanged metrics skips the LLM call."""
+    fake, cache = openai_client
+    first = await ai_service.analyze_stock(JNJ)
+    second = await ai_service.analyze_stock(JNJ)
+
+    assert first == second
+    assert fake.chat.completions.create.call_count == 1
+    stats = cache.stats()
+    assert stats["hits"] >= 1
+    assert stats["saved_prompt_tokens"] >= 200
+
+
+async def test_cache_evicts_least_recently_used(openai_client):
+    """Test the cache stays within its size bound."""
+    fake, cache = openai_client
+    for symbol in ("JNJ", "PG", "KO"):
+        await ai_service.analyze_stock(JNJ.model_copy(update={"symbol": symbol}))
+    assert cache.stats()["entries"] == 2
+
+
+def test_cache_hits_write_access_time_at_most_once_per_interval(client):
+    """Test repeated hits are served without a write until the touch interval passes."""
+    cache = AnalysisCache(session_factory=TestSessionLocal, touch_interval=timedelta(hours=1))
+    cache.put(JNJ, "v", LLM_RESULT)
+    key = cache.cache_key(JNJ, "v")
+
+    def stored() -> CachedAnalysis:
+        with TestSessionLocal() as db:
+            return db.query(CachedAnalysis).filter(CachedAnalysis.cache_key == key).one()
+
+    created = stored().last_accessed_at
+    assert cache.get(JNJ, "v") == LLM_RESULT
+    assert cache.get(JNJ, "v") == LLM_RESULT
+    assert (stored().last_accessed_at, stored().hits) == (created, 0)
+
+    cache.touch_interval = timedelta(0)
+    cache.get(JNJ, "v")
+    assert stored().last_accessed_at > created
+    assert stored().hits == 3
+
+
+async def test_prompt_version_change_misses_cache(openai_client):
+    """Test changing the prompt version invalidates cached analyses."""
+    fake, _ = openai_client
+    await ai_service.analyze_stock(JNJ)
+    with patch.object(ai_service, "PROMPT_VERSION", "test-next"):
+        await ai_service.analyze_stock(JNJ)
+    assert fake.chat.completions.create.call_count == 2
+
+
+def test_cache_stats_endpoint(client):
+    """Test the cache stats endpoint exposes hit rate and token savings."""
+    response = client.get("/api/v1/analysis/cache/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert "hit_rate" in data
+    assert "saved_completion_tokens" in data
+
+
+async def test_llm_call_records_tokens_and_cost(openai_client):
+    """Test a successful call records its outcome, tokens and estimated cost."""
+    labels = {"model": ai_service.OPENAI_MODEL, "operation": "analysis", "outcome": "success"}
+    calls = llm_telemetry.requests_counter.get(**labels)
+    cost = llm_telemetry.cost_counter.get(model=ai_service.OPENAI_MODEL)
+    llm_analyses = llm_telemetry.analyses_counter.get(source="llm")
+
+    await ai_service.analyze_stock(JNJ)
+
+    assert llm_telemetry.requests_counter.get(**labels) == calls + 1
+    assert llm_telemetry.analyses_counter.get(source="llm") == llm_analyses + 1
+    assert llm_telemetry.cost_counter.get(model=ai_service.OPENAI_MODEL) == pytest.approx(
+        cost + llm_telemetry.estimate_cost(ai_service.OPENAI_MODEL, 200, 120)
+    )
+
+
+async def test_invalid_llm_output_records_fallback(openai_client):
+    """Test unparseable output is counted as a fallback with its reason."""
+    fake, _ = openai_client
+    response = make_completion({})
+    response.choices[0].message.content = "not json"
+    fake.chat.completions.create.return_value = response
+    fallbacks = llm_telemetry.fallbacks_counter.get(reason="invalid_json")
+
+    result = await ai_service.analyze_stock(JNJ)
+
+    assert result == ai_service._rule_based_recommendation(JNJ)
+    assert llm_telemetry.fallbacks_counter.get(reason="invalid_json") == fallbacks + 1
+
+
+def test_histogram_quantiles():
+    """Test histogram quantiles interpolate within buckets."""
+    histogram = Histogram("test_latency", "Test latency", ("route",), buckets=(0.1, 0.2, 0.4))
+    for value in (0.05, 0.15, 0.15, 0.3):
+        histogram.observe(value, route="a")
+    histogram.observe(5.0, route="b")
+
+    assert histogram.count(route="a") == 4
+    assert histogram.quantile(0.5, route="a") == pytest.approx(0.15)
+    assert histogram.quantile(0.99) == 0.4
+    assert Histogram("empty", "Empty").quantile(0.5) is None
+
+
+def test_llm_stats_endpoint(client, monkeypatch):
+    """Test the LLM stats endpoint reports the fallback rate."""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with patch("api.routes.analysis.fetch_stock_data", return_value=JNJ):
+        client.get("/api/v1/analysis/stock/JNJ")
+    response = client.get("/api/v1/analysis/llm/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["fallbacks_by_reason"]["no_api_key"] >= 1
+    assert 0 < data["fallback_rate"] <= 1
+
+
+@pytest.fixture
+async def stub_llm(client, monkeypatch):
+    """Point the shared OpenAI client at a local stub server."""
+    cache = AnalysisCache(session_factory=TestSessionLocal)
+    monkeypatch.setattr(ai_service, "analysis_cache", cache)
+    with StubLLMServer() as server:
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        await ai_service.close_openai_client()
+        yield server
+        await ai_service.close_openai_client()
+
+
+async def test_analysis_against_stub_server(stub_llm):
+    """Test analyses round-trip through the pooled async client."""
+    result = await ai_service.analyze_stock(JNJ)
+    assert result.summary == "Stub analysis."
+    assert stub_llm.requests == 1
+
+
+async def test_client_is_reused_across_calls(stub_llm):
+    """Test one long-lived client serves every analysis."""
+    first = ai_service.get_openai_client()
+    await ai_service.analyze_stock(JNJ)
+    assert ai_service.get_openai_client() is first
+
+
+def test_each_event_loop_gets_and_closes_its_own_client(monkeypatch):
+    """Test a client is never replaced (and leaked) when another loop asks for one."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+    async def use_client():
+        client = ai_service.get_openai_client()
+        assert ai_service.get_openai_client() is client
+        await ai_service.close_openai_client()
+        return client
+
+    first, second = asyncio.run(use_client()), asyncio.run(use_client())
+    assert first is not second
+    assert first.is_closed() and second.is_closed()
+
+
+async def test_concurrency_is_capped(stub_llm, monkeypatch):
+    """Test no more than the configured number of requests are in flight."""
+    monkeypatch.setattr(ai_service, "OPENAI_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(ai_service, "_semaphore", None)
+    stub_llm.delay = 0.05
+    stocks = [JNJ.model_copy(update={"symbol": f"S{i}"}) for i in range(6)]
+
+    await asyncio.gather(*(ai_service.analyze_stock(s) for s in stocks))
+
+    assert stub_llm.requests == 6
+    assert stub_llm.max_in_flight <= 2
+
+
+async def test_deadline_falls_back_to_rules(stub_llm, monkeypatch):
+    """Test a slow completion returns the rule-based analysis within the deadline."""
+    monkeypatch.setattr(ai_service, "OPENAI_TIMEOUT_SECONDS", 0.2)
+    stub_llm.delay = 1.0
+
+    start = time.perf_counter()
+    result = await ai_service.analyze_stock(JNJ)
+    elapsed = time.perf_counter() - start
+
+    assert result == ai_service._rule_based_recommendation(JNJ)
+    assert elapsed < 0.9
+
+
+def fake_fetch(symbol: str):
+    """Return JNJ-like data for any symbol except MISSING."""
+    if symbol == "MISSING":
+        return None
+    return JNJ.model_copy(update={"symbol": symbol})
+
+
+def packed_completion(**kwargs) -> MagicMock:
+    """Answer a (possibly packed) prompt with one analysis per stock in it."""
+    prompt = kwargs["messages"][-1]["content"]
+    symbols = re.findall(r"^Stock: (\S+) -", prompt, flags=re.MULTILINE)
+    if len(symbols) == 1:
+        return make_completion(LLM_RESULT)
+    return make_completion({"analyses": [{"symbol": s, **LLM_RESULT} for s in symbols]})
+
+
+def read_ndjson(response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_batch_streams_rule_based_results(client, monkeypatch):
+    """Test batch analysis streams one NDJSON line per symbol without an API key."""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with patch("api.routes.analysis.fetch_stock_data", side_effect=fake_fetch):
+        response = client.post(
+            "/api/v1/analysis/batch", json={"symbols": ["jnj", "PG", "MISSING", "JNJ"]}
+        )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    items = {item["symbol"]: item for item in read_ndjson(response)}
+    assert set(items) == {"JNJ", "PG", "MISSING"}
+    assert "error" in items["MISSING"]
+    assert items["PG"]["analysis"] == ai_service._rule_based_recommendation(
+        fake_fetch("PG")
+    ).model_dump()
+
+
+def read_sse(response) -> list[tuple[str, dict]]:
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_stream_sends_status_before_fetching(client, monkeypatch):
+    """Test the SSE stream starts before the stock is fetched and reports unknown symbols."""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with patch("api.routes.analysis.fetch_stock_data", side_effect=fake_fetch):
+        events = read_sse(client.get("/api/v1/analysis/stock/pg/stream"))
+        missing = read_sse(client.get("/api/v1/analysis/stock/MISSING/stream"))
+
+    assert [event for event, _ in events] == ["status", "result"]
+    assert events[0][1] == {"symbol": "PG", "stage": "fetching"}
+    assert events[1][1]["symbol"] == "PG"
+    assert [event for event, _ in missing] == ["status", "error"]
+    assert missing[1][1]["status"] == 404
+
+
+def test_batch_packs_stocks_into_prompts(client, openai_client):
+    """Test pack_size groups uncached stocks into shared prompts."""
+    fake, _ = openai_client
+    fake.chat.completions.create.side_effect = packed_completion
+    symbols = ["A", "B", "C", "D", "E"]
+    with patch("api.routes.analysis.fetch_stock_data", side_effect=fake_fetch):
+        response = client.post(
+            "/api/v1/analysis/batch", json={"symbols": symbols, "pack_size": 2}
+        )
+    items = read_ndjson(response)
+    assert sorted(item["symbol"] for item in items) == symbols
+    assert all(item["analysis"]["summary"] == LLM_RESULT["summary"] for item in items)
+    assert fake.chat.completions.create.call_count == 3
+
+
+async def test_batch_reuses_cached_analyses(openai_client):
+    """Test cached analyses are streamed without new LLM calls."""
+    fake, _ = openai_client
+    fake.chat.completions.create.side_effect = packed_completion
+    await ai_service.analyze_stock(fake_fetch("JNJ"))
+
+    items = [
+        item
+        async for item in ai_service.stream_batch_analysis(["JNJ", "PG"], fake_fetch)
+    ]
+    assert {item["symbol"] for item in items} == {"JNJ", "PG"}
+    assert fake.chat.completions.create.call_count == 2
+
+
+def test_batch_rejects_too_many_symbols(client):
+    """Test the batch endpoint enforces its symbol limit."""
+    symbols = [f"S{i}" for i in range(501)]
+    response = client.post("/api/v1/analysis/batch", json={"symbols": symbols})
+    assert response.status_code == 400
+
+
+async def collect_stream(stock: StockData) -> list[tuple[str, dict, float]]:
+    """Collect (event, data, elapsed) tuples from a streamed analysis."""
+    start = time.perf_counter()
+    return [
+        (event, data, time.perf_counter() - start)
+        async for event, data in ai_service.stream_stock_analysis(stock)
+    ]
+
+
+async def test_stream_emits_tokens_then_result(stub_llm):
+    """Test streamed analysis yields tokens early and ends with a validated result."""
+    stub_llm.token_delay = 0.02
+    events = await collect_stream(JNJ)
+
+    tokens = [e for e in events if e[0] == "token"]
+    assert len(tokens) > 10
+    assert tokens[0][2] < 0.3
+    assert events[-1][0] == "result"
+    assert events[-1][2] > tokens[0][2] + 0.1
+    assert StockRecommendation(**events[-1][1]).summary == "Stub analysis."
+    assert json.loads("".join(t[1]["text"] for t in tokens))["summary"] == "Stub analysis."
+
+
+async def test_stream_replays_recorded_responses(stub_llm):
+    """Test the stub replays a per-symbol recorded result."""
+    stub_llm.responses = {"JNJ": {**LLM_RESULT, "summary": "Recorded JNJ."}}
+    events = await collect_stream(JNJ)
+    assert events[-1][1]["summary"] == "Recorded JNJ."
+
+
+async def test_stream_invalid_output_falls_back(stub_llm, monkeypatch):
+    """Test unparseable streamed output ends with the rule-based result."""
+    monkeypatch.setattr(stub_llm, "content_for", lambda prompt: "not json")
+    events = await collect_stream(JNJ)
+    assert events[-1] == ("result", ai_service._rule_based_recommendation(JNJ).model_dump(), events[-1][2])
+
+
+async def test_stream_uses_cache(stub_llm):
+    """Test a cached analysis is returned as a single result event."""
+    await ai_service.analyze_stock(JNJ)
+    events = await collect_stream(JNJ)
+    assert [e[0] for e in events] == ["result"]
+    assert stub_llm.requests == 1
+
+
+async def test_stream_waits_for_a_slot_within_the_deadline(stub_llm, monkeypatch):
+    """Test a stream queued behind saturated LLM calls falls back at the deadline."""
+    monkeypatch.setattr(ai_service, "OPENAI_TIMEOUT_SECONDS", 0.2)
+    monkeypatch.setattr(ai_service, "_semaphore", asyncio.Semaphore(0))
+    monkeypatch.setattr(ai_service, "_semaphore_loop", asyncio.get_running_loop())
+
+    events = await collect_stream(JNJ)
+
+    assert [e[0] for e in events] == ["result"]
+    assert events[-1][1] == ai_service._rule_based_recommendation(JNJ).model_dump()
+    assert events[-1][2] < 0.9
+    assert stub_llm.requests == 0
+
+
+async def test_slow_stream_consumer_does_not_hold_a_slot(stub_llm, monkeypatch):
+    """Test other LLM calls proceed while a stream's consumer is paused."""
+    monkeypatch.setattr(ai_service, "OPENAI_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(ai_service, "_semaphore", None)
+    stream = ai_service.stream_stock_analysis(JNJ)
+    assert (await anext(stream))[0] == "token"
+
+    result = await asyncio.wait_for(ai_service.analyze_stock(JNJ.model_copy(update={"symbol": "PG"})), 2.0)
+    assert result.summary == "Stub analysis."
+
+    events = [event async for event, _ in stream]
+    assert events[-1] == "result"
+
+
+def test_stream_endpoint_sse_format(client, monkeypatch):
+    """Test the SSE endpoint frames events for EventSource clients."""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with patch("api.routes.analysis.fetch_stock_data", return_value=JNJ):
+        response = client.get("/api/v1/analysis/stock/JNJ/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("event: status\ndata: ")
+    assert "\n\nevent: result\ndata: " in response.text
+    assert response.text.endswith("\n\n")
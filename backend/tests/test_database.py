@@ -0,0 +1,52 @@
+"""Tests for database engine profiles."""
+
+import pytest
+from sqlalchemy import text
+
+from models.database import create_async_db_engine, create_db_engine, engine_options
+
+
+def pragma(engine, name: str):
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_tuned_sqlite_profile_applies_pragmas(tmp_path):
+    """Test the tuned profile enables WAL and relaxed syncing on connect."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}", profile="tuned")
+    assert pragma(engine, "journal_mode") == "wal"
+    assert pragma(engine, "synchronous") == 1  # NORMAL
+    assert pragma(engine, "mmap_size") > 0
+    assert pragma(engine, "busy_timeout") > 0
+    engine.dispose()
+
+
+def test_baseline_sqlite_profile_uses_defaults(tmp_path):
+    """Test the baseline profile leaves SQLite defaults untouched."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'baseline.db'}", profile="baseline")
+    assert pragma(engine, "journal_mode") == "delete"
+    assert pragma(engine, "synchronous") == 2  # FULL
+    engine.dispose()
+
+
+async def test_tuned_profile_applies_to_async_engine(tmp_path):
+    """Test pragmas are also applied to aiosqlite connections."""
+    engine = create_async_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}", "tuned")
+    async with engine.connect() as conn:
+        assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+    await engine.dispose()
+
+
+def test_postgres_profile_options():
+    """Test the tuned Postgres profile sizes the pool and sets statement timeouts."""
+    sync = engine_options("postgresql://user@db/stratos", "tuned")
+    assert sync["pool_pre_ping"] is True
+    assert sync["pool_size"] > 0
+    assert "statement_timeout" in sync["connect_args"]["options"]
+
+    async_options = engine_options("postgresql+asyncpg://user@db/stratos", "tuned")
+    assert "statement_timeout" in async_options["connect_args"]["server_settings"]
+
+    assert engine_options("postgresql://user@db/stratos", "baseline") == {}
+    with pytest.raises(ValueError):
+        engine_options("postgresql://user@db/stratos", "fast")
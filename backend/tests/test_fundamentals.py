@@ -0,0 +1,103 @@
+"""Tests for write-through persistence of stock fundamentals."""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from models.database import add_missing_columns
+from models.preferences import CachedStock
+from services import fundamentals_store as store_module
+from services.fundamentals_store import (
+    UPSERT_INSERTS,
+    FundamentalsStore,
+    hydrate_universe_snapshot,
+    upsert_statement,
+)
+from services.stock_service import clear_universe_snapshot, get_universe_snapshot
+from tests.conftest import TestSessionLocal
+from tests.test_stocks import MOCK_STOCKS
+
+
+@pytest.fixture
+def store(client, monkeypatch):
+    """Fundamentals store bound to the test database."""
+    store = FundamentalsStore(session_factory=TestSessionLocal)
+    monkeypatch.setattr(store_module, "fundamentals_store", store)
+    clear_universe_snapshot()
+    yield store
+    clear_universe_snapshot()
+
+
+def test_upsert_inserts_then_updates(store):
+    """Test a second upsert of the same symbol updates the row in place."""
+    jnj = MOCK_STOCKS[0].model_copy(update={"forward_pe": 14.1, "profit_margin": 0.2})
+    assert store.upsert([jnj, *MOCK_STOCKS[1:]]) == 3
+    store.upsert([jnj.model_copy(update={"price": 160.0, "payout_ratio": 45.0})])
+
+    db = TestSessionLocal()
+    try:
+        rows = db.query(CachedStock).filter(CachedStock.symbol == "JNJ").all()
+        assert len(rows) == 1
+        assert rows[0].price == 160.0
+        assert rows[0].payout_ratio == 45.0
+        assert rows[0].forward_pe == 14.1
+        assert db.query(CachedStock).count() == 3
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("dialect", sorted(UPSERT_INSERTS))
+def test_upsert_compiles_to_on_conflict(dialect):
+    """Test both SQLite and Postgres get a native ON CONFLICT upsert."""
+    from sqlalchemy.dialects import postgresql, sqlite
+
+    dialects = {"sqlite": sqlite.dialect(), "postgresql": postgresql.dialect()}
+    sql = str(upsert_statement(dialect).compile(dialect=dialects[dialect]))
+    assert "ON CONFLICT (symbol) DO UPDATE" in sql
+    assert "forward_pe = excluded.forward_pe" in sql
+
+
+def test_load_round_trips_stock_data(store):
+    """Test loaded stocks equal the stored ones, with the oldest update time."""
+    old = datetime.utcnow() - timedelta(hours=1)
+    store.upsert(MOCK_STOCKS[:1], fetched_at=old)
+    store.upsert(MOCK_STOCKS[1:])
+
+    stocks, oldest = store.load()
+    assert sorted(stocks, key=lambda s: s.symbol) == sorted(MOCK_STOCKS, key=lambda s: s.symbol)
+    assert oldest == old
+    assert [s.symbol for s in store.load(["KO"])[0]] == ["KO"]
+
+
+def test_hydrate_sets_universe_snapshot(store):
+    """Test startup hydration serves the stored universe without fetching."""
+    store.upsert(MOCK_STOCKS)
+    assert hydrate_universe_snapshot() == 3
+
+    with patch("services.stock_service.fetch_multiple_stocks") as fetch:
+        snapshot = get_universe_snapshot()
+    fetch.assert_not_called()
+    assert {s.symbol for s in snapshot.stocks} == {"JNJ", "MSFT", "KO"}
+
+
+def test_refresh_writes_through(store):
+    """Test a universe refresh persists the fetched fundamentals."""
+    with patch("services.stock_service.fetch_multiple_stocks", return_value=MOCK_STOCKS):
+        get_universe_snapshot(force_refresh=True)
+    assert len(store.load()[0]) == 3
+
+
+def test_add_missing_columns_upgrades_old_tables(tmp_path):
+    """Test columns added to a model are added to an existing table."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE cached_stocks (id INTEGER PRIMARY KEY, symbol VARCHAR)"))
+
+    added = add_missing_columns(engine)
+
+    columns = {c["name"] for c in inspect(engine).get_columns("cached_stocks")}
+    assert "cached_stocks.forward_pe" in added
+    assert {"forward_pe", "payout_ratio", "profit_margin", "last_updated"} <= columns
+    engine.dispose()
@@ -1,5 +1,28 @@
 """Tests for health check endpoint."""
 
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.loop_monitor import (
+    BlockingCallDetector,
+    LoopLagMonitor,
+    blocked_counter,
+    lag_histogram,
+)
+from services import readiness
+from services.metrics import MetricsRegistry
+from services.stock_service import (
+    CONSERVATIVE_UNIVERSE,
+    StockData,
+    clear_universe_snapshot,
+    peek_universe_snapshot,
+    set_universe_snapshot,
+)
+from services.upstream_metrics import clear_recent, track_upstream
+
 
 def test_health_check(client):
     """Test that health check returns OK status."""
@@ -17,3 +40,158 @@ def test_root_redirects_to_docs(client):
     data = response.json()
     assert "name" in data
     assert "Stratos" in data["name"]
+
+
+@pytest.fixture
+def cold_instance():
+    """No universe snapshot and no recent upstream calls."""
+    clear_universe_snapshot()
+    clear_recent()
+    yield
+    clear_universe_snapshot()
+    clear_recent()
+
+
+def warm_universe():
+    set_universe_snapshot(
+        [StockData(symbol=s, name=s, sector="Utilities", price=50.0) for s in CONSERVATIVE_UNIVERSE]
+    )
+
+
+def test_readiness_waits_for_warm_universe(client, cold_instance):
+    """Test the instance reports not ready until the universe snapshot is filled."""
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    checks = response.json()["checks"]
+    assert checks["universe"]["ok"] is False
+    assert checks["universe"]["age_seconds"] is None
+    assert checks["database"]["ok"] is True
+
+    warm_universe()
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["ready"] is True
+    assert data["checks"]["universe"]["fill_ratio"] == 1.0
+    assert data["checks"]["database"]["round_trip_ms"] >= 0
+
+
+def test_readiness_fails_on_provider_errors(client, cold_instance):
+    """Test a mostly failing market data provider takes the instance out of rotation."""
+    warm_universe()
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            with track_upstream("yfinance", "info"):
+                raise ConnectionError("Yahoo down")
+
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    provider = response.json()["checks"]["provider"]
+    assert provider["calls"] == 5
+    assert provider["error_rate"] == 1.0
+
+
+async def test_universe_warmup_retries_until_ready(cold_instance, monkeypatch):
+    """Test a failed warm-up is retried in the background until the instance is ready."""
+    monkeypatch.setattr(readiness, "WARM_UNIVERSE_ON_STARTUP", True)
+    monkeypatch.setattr(readiness, "WARMUP_RETRY_SECONDS", 0.01)
+    calls = []
+
+    def flaky_refresh(force_refresh: bool = False):
+        calls.append(force_refresh)
+        if len(calls) == 1:
+            raise ConnectionError("Yahoo down")
+        warm_universe()
+        return peek_universe_snapshot()
+
+    monkeypatch.setattr(readiness, "get_universe_snapshot", flaky_refresh)
+    readiness.start_universe_warmup()
+    try:
+        for _ in range(200):
+            if readiness.universe_check()["ok"]:
+                break
+            await asyncio.sleep(0.01)
+        assert readiness.universe_check()["ok"] is True
+        assert calls == [True, True]
+    finally:
+        await readiness.stop_universe_warmup()
+
+
+def test_metrics_endpoint_exposes_prometheus_text(client):
+    """Test /metrics reports route latency, in-flight requests and DB timings."""
+    client.get("/api/v1/watchlist/")
+    client.delete("/api/v1/watchlist/NOPE")
+    client.get("/api/v1/preferences/does-not-route/extra")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'count{method="GET",route="/api/v1/watchlist/",status="200"} 1' in body
+    assert 'count{method="DELETE",route="/api/v1/watchlist/{symbol}",status="404"} 1' in body
+    assert 'route="unmatched",status="404"' in body
+    assert 'http_requests_in_flight{method="GET"} 1' in body  # the /metrics request itself
+    assert 'db_query_duration_seconds_bucket{statement="SELECT",le="+Inf"}' in body
+    assert "quote_cache_hit_ratio " in body
+
+
+def test_metrics_render_merges_threads():
+    """Test counters and histograms recorded from many threads lose no updates."""
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests", ("route",))
+    latency = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    def record():
+        for _ in range(10_000):
+            requests.inc(route="/a")
+            latency.observe(0.5)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert requests.get(route="/a") == 40_000
+    assert latency.count() == 40_000
+    text = registry.render_prometheus()
+    assert 'test_requests_total{route="/a"} 40000' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'test_latency_seconds_bucket{le="1"} 40000' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 40000' in text
+    assert "test_latency_seconds_sum 20000" in text
+
+
+async def test_loop_lag_monitor_records_blocking_call():
+    """Test the lag monitor sees a coroutine that blocks the loop."""
+    monitor = LoopLagMonitor(interval=0.01)
+    before = lag_histogram.count()
+    monitor.start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)  # blocks the event loop
+    await asyncio.sleep(0.03)
+    await monitor.stop()
+
+    assert lag_histogram.count() > before
+    assert lag_histogram.quantile(1.0) >= 0.05
+
+
+def _blocking_work():
+    time.sleep(0.2)
+
+
+async def test_blocking_call_detector_logs_offending_stack(caplog):
+    """Test the detector reports where the loop was blocked, not just for how long."""
+    detector = BlockingCallDetector(threshold=0.05)
+    location = "tests/test_health.py(_blocking_work)"
+    before = blocked_counter.get(location=location)
+    detector.start()
+    await asyncio.sleep(0.05)
+    _blocking_work()
+    await asyncio.sleep(0.1)
+    await detector.stop()
+
+    assert blocked_counter.get(location=location) == before + 1
+    assert "in _blocking_work" in caplog.text
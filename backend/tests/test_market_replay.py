@@ -0,0 +1,86 @@
+"""Tests for market data capture and replay."""
+
+import gzip
+
+import pytest
+
+from services.market_data import FakeProvider, set_provider
+from services.market_replay import CaptureProvider, ReplayError, ReplayProvider
+from services.stock_service import fetch_stock_data
+
+
+class FlakyProvider(FakeProvider):
+    """Fake upstream that fails for one symbol."""
+
+    def info(self, symbol: str) -> dict:
+        if symbol == "DOWN":
+            raise TimeoutError("read timed out")
+        return super().info(symbol)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """Archive captured from a fake upstream, including a failed call."""
+    path = tmp_path / "market_data.jsonl.gz"
+    capture = CaptureProvider(FlakyProvider(seed=3), path)
+    for symbol in ("KO", "PEP"):
+        capture.info(symbol)
+    capture.history(["KO", "PEP"], 30)
+    with pytest.raises(TimeoutError):
+        capture.info("DOWN")
+    capture.flush()
+    return path
+
+
+def test_replay_serves_captured_responses(archive):
+    """Test replayed info and history match what was captured, and errors replay too."""
+    upstream = FakeProvider(seed=3)
+    replay = ReplayProvider(archive)
+
+    assert replay.info("KO") == upstream.info("KO")
+    assert replay.info("KO") == upstream.info("KO")  # cycles through recordings
+    assert replay.info("MISSING") == {}
+    dates, closes = replay.history(["KO", "PEP"], 30)["PEP"]
+    expected_dates, expected_closes = upstream.history(["KO", "PEP"], 30)["PEP"]
+    assert list(dates) == list(expected_dates) and list(closes) == list(expected_closes)
+    with pytest.raises(ReplayError, match="TimeoutError"):
+        replay.info("DOWN")
+
+    # Records are compressed JSON lines with timestamps and latency
+    with gzip.open(archive, "rt") as f:
+        assert all('"at":' in line and '"latency_ms":' in line for line in f)
+
+
+def test_replay_injects_errors_deterministically(archive):
+    """Test injected failures hit the same calls for the same seed."""
+
+    def failures(seed: int) -> list[bool]:
+        replay = ReplayProvider(archive, error_rate=0.5, seed=seed)
+        outcomes = []
+        for _ in range(20):
+            try:
+                replay.info("KO")
+                outcomes.append(False)
+            except ReplayError:
+                outcomes.append(True)
+        return outcomes
+
+    assert failures(1) == failures(1)
+    assert failures(1) != failures(2)
+    assert 0 < sum(failures(1)) < 20
+
+
+def test_fetch_stock_data_from_replay(archive):
+    """Test the stock service builds the same data from replayed responses."""
+    previous = set_provider(ReplayProvider(archive))
+    try:
+        replayed = fetch_stock_data("PEP")
+        assert fetch_stock_data("DOWN") is None
+    finally:
+        set_provider(previous)
+
+    previous = set_provider(FakeProvider(seed=3))
+    try:
+        assert replayed == fetch_stock_data("PEP")
+    finally:
+        set_provider(previous)
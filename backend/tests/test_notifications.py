@@ -0,0 +1,155 @@
+"""Tests for the alert notification outbox and delivery worker."""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from services.notification_service import FileSink, MemorySink, NotificationSink, OutboxWorker
+from services.quote_service import quote_cache
+from services.stock_service import StockData
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture
+def triggered_alerts(client):
+    """Create two alerts and trigger them through check/all."""
+    quote_cache.clear()
+    for target in (100.0, 120.0):
+        client.post(
+            "/api/v1/alerts/",
+            json={"symbol": "JNJ", "alert_type": "price_above", "target_value": target},
+        )
+    with patch("services.quote_service.fetch_stock_data") as mock:
+        mock.return_value = StockData(symbol="JNJ", name="JNJ", sector="Healthcare", price=150.0)
+        client.get("/api/v1/alerts/check/all")
+    return client
+
+
+def test_trigger_writes_outbox_rows(triggered_alerts):
+    """Test triggering alerts queues one notification per alert."""
+    stats = triggered_alerts.get("/api/v1/alerts/outbox/stats").json()
+    assert stats["queue_depth"] == 2
+    assert stats["worker_running"] is False
+
+
+def test_repeat_check_does_not_duplicate_notifications(triggered_alerts):
+    """Test already-triggered alerts are not queued again."""
+    with patch("services.quote_service.fetch_stock_data") as mock:
+        mock.return_value = StockData(symbol="JNJ", name="JNJ", sector="Healthcare", price=150.0)
+        triggered_alerts.get("/api/v1/alerts/check/all")
+    stats = triggered_alerts.get("/api/v1/alerts/outbox/stats").json()
+    assert stats["queue_depth"] == 2
+
+
+async def test_worker_delivers_in_batches(triggered_alerts):
+    """Test the worker delivers pending rows in batches and drains the queue."""
+    sink = MemorySink()
+    worker = OutboxWorker([sink], session_factory=TestSessionLocal, batch_size=1)
+
+    assert await worker.run_once() == 2
+    assert len(sink.batches) == 2
+    assert len(sink.notifications) == 2
+    assert all(key.startswith("alert-") for key in sink.notifications)
+    assert await worker.run_once() == 0
+
+    stats = triggered_alerts.get("/api/v1/alerts/outbox/stats").json()
+    assert stats["queue_depth"] == 0
+
+
+async def test_worker_retries_with_backoff(triggered_alerts):
+    """Test failed batches are retried and eventually delivered."""
+    sink = MemorySink(fail_times=1)
+    worker = OutboxWorker([sink], session_factory=TestSessionLocal, base_backoff=0.0)
+
+    await worker.run_once()
+    assert sink.notifications == {}
+
+    await worker.run_once()
+    assert len(sink.notifications) == 2
+
+
+async def test_worker_gives_up_after_max_attempts(triggered_alerts):
+    """Test rows are marked failed once retries are exhausted."""
+    sink = MemorySink(fail_times=10)
+    worker = OutboxWorker(
+        [sink], session_factory=TestSessionLocal, base_backoff=0.0, max_attempts=2
+    )
+
+    await worker.run_once()
+    await worker.run_once()
+    assert await worker.run_once() == 0
+
+    stats = triggered_alerts.get("/api/v1/alerts/outbox/stats").json()
+    assert stats["queue_depth"] == 0
+    assert stats["failed"] == 2
+
+
+async def test_worker_retries_only_the_failed_sink(triggered_alerts):
+    """Test a batch one sink accepted is not sent to it again when another sink fails."""
+    steady = MemorySink()
+    flaky = MemorySink(fail_times=1)
+    flaky.name = "flaky"
+    worker = OutboxWorker([steady, flaky], session_factory=TestSessionLocal, base_backoff=0.0)
+
+    await worker.run_once()
+    assert len(steady.batches) == 1
+    assert flaky.notifications == {}
+
+    await worker.run_once()
+    assert len(steady.batches) == 1
+    assert len(flaky.notifications) == 2
+    assert await worker.run_once() == 0
+
+
+async def test_concurrent_workers_claim_each_row_once(triggered_alerts):
+    """Test two workers that select the same due rows deliver each of them once."""
+    both_selected = threading.Barrier(2)
+
+    def racing_session():
+        """Session whose due-row select waits until the other worker has selected too."""
+        db = TestSessionLocal()
+        scalars = db.scalars
+
+        def select_then_wait(*args, **kwargs):
+            ids = scalars(*args, **kwargs).all()
+            both_selected.wait(5)
+            return SimpleNamespace(all=lambda: ids)
+
+        db.scalars = select_then_wait
+        return db
+
+    sinks = [MemorySink(), MemorySink()]
+    sinks[1].name = "other"
+    workers = [OutboxWorker([sink], session_factory=racing_session) for sink in sinks]
+
+    await asyncio.gather(*(worker.run_once() for worker in workers))
+
+    keys = [n["idempotency_key"] for sink in sinks for batch in sink.batches for n in batch]
+    assert len(keys) == 2
+    assert len(set(keys)) == 2
+
+
+def test_sink_names_must_be_unique():
+    """Test per-sink delivery tracking rejects sinks sharing a name."""
+    with pytest.raises(ValueError):
+        OutboxWorker([MemorySink(), MemorySink()])
+
+
+def test_sinks_must_implement_deliver():
+    """Test a sink without deliver cannot be created."""
+    with pytest.raises(TypeError):
+        type("Incomplete", (NotificationSink,), {})()
+
+
+async def test_file_sink_skips_repeated_notifications(tmp_path):
+    """Test redelivered notifications are not appended twice, even by a new sink."""
+    path = tmp_path / "notifications.jsonl"
+    notification = {"idempotency_key": "alert-1-2026-01-01T00:00:00", "symbol": "JNJ"}
+
+    await FileSink(str(path)).deliver([notification])
+    await FileSink(str(path)).deliver([notification, {**notification, "idempotency_key": "alert-2"}])
+
+    assert len(path.read_text().splitlines()) == 2
@@ -0,0 +1,136 @@
+"""Tests for portfolio endpoints and their request budget."""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from services import deadline as deadline_module
+from services.fundamentals_store import FundamentalsStore
+from services.quote_service import quote_cache
+from services.stock_service import StockData, clear_universe_snapshot, set_universe_snapshot
+from tests.conftest import TestSessionLocal
+
+FRESH = StockData(symbol="KO", name="Coca-Cola", sector="Consumer Staples", price=60.0)
+SLOW = StockData(symbol="JNJ", name="Johnson & Johnson", sector="Healthcare", price=150.0)
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    """Short request budget with an upstream where JNJ takes far longer than it."""
+    release = threading.Event()
+
+    def slow_fetch(symbol: str):
+        if symbol == "JNJ":
+            release.wait(1.0)
+            return SLOW
+        return FRESH if symbol == "KO" else None
+
+    monkeypatch.setattr(deadline_module, "REQUEST_BUDGET_SECONDS", 0.2)
+    quote_cache.clear()
+    clear_universe_snapshot()
+    with patch("services.quote_service.fetch_stock_data", side_effect=slow_fetch) as mock:
+        yield mock
+        # Let fetches that missed the budget finish so later tests don't join them
+        release.set()
+        for future in list(quote_cache._inflight.values()):
+            future.result()
+    quote_cache.clear()
+    clear_universe_snapshot()
+
+
+def add_holdings(client):
+    client.post("/api/v1/portfolio/holdings", json={"symbol": "JNJ", "shares": 10, "purchase_price": 140.0})
+    client.post("/api/v1/portfolio/holdings", json={"symbol": "KO", "shares": 5, "purchase_price": 50.0})
+
+
+def test_portfolio_serves_last_known_price_past_budget(client, budget):
+    """Test a holding whose fetch misses the budget is valued at its last known price."""
+    last_fetched = datetime.utcnow() - timedelta(hours=2)
+    set_universe_snapshot([SLOW.model_copy(update={"price": 145.0})], fetched_at=last_fetched)
+    add_holdings(client)
+
+    start = time.perf_counter()
+    response = client.get("/api/v1/portfolio/")
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == 200
+    assert elapsed < 0.8
+    data = response.json()
+    holdings = {h["symbol"]: h for h in data["holdings"]}
+
+    assert holdings["JNJ"]["stale"] is True
+    assert holdings["JNJ"]["current_price"] == 145.0
+    assert holdings["JNJ"]["as_of"] == last_fetched.isoformat()
+    assert holdings["KO"]["stale"] is False
+    assert holdings["KO"]["current_price"] == 60.0
+    assert data["stale"] is True
+    assert data["total_value"] == 10 * 145.0 + 5 * 60.0
+    assert data["as_of"] == last_fetched.isoformat()
+
+
+def test_portfolio_falls_back_to_stored_fundamentals(client, budget, monkeypatch):
+    """Test a symbol not held in memory falls back to the cached_stocks table."""
+    store = FundamentalsStore(session_factory=TestSessionLocal)
+    monkeypatch.setattr("services.quote_service.fundamentals_store", store)
+    stored_at = datetime(2024, 1, 2, 3, 4, 5)
+    store.upsert([SLOW.model_copy(update={"price": 142.0})], fetched_at=stored_at)
+    add_holdings(client)
+
+    data = client.get("/api/v1/portfolio/").json()
+    jnj = next(h for h in data["holdings"] if h["symbol"] == "JNJ")
+    assert jnj["stale"] is True
+    assert jnj["current_price"] == 142.0
+    assert jnj["as_of"] == stored_at.isoformat()
+
+
+def test_stored_fundamentals_read_stays_within_budget(client, budget, monkeypatch):
+    """Test a slow cached_stocks read is given up on when the budget runs out."""
+
+    def slow_load_dated(symbols):
+        time.sleep(1.0)
+        return []
+
+    monkeypatch.setattr("services.quote_service.fundamentals_store.load_dated", slow_load_dated)
+    add_holdings(client)
+
+    started = time.monotonic()
+    data = client.get("/api/v1/portfolio/").json()
+    assert time.monotonic() - started < 0.8
+    jnj = next(h for h in data["holdings"] if h["symbol"] == "JNJ")
+    assert jnj["current_price"] is None
+
+
+def test_holding_without_any_price_is_unvalued(client, budget):
+    """Test a holding with no fetched or known price has no value rather than an error."""
+    response = client.post(
+        "/api/v1/portfolio/holdings", json={"symbol": "JNJ", "shares": 1, "purchase_price": 100.0}
+    )
+    holding_id = response.json()["id"]
+
+    response = client.get(f"/api/v1/portfolio/holdings/{holding_id}")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["current_price"] is None
+    assert data["stale"] is False
+
+
+def test_portfolio_conditional_get(client, budget):
+    """Test an unchanged portfolio is answered with a 304 and always revalidated."""
+    set_universe_snapshot([SLOW, FRESH])
+    add_holdings(client)
+
+    response = client.get("/api/v1/portfolio/")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    response = client.get("/api/v1/portfolio/", headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    client.post("/api/v1/portfolio/holdings", json={"symbol": "KO", "shares": 1, "purchase_price": 55.0})
+    response = client.get("/api/v1/portfolio/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["holdings_count"] == 3
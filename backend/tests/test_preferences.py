@@ -1,7 +1,47 @@
 """Tests for user preferences and watchlist endpoints."""
 
+import json
+import threading
+import time
+from unittest.mock import patch
+
 import pytest
 
+from services import deadline as deadline_module
+from services.quote_service import QuoteCache, quote_cache
+from services.stock_service import StockData, clear_universe_snapshot
+
+
+@pytest.fixture
+def mock_quotes():
+    """Patch upstream quote fetches with fixed data."""
+    quotes = {
+        "JNJ": StockData(
+            symbol="JNJ",
+            name="Johnson & Johnson",
+            sector="Healthcare",
+            price=150.0,
+            previous_close=148.0,
+            dividend_yield=3.0,
+            pe_ratio=15.2,
+            market_cap=375.0,
+            beta=0.55,
+        ),
+        "KO": StockData(
+            symbol="KO",
+            name="Coca-Cola",
+            sector="Consumer Staples",
+            price=60.0,
+            previous_close=61.0,
+            dividend_yield=2.9,
+        ),
+    }
+    quote_cache.clear()
+    clear_universe_snapshot()
+    with patch("services.quote_service.fetch_stock_data", side_effect=quotes.get) as mock:
+        yield mock
+    quote_cache.clear()
+
 
 def test_get_default_preferences(client):
     """Test getting default preferences creates them if not exist."""
@@ -125,3 +165,128 @@ def test_remove_nonexistent_from_watchlist(client):
     """Test removing non-existent stock returns 404."""
     response = client.delete("/api/v1/watchlist/INVALID")
     assert response.status_code == 404
+
+
+def test_enriched_watchlist(client, mock_quotes):
+    """Test enriched watchlist computes day change and target distance."""
+    client.post("/api/v1/watchlist", json={"symbol": "JNJ", "target_price": 165.0})
+    client.post("/api/v1/watchlist", json={"symbol": "KO"})
+    client.post("/api/v1/watchlist", json={"symbol": "GONE"})
+
+    response = client.get("/api/v1/watchlist/enriched")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    items = {item["symbol"]: item for item in data["items"]}
+
+    jnj = items["JNJ"]
+    assert jnj["quote_available"] is True
+    assert jnj["price"] == 150.0
+    assert jnj["day_change"] == 2.0
+    assert jnj["day_change_percent"] == 1.35
+    assert jnj["target_distance"] == 15.0
+    assert jnj["target_distance_percent"] == 10.0
+    assert jnj["pe_ratio"] == 15.2
+
+    assert items["KO"]["day_change"] == -1.0
+    assert items["KO"]["target_distance"] is None
+    assert items["GONE"]["quote_available"] is False
+    assert items["GONE"]["price"] is None
+
+
+def test_enriched_watchlist_reuses_cached_quotes(client, mock_quotes):
+    """Test a second lookup is served from the quote cache."""
+    client.post("/api/v1/watchlist", json={"symbol": "JNJ"})
+    client.post("/api/v1/watchlist", json={"symbol": "KO"})
+
+    client.get("/api/v1/watchlist/enriched")
+    assert mock_quotes.call_count == 2
+
+    response = client.get("/api/v1/watchlist/enriched")
+    assert response.status_code == 200
+    assert mock_quotes.call_count == 2
+
+
+async def test_quote_cache_keeps_recently_used_quotes(mock_quotes):
+    """Test the quote cache drops its least recently used quote once full."""
+    cache = QuoteCache(size=1)
+    await cache.get_many(["JNJ"])
+    await cache.get_many(["KO"])
+    await cache.get_many(["KO"])
+    assert mock_quotes.call_count == 2
+
+    await cache.get_many(["JNJ"])
+    assert mock_quotes.call_count == 3
+
+
+async def test_submit_after_a_finished_fetch_reuses_its_quote(mock_quotes):
+    """Test a lookup that just missed a fetch's completion does not fetch again."""
+    cache = QuoteCache()
+    await cache.get_many(["JNJ"])
+
+    assert cache._submit("JNJ").result().stock.symbol == "JNJ"
+    assert mock_quotes.call_count == 1
+
+
+def test_stream_enriched_watchlist(client, mock_quotes):
+    """Test streaming the enriched watchlist as NDJSON."""
+    client.post("/api/v1/watchlist", json={"symbol": "JNJ", "target_price": 165.0})
+    client.post("/api/v1/watchlist", json={"symbol": "KO"})
+
+    response = client.get("/api/v1/watchlist/enriched/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert {line["symbol"] for line in lines} == {"JNJ", "KO"}
+    assert all(line["quote_available"] for line in lines)
+
+
+def test_watchlist_quotes_respect_request_budget(client, mock_quotes, monkeypatch):
+    """Test a quote missing the request budget is not waited on by either watchlist endpoint."""
+    fetch = mock_quotes.side_effect
+    release = threading.Event()
+
+    def slow_fetch(symbol):
+        if symbol == "KO":
+            release.wait(5.0)
+        return fetch(symbol)
+
+    client.post("/api/v1/watchlist", json={"symbol": "JNJ"})
+    client.post("/api/v1/watchlist", json={"symbol": "KO"})
+    monkeypatch.setattr(deadline_module, "REQUEST_BUDGET_SECONDS", 0.2)
+    mock_quotes.side_effect = slow_fetch
+
+    started = time.monotonic()
+    items = {item["symbol"]: item for item in client.get("/api/v1/watchlist/enriched").json()["items"]}
+    assert time.monotonic() - started < 1.0
+    assert items["JNJ"]["quote_available"] is True
+    assert items["KO"]["quote_available"] is False
+
+    started = time.monotonic()
+    response = client.get("/api/v1/watchlist/enriched/stream")
+    assert time.monotonic() - started < 1.0
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["symbol"], line["quote_available"]) for line in lines] == [("JNJ", True), ("KO", False)]
+
+    # The missed fetch keeps running and serves the next request
+    release.set()
+    monkeypatch.setattr(deadline_module, "REQUEST_BUDGET_SECONDS", 3.0)
+    items = {item["symbol"]: item for item in client.get("/api/v1/watchlist/enriched").json()["items"]}
+    assert items["KO"]["quote_available"] is True
+
+    # Once that quote ages out, both endpoints fall back to it when a refetch misses the budget
+    release.clear()
+    monkeypatch.setattr(quote_cache, "ttl", 0)
+    monkeypatch.setattr(deadline_module, "REQUEST_BUDGET_SECONDS", 0.2)
+    response = client.get("/api/v1/watchlist/enriched/stream")
+    lines = {line["symbol"]: line for line in map(json.loads, response.text.splitlines())}
+    items = {item["symbol"]: item for item in client.get("/api/v1/watchlist/enriched").json()["items"]}
+    for ko in (lines["KO"], items["KO"]):
+        assert ko["quote_available"] is True
+        assert ko["stale"] is True
+        assert ko["price"] == 60.0
+    assert lines["JNJ"]["stale"] is False
+
+    release.set()
+    monkeypatch.setattr(deadline_module, "REQUEST_BUDGET_SECONDS", 3.0)
+    client.get("/api/v1/watchlist/enriched")
@@ -0,0 +1,67 @@
+"""Tests for on-demand request profiling."""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.middleware import ProfilingMiddleware
+from services.profiler import CATEGORIES, RequestProfiler, category
+from services.upstream_metrics import track_upstream
+
+
+def test_profile_header_returns_report(client):
+    """Test a request sending the profile token is profiled and others are not."""
+    profiler = RequestProfiler(sample_rate=0, token="secret")
+    profiled = TestClient(ProfilingMiddleware(app, profiler))
+
+    assert "x-profile-id" not in profiled.get("/api/v1/watchlist/").headers
+    wrong_token = profiled.get("/api/v1/watchlist/", headers={"X-Profile": "guess"})
+    assert "x-profile-id" not in wrong_token.headers
+
+    response = profiled.get("/api/v1/watchlist/", headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+    report = profiler.get(response.headers["x-profile-id"]).as_dict()
+    assert len(profiler.reports) == 1
+    assert report["status"] == 200
+    assert report["trigger"] == "header"
+    assert report["overlapping_requests"] == 0
+    assert set(report["loop_breakdown_seconds"]) == set(CATEGORIES)
+    assert any("api/routes/preferences.py" in row["function"] for row in report["top_functions"])
+    assert "cumulative" in report["stats"]
+
+
+async def test_profile_attributes_worker_thread_calls():
+    """Test upstream calls made on worker threads are timed into the request profile."""
+    profiler = RequestProfiler(sample_rate=0)
+
+    def fetch():
+        with track_upstream("yfinance", "info"):
+            pass
+
+    profile = profiler.begin("GET", "/api/v1/stocks/JNJ", "header")
+    assert profiler.begin("GET", "/other", "sample") is None  # one profile at a time
+    await asyncio.to_thread(fetch)
+    profiler.finish(profile)
+    await asyncio.to_thread(fetch)  # after the request: not attributed
+
+    assert profile.timed["upstream"]["yfinance:info"][0] == 1
+    assert category("~", "<method 'execute' of 'sqlite3.Cursor' objects>") == "db"
+
+
+def test_profile_counts_overlapping_requests():
+    """Test requests sharing the loop with a profiled one are counted in its report."""
+    profiler = RequestProfiler(sample_rate=0)
+    profiler.enter()  # already running
+    profiler.enter()  # the profiled request itself
+    profile = profiler.begin("GET", "/api/v1/portfolio/", "header")
+    assert profile.overlapping_requests == 1
+
+    profiler.enter()  # arrives while profiling
+    profiler.leave()
+    profiler.finish(profile)
+    profiler.enter()  # after the profile: not counted
+
+    assert profile.as_dict(include_stats=False)["overlapping_requests"] == 2
@@ -0,0 +1,118 @@
+"""Tests for vectorized universe scoring and the top picks endpoint."""
+
+import random
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from services.ai_service import _rule_based_recommendation
+from services.scoring import UniverseScores
+from services.stock_service import StockData, clear_universe_snapshot, set_universe_snapshot
+from tests.test_stocks import MOCK_STOCKS
+
+
+def random_stocks(count: int, seed: int = 7) -> list[StockData]:
+    """Generate stocks spanning every scoring threshold, including missing values."""
+    rng = random.Random(seed)
+
+    def pick(values):
+        return rng.choice(values + [None, 0.0])
+
+    return [
+        StockData(
+            symbol=f"S{i}",
+            name=f"Stock {i}",
+            sector=rng.choice(["Healthcare", "Utilities", "Energy"]),
+            price=rng.uniform(10, 500),
+            dividend_yield=pick([0.5, 1.99, 2.0, 2.5, 3.0, 4.2]),
+            pe_ratio=pick([8.0, 14.99, 15.0, 20.0, 25.0, 40.0]),
+            market_cap=pick([5.0, 10.0, 50.0, 100.0, 900.0]),
+            beta=pick([0.3, 0.8, 0.95, 1.0, 1.1, 1.2, 1.5]),
+            debt_to_equity=pick([20.0, 50.0, 80.0, 100.0, 150.0]),
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def universe():
+    """Install the mock stocks as the current universe snapshot."""
+    snapshot = set_universe_snapshot(MOCK_STOCKS)
+    yield snapshot
+    clear_universe_snapshot()
+
+
+def test_vectorized_matches_scalar_rules():
+    """Test every vectorized recommendation equals the scalar rule-based one."""
+    stocks = random_stocks(500)
+    scores = UniverseScores(stocks)
+    for i, stock in enumerate(stocks):
+        assert scores.recommendation(i) == _rule_based_recommendation(stock)
+
+
+def test_ranking_orders_by_score():
+    """Test ranked rows are ordered by descending score."""
+    scores = UniverseScores(random_stocks(200))
+    ranked_scores = scores.score[scores.ranked()].tolist()
+    assert ranked_scores == sorted(ranked_scores, reverse=True)
+
+
+def test_ranking_filters():
+    """Test recommendation and risk filters narrow the ranking."""
+    scores = UniverseScores(random_stocks(200))
+    for i in scores.ranked(recommendations=["strong_buy"], risk_levels=["low"]):
+        recommendation = scores.recommendation(i)
+        assert recommendation.recommendation == "strong_buy"
+        assert recommendation.risk_level == "low"
+
+
+def test_empty_universe():
+    """Test scoring an empty snapshot."""
+    scores = UniverseScores([])
+    assert len(scores.ranked()) == 0
+
+
+def test_top_endpoint_ranks_universe(client, universe):
+    """Test /analysis/top returns ranked picks with paging."""
+    response = client.get("/api/v1/analysis/top?limit=2")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert data["snapshot_version"] == universe.version
+    assert [r["rank"] for r in data["results"]] == [1, 2]
+    assert data["results"][0]["symbol"] == "JNJ"
+
+    page = client.get("/api/v1/analysis/top?limit=2&offset=2").json()
+    assert [r["rank"] for r in page["results"]] == [3]
+
+
+def test_top_endpoint_sector_filter(client, universe):
+    """Test /analysis/top filters by sector."""
+    data = client.get("/api/v1/analysis/top?sector=technology").json()
+    assert [r["symbol"] for r in data["results"]] == ["MSFT"]
+
+
+def test_quick_analysis_matches_top(client, universe):
+    """Test the per-stock endpoint returns the same result as the ranking."""
+    top = client.get("/api/v1/analysis/top").json()["results"]
+    for pick in top:
+        quick = client.get(f"/api/v1/analysis/quick/{pick['symbol']}").json()
+        assert quick == {k: pick[k] for k in quick}
+
+
+def test_quick_analysis_with_stale_snapshot_fetches_one_stock(client):
+    """Test a stale snapshot is not refetched in full for a single quick analysis."""
+    set_universe_snapshot(MOCK_STOCKS, fetched_at=datetime.utcnow() - timedelta(days=1))
+    try:
+        with (
+            patch("api.routes.analysis.fetch_stock_data", return_value=MOCK_STOCKS[2]) as fetch,
+            patch("services.stock_service.fetch_multiple_stocks") as fetch_universe,
+        ):
+            response = client.get("/api/v1/analysis/quick/KO")
+        assert response.status_code == 200
+        assert response.json()["symbol"] == "KO"
+        fetch.assert_called_once_with("KO")
+        fetch_universe.assert_not_called()
+    finally:
+        clear_universe_snapshot()
@@ -0,0 +1,110 @@
+"""Tests for the cross-worker shared universe snapshot."""
+
+import fcntl
+import sys
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from services import shared_cache
+from services.scoring import UniverseScores
+from services.shared_cache import SharedSnapshot
+from services.stock_service import (
+    clear_universe_snapshot,
+    get_universe_snapshot,
+    set_universe_snapshot,
+)
+from tests.test_stocks import MOCK_STOCKS, mock_fetch_stocks  # noqa: F401
+
+
+@pytest.fixture
+def shared(tmp_path, monkeypatch):
+    """Shared snapshot file enabled for this process."""
+    shared = SharedSnapshot(str(tmp_path / "universe.snapshot"))
+    monkeypatch.setattr(shared_cache, "shared_snapshot", shared)
+    clear_universe_snapshot()
+    with patch("services.fundamentals_store.persist_universe"):
+        yield shared
+    clear_universe_snapshot()
+
+
+def test_round_trip_with_zero_copy_columns(tmp_path):
+    """Test a published snapshot reads back identically, with columns mapped in place."""
+    snapshot = set_universe_snapshot(MOCK_STOCKS)
+    shared = SharedSnapshot(str(tmp_path / "universe.snapshot"))
+    shared.write(snapshot)
+
+    view = shared.read()
+    assert view.version == snapshot.version
+    assert view.fetched_at == snapshot.fetched_at
+    assert view.stocks() == snapshot.stocks
+    assert view["KO"] == MOCK_STOCKS[2]
+    assert view.get("MISSING") is None
+
+    prices = view.array("price")
+    assert prices.tolist() == [s.price for s in MOCK_STOCKS]
+    assert not prices.flags.owndata and not prices.flags.writeable
+    assert np.isnan(view.array("debt_to_equity")).all()
+
+    # An unchanged file keeps its mapping
+    assert shared.read() is view
+    clear_universe_snapshot()
+
+
+def test_only_elected_worker_refreshes(shared, mock_fetch_stocks):
+    """Test a worker that loses the election serves the published snapshot."""
+    with shared.elected() as elected:
+        assert elected
+        # A second worker (its own lock file handle) loses while the lock is held
+        with SharedSnapshot(str(shared.path)).elected() as other:
+            assert not other
+
+    snapshot = get_universe_snapshot()
+    assert mock_fetch_stocks.call_count == 1
+    assert shared.read().version == snapshot.version
+
+    # Another worker starting cold adopts the file instead of fetching
+    clear_universe_snapshot()
+    other_worker = SharedSnapshot(str(shared.path))
+    with patch.object(shared_cache, "shared_snapshot", other_worker):
+        adopted = get_universe_snapshot()
+    assert adopted.version == snapshot.version
+    assert adopted.stocks == snapshot.stocks
+    assert mock_fetch_stocks.call_count == 1
+
+
+def test_stale_snapshot_served_while_another_worker_refreshes(shared, mock_fetch_stocks):
+    """Test a stale snapshot is served rather than fetched when the lock is taken."""
+    stale = set_universe_snapshot(MOCK_STOCKS[:2], fetched_at=datetime.utcnow() - timedelta(days=1))
+    shared.write(stale)
+    clear_universe_snapshot()
+
+    with open(shared.lock_path, "a+b") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        snapshot = get_universe_snapshot()
+
+    assert snapshot.version == stale.version
+    mock_fetch_stocks.assert_not_called()
+
+
+def test_scores_from_mapped_columns_match(tmp_path):
+    """Test scoring from the mapped columns matches scoring from rows."""
+    snapshot = set_universe_snapshot(MOCK_STOCKS)
+    shared = SharedSnapshot(str(tmp_path / "universe.snapshot"))
+    shared.write(snapshot)
+
+    from_rows = UniverseScores(snapshot.stocks, snapshot.version)
+    from_columns = UniverseScores(snapshot.stocks, snapshot.version, shared.read())
+    assert from_columns.score.tolist() == from_rows.score.tolist()
+    assert from_columns.order.tolist() == from_rows.order.tolist()
+    clear_universe_snapshot()
+
+
+def test_falls_back_to_per_process_snapshot_without_fcntl(tmp_path, monkeypatch):
+    """Test platforms without POSIX file locks keep a snapshot per process."""
+    assert shared_cache._create_shared_snapshot("") is None
+    assert shared_cache._create_shared_snapshot(str(tmp_path / "universe.snapshot")) is not None
+    monkeypatch.setitem(sys.modules, "fcntl", None)
+    assert shared_cache._create_shared_snapshot(str(tmp_path / "universe.snapshot")) is None
@@ -0,0 +1,60 @@
+"""Tests for API import time and lazy loading of heavy dependencies."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from services.lazy_imports import HEAVY_MODULES, lazy_import
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Importing api.main took ~2.6s with eager yfinance/openai imports, ~1.0s without
+IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "2.0"))
+
+MEASURE_IMPORT = """
+import json, sys, time
+start = time.perf_counter()
+import api.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure_import(tmp_path) -> dict:
+    """Import api.main in a fresh interpreter and report time and loaded modules."""
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'startup.db'}"}
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE_IMPORT],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_api_import_stays_within_budget(tmp_path):
+    """Test importing the app is fast and loads no heavy dependencies."""
+    runs = [measure_import(tmp_path) for _ in range(2)]
+    assert min(r["seconds"] for r in runs) < IMPORT_BUDGET_SECONDS
+    assert not set(HEAVY_MODULES) & set(runs[0]["modules"])
+    # No filesystem work at import time either
+    assert not (tmp_path / "startup.db").exists()
+
+
+def test_lazy_module_imports_on_first_use():
+    """Test a lazy module proxies attributes once loaded."""
+    lazy_json = lazy_import("json")
+    assert "not loaded" in repr(lazy_json)
+    assert lazy_json.dumps([1]) == "[1]"
+    assert "not loaded" not in repr(lazy_json)
+
+
+def test_startup_report_endpoint(client):
+    """Test the startup report exposes import and phase timings."""
+    data = client.get("/health/startup").json()
+    assert "init_db" in data["phases"]
+    assert isinstance(data["heavy_modules_loaded"], list)
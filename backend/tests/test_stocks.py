@@ -1,9 +1,26 @@
 """Tests for stock screening endpoint."""
 
+import time
+from datetime import datetime, timedelta
+
 import pytest
 from unittest.mock import patch, MagicMock
 
-from services.stock_service import StockData, ConservativeScreener, fetch_stock_data
+from api.routes.stocks import Stock, StockScreenResponse
+from models.preferences import UserPreferences
+from services import deadline as deadline_module
+from services import screen_presets
+from services.market_data import FakeProvider, set_provider
+from services.quote_service import quote_cache
+from services.response_cache import response_cache
+from services.stock_service import (
+    StockData,
+    ConservativeScreener,
+    clear_universe_snapshot,
+    fetch_stock_data,
+    set_universe_snapshot,
+)
+from tests.conftest import TestSessionLocal
 
 
 # Mock stock data for testing
@@ -43,10 +60,12 @@ MOCK_STOCKS = [
 
 @pytest.fixture
 def mock_fetch_stocks():
-    """Mock the fetch_multiple_stocks function."""
-    with patch("api.routes.stocks.fetch_multiple_stocks") as mock:
+    """Mock the fetch_multiple_stocks function behind the universe snapshot."""
+    clear_universe_snapshot()
+    with patch("services.stock_service.fetch_multiple_stocks") as mock:
         mock.return_value = MOCK_STOCKS
         yield mock
+    clear_universe_snapshot()
 
 
 def test_screen_stocks_returns_list(client, mock_fetch_stocks):
@@ -111,23 +130,177 @@ def test_screen_stocks_with_multiple_filters(client, mock_fetch_stocks):
     assert data["stocks"][0]["symbol"] == "JNJ"
 
 
-def test_get_stock_details(client):
+@pytest.fixture
+def presets(client, mock_fetch_stocks):
+    """Saved preferences to screen with, and a clean compiled preset cache."""
+    screen_presets.clear_presets()
+    client.post(
+        "/api/v1/preferences",
+        json={
+            "name": "income",
+            "min_dividend_yield": 2.0,
+            "preferred_sectors": ["Healthcare", "Consumer Staples"],
+        },
+    )
+    yield client
+    screen_presets.clear_presets()
+
+
+def test_screen_with_preset(presets):
+    """Test a preset screens with the saved criteria across all preferred sectors."""
+    response = presets.get("/api/v1/stocks/screen?preset=income")
+    assert response.status_code == 200
+    data = response.json()
+    assert {s["symbol"] for s in data["stocks"]} == {"JNJ", "KO"}
+    assert data["filters_applied"]["preset"] == "income"
+    assert data["filters_applied"]["sectors"] == ["Healthcare", "Consumer Staples"]
+
+
+def test_preset_params_override(presets):
+    """Test explicit query parameters override the preset's criteria."""
+    data = presets.get("/api/v1/stocks/screen?preset=income&max_pe_ratio=20").json()
+    assert [s["symbol"] for s in data["stocks"]] == ["JNJ"]
+
+    data = presets.get("/api/v1/stocks/screen?preset=income&sector=Technology&min_dividend_yield=0").json()
+    assert [s["symbol"] for s in data["stocks"]] == ["MSFT"]
+
+
+def test_preset_is_cached_and_invalidated(presets):
+    """Test compiled presets are reused until their preferences are saved or deleted."""
+    presets.get("/api/v1/stocks/screen?preset=income")
+    compiled = screen_presets._presets["income"]
+    presets.get("/api/v1/stocks/screen?preset=income")
+    assert screen_presets._presets["income"] is compiled
+
+    presets.post(
+        "/api/v1/preferences",
+        json={"name": "income", "preferred_sectors": ["Technology"]},
+    )
+    assert "income" not in screen_presets._presets
+    data = presets.get("/api/v1/stocks/screen?preset=income").json()
+    assert [s["symbol"] for s in data["stocks"]] == ["MSFT"]
+
+    presets.delete("/api/v1/preferences/income")
+    assert presets.get("/api/v1/stocks/screen?preset=income").status_code == 404
+
+
+def test_preset_edited_by_another_worker_is_recompiled(presets):
+    """Test a preset changed without this worker's invalidation is still picked up."""
+    presets.get("/api/v1/stocks/screen?preset=income")
+    db = TestSessionLocal()
+    try:
+        prefs = db.query(UserPreferences).filter(UserPreferences.name == "income").one()
+        prefs.preferred_sectors = ["Technology"]
+        prefs.min_dividend_yield = None
+        db.commit()
+    finally:
+        db.close()
+
+    data = presets.get("/api/v1/stocks/screen?preset=income").json()
+    assert [s["symbol"] for s in data["stocks"]] == ["MSFT"]
+
+
+@pytest.fixture
+def mock_quote_fetch():
+    """Mock the upstream fetch behind the quote cache."""
+    quote_cache.clear()
+    with patch("services.quote_service.fetch_stock_data") as mock:
+        yield mock
+    quote_cache.clear()
+
+
+def test_get_stock_details(client, mock_quote_fetch):
     """Test getting details for a specific stock."""
-    with patch("api.routes.stocks.fetch_stock_data") as mock:
-        mock.return_value = MOCK_STOCKS[0]
-        response = client.get("/api/v1/stocks/JNJ")
-        assert response.status_code == 200
-        data = response.json()
-        assert "symbol" in data
-        assert data["symbol"] == "JNJ"
+    mock_quote_fetch.return_value = MOCK_STOCKS[0]
+    response = client.get("/api/v1/stocks/JNJ")
+    assert response.status_code == 200
+    data = response.json()
+    assert "symbol" in data
+    assert data["symbol"] == "JNJ"
 
 
-def test_get_stock_details_not_found(client):
+def test_get_stock_details_not_found(client, mock_quote_fetch):
     """Test getting details for a non-existent stock."""
-    with patch("api.routes.stocks.fetch_stock_data") as mock:
-        mock.return_value = None
-        response = client.get("/api/v1/stocks/INVALID")
-        assert response.status_code == 404
+    mock_quote_fetch.return_value = None
+    response = client.get("/api/v1/stocks/INVALID")
+    assert response.status_code == 404
+
+
+def test_stock_details_revalidate_without_upstream(client, mock_quote_fetch):
+    """Test a cached quote is revalidated from its fetch time without another fetch."""
+    mock_quote_fetch.return_value = MOCK_STOCKS[0]
+    response = client.get("/api/v1/stocks/JNJ")
+    assert response.headers["cache-control"].startswith("public, max-age=")
+
+    response = client.get("/api/v1/stocks/JNJ", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert mock_quote_fetch.call_count == 1
+
+
+def test_screen_conditional_get(client, mock_fetch_stocks):
+    """Test polling the screen with If-None-Match gets a 304 until the snapshot changes."""
+    response = client.get("/api/v1/stocks/screen?sector=Healthcare")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert client.get("/api/v1/stocks/screen?sector=Technology").headers["etag"] != etag
+
+    with patch("api.routes.stocks.stock_row") as build:
+        response = client.get(
+            "/api/v1/stocks/screen?sector=Healthcare", headers={"If-None-Match": etag}
+        )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    build.assert_not_called()
+
+    set_universe_snapshot([MOCK_STOCKS[0].model_copy(update={"price": 160.0})])
+    response = client.get(
+        "/api/v1/stocks/screen?sector=Healthcare", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["stocks"][0]["price"] == 160.0
+
+    # Universe stocks are served from the snapshot and tagged by its version
+    response = client.get("/api/v1/stocks/JNJ")
+    assert response.json()["price"] == 160.0
+    response = client.get("/api/v1/stocks/JNJ", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+
+def test_screen_served_pre_encoded(client, mock_fetch_stocks):
+    """Test screens are encoded once per snapshot version and match the response model."""
+    response_cache.clear()
+    first = client.get("/api/v1/stocks/screen?max_beta=0.6")
+    with patch("api.routes.stocks.stock_row") as build:
+        second = client.get("/api/v1/stocks/screen?max_beta=0.6")
+    build.assert_not_called()
+
+    assert second.content == first.content
+    assert second.headers["content-type"] == "application/json"
+    expected = StockScreenResponse(
+        stocks=[Stock(**s.model_dump()) for s in MOCK_STOCKS if s.beta <= 0.6],
+        total=2,
+        filters_applied={"max_beta": 0.6},
+    )
+    assert first.json() == expected.model_dump()
+
+
+def test_fetch_stock_data_from_fake_provider():
+    """Test fetches go through the configured provider and convert its info shape."""
+    provider = FakeProvider(seed=7)
+    previous = set_provider(provider)
+    try:
+        stock = fetch_stock_data("ZZZ")
+    finally:
+        set_provider(previous)
+
+    info = provider.info("ZZZ")
+    assert stock.symbol == "ZZZ"
+    assert stock.price == info["currentPrice"]
+    assert stock.dividend_yield == pytest.approx(info["dividendYield"] * 100)
+    assert stock.market_cap == pytest.approx(info["marketCap"] / 1e9)
+    dates, closes = provider.history(["ZZZ"], 30)["ZZZ"]
+    assert len(dates) == 30 and closes[-1] == info["currentPrice"]
 
 
 def test_get_stock_universe(client, mock_fetch_stocks):
@@ -185,3 +358,34 @@ class TestConservativeScreener:
         assert filters["min_dividend_yield"] == 2.0
         assert filters["max_pe_ratio"] == 25.0
         assert filters["sector"] == "Healthcare"
+
+    def test_multiple_sectors(self):
+        """Test a screener with several sectors keeps stocks in any of them."""
+        screener = ConservativeScreener(sectors=["healthcare", "Technology"])
+        assert [s.symbol for s in screener.screen(MOCK_STOCKS)] == ["JNJ", "MSFT"]
+
+
+def test_compare_flags_stale_stocks_past_budget(client, monkeypatch):
+    """Test compare returns last known values for stocks that miss the request budget."""
+    def slow_msft(symbol):
+        if symbol == "MSFT":
+            time.sleep(1.0)
+        return next(s for s in MOCK_STOCKS if s.symbol == symbol)
+
+    monkeypatch.setattr(deadline_module, "REQUEST_BUDGET_SECONDS", 0.2)
+    quote_cache.clear()
+    last_fetched = datetime.utcnow() - timedelta(hours=1)
+    set_universe_snapshot(MOCK_STOCKS[1:2], fetched_at=last_fetched)
+    try:
+        with patch("services.quote_service.fetch_stock_data", side_effect=slow_msft):
+            response = client.get("/api/v1/stocks/compare/JNJ,MSFT")
+    finally:
+        quote_cache.clear()
+        clear_universe_snapshot()
+
+    assert response.status_code == 200
+    stocks = response.json()["stocks"]
+    assert [s["symbol"] for s in stocks] == ["JNJ", "MSFT"]
+    assert stocks[0]["stale"] is False
+    assert stocks[1]["stale"] is True
+    assert stocks[1]["as_of"] == last_fetched.isoformat()
@@ -0,0 +1,77 @@
+"""Tests for request tracing spans."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.middleware import TracingMiddleware
+from models.database import instrument_engine
+from services.quote_service import quote_cache
+from services.stock_service import StockData, clear_universe_snapshot
+from services.tracing import JsonLinesExporter, Span, otlp_payload, tracer
+from tests.conftest import test_async_engine
+
+KO = StockData(symbol="KO", name="Coca-Cola", sector="Consumer Staples", price=60.0)
+PEP = StockData(symbol="PEP", name="PepsiCo", sector="Consumer Staples", price=170.0)
+
+
+@pytest.fixture
+def traces(tmp_path, monkeypatch):
+    """Export spans of the shared tracer to a temporary JSON-lines file."""
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracer, "exporter", JsonLinesExporter(path))
+    quote_cache.clear()
+    clear_universe_snapshot()
+
+    def read():
+        tracer.shutdown()
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    yield read
+    tracer.shutdown()
+    quote_cache.clear()
+
+
+def test_portfolio_trace_nests_fetches_and_queries(client, traces):
+    """Test a portfolio request's per-symbol fetches and DB round-trips nest under its span."""
+    instrument_engine(test_async_engine.sync_engine)
+    traced = TestClient(TracingMiddleware(app))
+    for symbol in ("KO", "PEP"):
+        client.post(
+            "/api/v1/portfolio/holdings", json={"symbol": symbol, "shares": 1, "purchase_price": 50.0}
+        )
+
+    with patch("services.stock_service._fetch_stock_data", side_effect=[KO, PEP]):
+        assert traced.get("/api/v1/portfolio/").status_code == 200
+
+    spans = traces()
+    (root,) = [span for span in spans if span["name"] == "GET /api/v1/portfolio/"]
+    assert root["kind"] == "server"
+    assert root["attributes"]["http.status_code"] == 200
+    children = [span for span in spans if span["parent_id"] == root["span_id"]]
+    fetched = {s["attributes"]["symbol"] for s in children if s["name"] == "fetch_stock_data"}
+    assert fetched == {"KO", "PEP"}  # ran on the quote fetch threads
+    assert any(span["name"] == "db.SELECT" for span in children)
+    assert {span["trace_id"] for span in children} == {root["trace_id"]}
+
+
+def test_span_records_error_and_encodes_otlp(traces):
+    """Test a failing span keeps its error and maps to an OTLP error status."""
+    with pytest.raises(ValueError):
+        with tracer.span("fetch_multiple_stocks", symbols=2):
+            with tracer.span("fetch_stock_data", symbol="KO"):
+                raise ValueError("boom")
+
+    child, parent = traces()
+    assert child["parent_id"] == parent["span_id"]
+    assert child["error"] == "ValueError: boom"
+
+    span = Span("yfinance.info", None, {"symbol": "KO", "retries": 2}, kind="client")
+    span.end_ns, span.error = span.start_ns + 1000, "Timeout"
+    (encoded,) = otlp_payload([span])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert encoded["kind"] == 3
+    assert encoded["status"] == {"code": 2, "message": "Timeout"}
+    assert {"key": "retries", "value": {"intValue": "2"}} in encoded["attributes"]
@@ -25,6 +25,7 @@ export interface StockScreenResponse {
 }
 
 export interface ScreeningFilters {
+  preset?: string; // name of saved preferences; other filters override it
   sector?: string;
   min_dividend_yield?: number;
   max_pe_ratio?: number;
@@ -55,6 +56,30 @@ export interface WatchlistItem {
   is_active: boolean;
 }
 
+export interface EnrichedWatchlistItem extends WatchlistItem {
+  name: string | null;
+  sector: string | null;
+  price: number | null;
+  previous_close: number | null;
+  day_change: number | null;
+  day_change_percent: number | null;
+  target_distance: number | null;
+  target_distance_percent: number | null;
+  dividend_yield: number | null;
+  pe_ratio: number | null;
+  market_cap: number | null;
+  beta: number | null;
+  fifty_two_week_high: number | null;
+  fifty_two_week_low: number | null;
+  quote_available: boolean;
+}
+
+export interface EnrichedWatchlist {
+  items: EnrichedWatchlistItem[];
+  total: number;
+  as_of: string;
+}
+
 export interface StockRecommendation {
   symbol: string;
   recommendation: "strong_buy" | "buy" | "hold" | "sell" | "strong_sell";
@@ -92,6 +117,8 @@ export interface PortfolioHoldingWithValue extends PortfolioHolding {
   current_value: number | null;
   gain_loss: number | null;
   gain_loss_percent: number | null;
+  as_of: string | null;
+  stale: boolean;
 }
 
 export interface PortfolioSummary {
@@ -101,6 +128,8 @@ export interface PortfolioSummary {
   total_gain_loss_percent: number;
   holdings_count: number;
   holdings: PortfolioHoldingWithValue[];
+  as_of: string | null;
+  stale: boolean;
 }
 
 export interface PortfolioHoldingCreate {
@@ -118,6 +147,8 @@ export interface Alert {
   symbol: string;
   alert_type: AlertType;
   target_value: number;
+  window_days: number | null;
+  reference_price: number | null;
   is_active: boolean;
   is_triggered: boolean;
   triggered_at: string | null;
@@ -129,12 +160,15 @@ export interface AlertCreate {
   symbol: string;
   alert_type: AlertType;
   target_value: number;
+  window_days?: number;
   notes?: string;
 }
 
 export interface AlertCheck {
   alert: Alert;
   current_price: number | null;
+  reference_price: number | null;
+  percent_change: number | null;
   should_trigger: boolean;
   message: string;
 }
@@ -147,6 +181,7 @@ export async function screenStocks(
 ): Promise<StockScreenResponse> {
   const params = new URLSearchParams();
 
+  if (filters.preset) params.append("preset", filters.preset);
   if (filters.sector) params.append("sector", filters.sector);
   if (filters.min_dividend_yield !== undefined)
     params.append("min_dividend_yield", String(filters.min_dividend_yield));
@@ -213,7 +248,10 @@ export async function getAvailableSectors(): Promise<string[]> {
  */
 export async function compareStocks(
   symbols: string[]
-): Promise<{ stocks: Stock[]; count: number }> {
+): Promise<{
+  stocks: (Stock & { as_of: string | null; stale: boolean })[];
+  count: number;
+}> {
   const response = await fetch(
     `${API_BASE_URL}/api/v1/stocks/compare/${symbols.join(",")}`
   );
@@ -278,6 +316,19 @@ export async function getWatchlist(
   return response.json();
 }
 
+/**
+ * Get active watchlist with live quotes and fundamentals
+ */
+export async function getEnrichedWatchlist(): Promise<EnrichedWatchlist> {
+  const response = await fetch(`${API_BASE_URL}/api/v1/watchlist/enriched`);
+
+  if (!response.ok) {
+    throw new Error(`Failed to get enriched watchlist: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
 /**
  * Add stock to watchlist
  */
@@ -333,6 +384,48 @@ export async function getStockAnalysis(
   return response.json();
 }
 
+export interface BatchAnalysisItem {
+  symbol: string;
+  analysis?: StockRecommendation;
+  error?: string;
+}
+
+/**
+ * Stream AI analyses for many stocks, calling onItem as each one completes
+ */
+export async function streamBatchAnalysis(
+  symbols: string[],
+  onItem: (item: BatchAnalysisItem) => void,
+  packSize: number = 1
+): Promise<void> {
+  const response = await fetch(`${API_BASE_URL}/api/v1/analysis/batch`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ symbols, pack_size: packSize }),
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error(`Failed to get batch analysis: ${response.statusText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop() ?? "";
+    for (const line of lines) {
+      if (line.trim()) onItem(JSON.parse(line));
+    }
+  }
+
+  if (buffer.trim()) onItem(JSON.parse(buffer));
+}
+
 /**
  * Get quick rule-based analysis for a stock (no AI)
  */